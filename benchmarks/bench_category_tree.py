@@ -0,0 +1,67 @@
+"""
+Benchmark of CategoryTree operations on large synthetic taxonomies.
+
+Usage:
+    python benchmarks/bench_category_tree.py [number_of_nodes] [branching]
+"""
+
+import sys
+from time import perf_counter
+
+from texttools.models import CategoryTree
+
+
+def make_tree(size: int, branching: int) -> CategoryTree:
+    tree = CategoryTree()
+    # Breadth-first filling gives a complete tree with the given branching
+    for i in range(1, size):
+        parent = "root" if i <= branching else f"node-{(i - 1) // branching}"
+        tree.add_node(f"node-{i}", parent, f"Description of node {i}")
+    return tree
+
+
+def timed(label: str, func) -> None:
+    start = perf_counter()
+    func()
+    print(f"{label:<36} {perf_counter() - start:.4f}s")
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    branching = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"Nodes: {size}, branching: {branching}")
+
+    start = perf_counter()
+    tree = make_tree(size, branching)
+    print(f"{'build':<36} {perf_counter() - start:.4f}s")
+
+    data = tree.dump_tree()
+    timed("from_dict", lambda: CategoryTree.from_dict(data))
+    timed(
+        "get_max_depth x 10_000", lambda: [tree.get_max_depth() for _ in range(10_000)]
+    )
+
+    # Reparent the children of every node of the second level
+    second_level = [f"node-{i}" for i in range(branching + 1, 2 * branching + 1)]
+    timed(
+        "remove_node(remove_children=False)",
+        lambda: [
+            tree.remove_node(name, remove_children=False) for name in second_level
+        ],
+    )
+
+    # Remove the first subtree of the root, about 1 / branching of the tree
+    timed("remove_node(remove_children=True)", lambda: tree.remove_node("node-1"))
+
+    leaves = [name for name, node in tree.get_all_nodes().items() if not node.children]
+    timed(
+        "remove_node on 1_000 leaves",
+        lambda: [tree.remove_node(name) for name in leaves[:1_000]],
+    )
+    print(
+        f"Remaining nodes: {len(tree.get_all_nodes())}, depth: {tree.get_max_depth()}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark of TheToolUtils.normalize against the previous implementation.
+
+Usage:
+    python benchmarks/bench_normalize.py [size_in_mb]
+"""
+
+import random
+import re
+import sys
+from time import perf_counter
+
+from texttools.core import TheToolUtils
+
+
+def legacy_normalize(text: str) -> str:
+    text = "\n".join(
+        line
+        for line in text.splitlines()
+        if line.strip() and not all(c == "*" for c in line.strip())
+    )
+    text = "\n".join(
+        line
+        for line in text.splitlines()
+        if line.strip() and not all(c == "-" for c in line.strip())
+    )
+    trans = str.maketrans(
+        {
+            "\u201c": '"',
+            "\u201d": '"',
+            "\u2018": "'",
+            "\u2019": "'",
+            "\u2013": "-",
+            "\u2014": "-",
+            "\u2026": "...",
+            "\u00a0": " ",
+            "\u200b": None,
+        }
+    )
+    text = text.translate(trans)
+    return re.sub(r"[ \t]+", " ", text)
+
+
+def make_text(size: int) -> str:
+    random.seed(0)
+    words = [
+        "hello",
+        "world",
+        "\u201cquoted\u201d",
+        "it\u2019s",
+        "a\u2013b",
+        "wait\u2026",
+        "non\u00a0breaking",
+        "zero\u200bwidth",
+        "tab\there",
+        "many   spaces",
+        "سلام",
+        "دنیا",
+    ]
+    lines = []
+    total = 0
+    while total < size:
+        r = random.random()
+        if r < 0.05:
+            line = "*****"
+        elif r < 0.1:
+            line = "  -----  "
+        elif r < 0.15:
+            line = "   "
+        else:
+            line = " ".join(random.choice(words) for _ in range(12))
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+
+def timeit(func, text: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        func(text)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    text = make_text(int(size_mb * 1024 * 1024))
+
+    assert TheToolUtils.normalize(text) == legacy_normalize(text)
+
+    legacy = timeit(legacy_normalize, text)
+    current = timeit(TheToolUtils.normalize, text)
+    print(f"Input size: {size_mb} MB")
+    print(f"legacy normalize:  {legacy:.3f}s")
+    print(f"current normalize: {current:.3f}s ({legacy / current:.1f}x faster)")
+
+    texts = [text[i : i + 100_000] for i in range(0, len(text), 100_000)]
+    start = perf_counter()
+    [TheToolUtils.normalize(t) for t in texts]
+    serial = perf_counter() - start
+    start = perf_counter()
+    TheToolUtils.normalize_many(texts)
+    pooled = perf_counter() - start
+    print(f"normalize_many on {len(texts)} texts: {pooled:.3f}s (serial {serial:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from texttools.core import Str
+
+
+def make_completion(content: str):
+    message = SimpleNamespace(content=content)
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=message, logprobs=None)], usage=usage
+    )
+
+
+class FakeClient:
+    """
+    Minimal stand-in for the OpenAI client that records every request.
+    """
+
+    def __init__(self, parsed=None):
+        self.parsed = parsed if parsed is not None else Str(result="summary")
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @property
+    def calls(self) -> int:
+        return len(self.requests)
+
+    def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        if "response_format" in kwargs:
+            return make_completion(self.parsed.model_dump_json())
+        if "guided_choice" in kwargs.get("extra_body", {}):
+            label = self.parsed.result
+            return make_completion(
+                label if isinstance(label, str) else json.dumps(label)
+            )
+        return make_completion("analysis")
+
+
+@pytest.fixture
+def fake_client():
+    return FakeClient()
+
+
+@pytest.fixture
+def run_kwargs():
+    return {
+        "text": "Some text",
+        "with_analysis": False,
+        "output_lang": None,
+        "user_prompt": None,
+        "temperature": 0.0,
+        "logprobs": False,
+        "top_logprobs": 3,
+        "max_completion_tokens": None,
+        "validator": None,
+        "max_validation_retries": None,
+        "priority": None,
+        "tool_name": "summarize",
+        "output_model": Str,
+        "mode": None,
+    }
@@ -0,0 +1,189 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from texttools import (
+    AdaptiveConcurrencyLimiter,
+    BatchTheTool,
+    CategoryTree,
+    RetryPolicy,
+)
+
+
+def result_labels(request):
+    result = request["response_format"]["json_schema"]["schema"]["properties"]["result"]
+    return result.get("enum") or [result["const"]]
+
+
+class AsyncTreeClient:
+    """
+    Chooses the category whose name appears in the text.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        labels = result_labels(kwargs)
+        prompt = kwargs["messages"][-1]["content"]
+        text = prompt.rsplit("Here is the text:", 1)[1].split()
+        label = next((label for label in labels if label in text), labels[0])
+        await asyncio.sleep(0)
+
+        content = json.dumps({"reason": "x", "result": label})
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(message=SimpleNamespace(content=content), logprobs=None)
+            ],
+            usage=usage,
+        )
+
+
+def test_level_synchronous_groups_requests_by_parent():
+    tree = CategoryTree()
+    for name, parent in [("A", "root"), ("B", "root"), ("A1", "A"), ("A2", "A")]:
+        tree.add_node(name, parent)
+    tree.add_node("B1", "B")
+
+    client = AsyncTreeClient()
+    tool = BatchTheTool(client=client, model="model", max_concurrency=1)
+    texts = ["A A1", "B B1", "A A2", "B B1"]
+
+    outputs = asyncio.run(tool.categorize(texts, tree, level_synchronous=True))
+
+    assert [output.result for output in outputs] == [
+        ["A", "A1"],
+        ["B", "B1"],
+        ["A", "A2"],
+        ["B", "B1"],
+    ]
+    assert outputs[0].metadata.token_usage.total_tokens == 30
+
+    second_level = [result_labels(request) for request in client.requests[len(texts) :]]
+    assert second_level == [["A1", "A2"], ["A1", "A2"], ["B1"], ["B1"]]
+
+
+def test_level_synchronous_text_without_calls_is_no_cache_hit():
+    client = AsyncTreeClient()
+    tool = BatchTheTool(client=client, model="model")
+
+    outputs = asyncio.run(
+        tool.categorize(["A"], CategoryTree(), level_synchronous=True)
+    )
+
+    assert client.requests == []
+    assert outputs[0].result == []
+    assert outputs[0].metadata.cache_hit is False
+    assert outputs[0].metadata.processed_by is None
+
+
+def test_wide_levels_are_split_into_groups():
+    tree = CategoryTree()
+    for i in range(7):
+        tree.add_node(f"c{i}", "root")
+
+    client = AsyncTreeClient()
+    tool = BatchTheTool(client=client, model="model")
+
+    outputs = asyncio.run(tool.categorize(["c5"], tree, max_group_size=3))
+
+    assert outputs[0].result == ["c5"]
+    # Three groups and the run-off
+    assert [len(result_labels(request)) for request in client.requests] == [2, 2, 3, 3]
+    assert outputs[0].metadata.token_usage.total_tokens == 60
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{"beam_width": 2}, {"flatten_tree": True}, {"score_labels": True}],
+)
+def test_level_synchronous_rejects_unsupported_options(options):
+    tree = CategoryTree()
+    tree.add_node("A", "root")
+    tool = BatchTheTool(client=AsyncTreeClient(), model="model")
+
+    with pytest.raises(ValueError, match="level_synchronous"):
+        asyncio.run(tool.categorize(["A"], tree, level_synchronous=True, **options))
+
+
+class RateLimitedTreeClient(AsyncTreeClient):
+    """
+    Answers like AsyncTreeClient after rejecting the first request with a 429.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rejected = False
+
+    async def _create(self, **kwargs):
+        if not self.rejected:
+            self.rejected = True
+            response = SimpleNamespace(status_code=429, headers={}, request=None)
+            raise openai.RateLimitError("error", response=response, body=None)
+        return await super()._create(**kwargs)
+
+
+@pytest.mark.parametrize("level_synchronous", [False, True])
+def test_tree_metadata_counts_the_retries_of_every_level(level_synchronous):
+    tree = CategoryTree()
+    tree.add_node("A", "root")
+    tree.add_node("A1", "A")
+    tool = BatchTheTool(
+        client=RateLimitedTreeClient(),
+        model="model",
+        retry_policy=RetryPolicy(initial_delay=0),
+    )
+
+    outputs = asyncio.run(
+        tool.categorize(["A A1"], tree, level_synchronous=level_synchronous)
+    )
+
+    assert outputs[0].result == ["A", "A1"]
+    assert outputs[0].metadata.retry_count == 1
+
+
+class LimitRecordingTreeClient(RateLimitedTreeClient):
+    """
+    Records the requests in flight of the limiter on every attempt.
+    """
+
+    def __init__(self, limiter):
+        super().__init__()
+        self.limiter = limiter
+        self.in_flight = []
+
+    async def _create(self, **kwargs):
+        self.in_flight.append(self.limiter.in_flight)
+        return await super()._create(**kwargs)
+
+
+def test_concurrency_limiter_sees_every_attempt():
+    tree = CategoryTree()
+    tree.add_node("A", "root")
+    tree.add_node("A1", "A")
+    # A frozen clock keeps the latencies out of the limit
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, clock=lambda: 0.0)
+    client = LimitRecordingTreeClient(limiter)
+    tool = BatchTheTool(
+        client=client,
+        model="model",
+        raise_on_error=False,
+        retry_policy=RetryPolicy(initial_delay=0),
+        concurrency_limiter=limiter,
+    )
+
+    outputs = asyncio.run(tool.categorize(["A A1", "A A1", "A A1"], tree))
+
+    # The retried 429 never reaches the tool, but still cuts the limit
+    assert [output.result for output in outputs] == [["A", "A1"]] * 3
+    assert limiter.limit == 4
+    # Every attempt of every tree level holds a slot of its own
+    assert len(client.in_flight) == 7
+    assert min(client.in_flight) >= 1
+    assert limiter.in_flight == 0
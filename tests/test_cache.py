@@ -0,0 +1,123 @@
+from pydantic import BaseModel
+
+from texttools.core import MemoryCache, Operator, SQLiteCache
+
+
+def test_lru_eviction():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert len(cache) == 2
+
+
+def test_byte_size_eviction():
+    cache = MemoryCache(max_entries=None, max_bytes=10)
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+    cache.set("c", b"12345")
+    assert cache.get("a") is None
+    assert cache.size_bytes == 10
+
+
+def test_ttl_expiry():
+    cache = MemoryCache(ttl=0)
+    cache.set("a", b"1")
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_persists_across_instances(tmp_path):
+    path = tmp_path / "cache.db"
+    SQLiteCache(path).set("a", b"1")
+    cache = SQLiteCache(path)
+    assert cache.get("a") == b"1"
+    assert cache.stats()["entries"] == 1
+
+
+def test_sqlite_size_eviction(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.db", max_bytes=10)
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+    cache.set("c", b"12345")
+    assert cache.get("a") is None
+    assert cache.get("c") == b"12345"
+    assert cache.stats()["size_bytes"] <= 10
+
+
+def test_sqlite_ttl_and_vacuum(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.db", ttl=0)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") is None
+    cache.vacuum()
+    stats = cache.stats()
+    assert stats["entries"] == 0
+    assert stats["size_bytes"] == 0
+
+
+def test_operator_cache_hit(fake_client, run_kwargs):
+    client = fake_client
+    operator = Operator(client=client, model="model", cache=MemoryCache())
+
+    first = operator.run(**run_kwargs)
+    second = operator.run(**run_kwargs)
+
+    assert client.calls == 1
+    assert not first.cache_hit
+    assert second.cache_hit
+    assert second.result == "summary"
+    assert second.token_usage.total_tokens == 0
+
+
+def test_operator_cache_key_covers_options(fake_client, run_kwargs):
+    client = fake_client
+    operator = Operator(client=client, model="model", cache=MemoryCache())
+
+    operator.run(**run_kwargs)
+    operator.run(**{**run_kwargs, "temperature": 0.5})
+    operator.run(**{**run_kwargs, "with_analysis": True})
+
+    assert client.calls == 4
+
+
+class Inner(BaseModel):
+    name: str
+
+
+class Nested(BaseModel):
+    result: Inner
+
+
+def test_cache_hit_keeps_the_result_type(fake_client, run_kwargs):
+    fake_client.parsed = Nested(result=Inner(name="x"))
+    operator = Operator(client=fake_client, model="model", cache=MemoryCache())
+    kwargs = {**run_kwargs, "output_model": Nested}
+
+    first = operator.run(**kwargs)
+    second = operator.run(**kwargs)
+
+    assert second.cache_hit
+    assert second.result == first.result == Inner(name="x")
+
+
+class TruncatingCache(MemoryCache):
+    """
+    Stores only the first half of every entry, like an interrupted write.
+    """
+
+    def set(self, key, value):
+        super().set(key, value[: len(value) // 2])
+
+
+def test_corrupt_cache_entry_is_a_miss(fake_client, run_kwargs):
+    operator = Operator(client=fake_client, model="model", cache=TruncatingCache())
+
+    operator.run(**run_kwargs)
+    output = operator.run(**run_kwargs)
+
+    assert fake_client.calls == 2
+    assert not output.cache_hit
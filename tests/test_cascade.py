@@ -0,0 +1,89 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from texttools import TheTool
+
+
+class CascadeClient:
+    """
+    Answers is_question with a fixed label probability per model.
+    """
+
+    def __init__(self, probs):
+        self.probs = probs
+        self.models = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        model = kwargs["model"]
+        self.models.append(model)
+        prob = self.probs[model]
+        tokens = [
+            SimpleNamespace(token='{"result":', logprob=0.0, top_logprobs=[]),
+            SimpleNamespace(
+                token="true",
+                logprob=math.log(prob),
+                top_logprobs=[
+                    SimpleNamespace(token="true", logprob=math.log(prob)),
+                    SimpleNamespace(token="false", logprob=math.log(1 - prob)),
+                ],
+            ),
+            SimpleNamespace(token="}", logprob=0.0, top_logprobs=[]),
+        ]
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(content='{"result":true}'),
+                    logprobs=SimpleNamespace(content=tokens),
+                )
+            ],
+            usage=SimpleNamespace(
+                prompt_tokens=10, completion_tokens=5, total_tokens=15
+            ),
+        )
+
+
+@pytest.mark.parametrize(
+    ("small_prob", "expected_models", "expected_tier"),
+    [(0.95, ["small"], 0), (0.6, ["small", "large"], 1)],
+)
+def test_cascade_escalates_below_the_threshold(
+    small_prob, expected_models, expected_tier
+):
+    client = CascadeClient({"small": small_prob, "large": 0.99})
+    tool = TheTool(
+        client=client,
+        model="large",
+        cascade_models=["small"],
+        cascade_threshold={"is_question": 0.9},
+    )
+
+    output = tool.is_question("Is it raining?")
+
+    assert client.models == expected_models
+    assert output.result is True
+    assert output.label_probs is None
+    assert output.metadata.processed_by == expected_models[-1]
+    assert output.metadata.cascade_tier == expected_tier
+    assert [usage.total_tokens for usage in output.metadata.tier_token_usage] == [
+        15,
+        15 * expected_tier,
+    ]
+    assert output.metadata.token_usage.total_tokens == 15 * len(expected_models)
+
+
+def test_tools_missing_from_the_thresholds_skip_the_cascade():
+    client = CascadeClient({"small": 0.99, "large": 0.99})
+    tool = TheTool(
+        client=client,
+        model="large",
+        cascade_models=["small"],
+        cascade_threshold={"categorize": 0.9},
+    )
+
+    output = tool.is_question("Is it raining?")
+
+    assert client.models == ["large"]
+    assert output.metadata.cascade_tier == 1
@@ -0,0 +1,61 @@
+import pytest
+
+from texttools import CategoryIndex
+
+
+@pytest.fixture
+def index():
+    return CategoryIndex(
+        {
+            "Running shoes": "Footwear for jogging and marathons",
+            "Hiking boots": "Footwear for mountain trails",
+            "Coffee makers": "Machines that brew coffee",
+            "Tea kettles": None,
+        }
+    )
+
+
+def test_shortlist_ranks_matching_categories(index):
+    names, recall = index.shortlist("Lightweight shoes for a marathon", 2)
+
+    assert names[0] == "Running shoes"
+    assert recall == pytest.approx(1.0)
+
+
+def test_shortlist_recall_is_the_score_share(index):
+    names, recall = index.shortlist("Footwear for coffee lovers", 1)
+
+    assert len(names) == 1
+    assert 0 < recall < 1
+
+
+def test_shortlist_leaves_out_unmatched_categories(index):
+    names, recall = index.shortlist("Machines that brew coffee", 3)
+
+    assert names == ["Coffee makers"]
+    assert recall == pytest.approx(1.0)
+
+
+def test_shortlist_without_overlap_offers_every_category(index):
+    assert index.shortlist("Something unrelated", 2) == (index.names, 1.0)
+
+
+def test_shortlist_without_overlap_can_raise():
+    index = CategoryIndex(["Running shoes", "Coffee makers"], no_match="raise")
+
+    with pytest.raises(ValueError):
+        index.shortlist("Something unrelated", 1)
+
+
+def test_index_of_categories_without_terms():
+    index = CategoryIndex(["!", "?"])
+
+    assert index.score("anything") == {}
+    assert index.shortlist("anything", 1) == (["!", "?"], 1.0)
+
+
+def test_render_uses_descriptions(index):
+    assert index.render(["Tea kettles", "Coffee makers"]) == [
+        "Tea kettles",
+        "Category Name: Coffee makers, Description: Machines that brew coffee",
+    ]
@@ -46,3 +46,32 @@ def test_remove_root(tree):
 def test_remove_none(tree):
     with pytest.raises(ValueError, match="Category: ایجاب not found"):
         tree.remove_node("ایجاب")
+
+
+def test_remove_subtree_updates_max_depth(tree):
+    tree.remove_node("فلسفه ذهن")
+
+    assert tree.get_max_depth() == 2
+    assert tree.get_node("مغز و ترشحات") is None
+
+
+def test_remove_node_moves_children_to_parent(tree):
+    tree.remove_node("ذهن و بدن", remove_children=False)
+
+    moved = tree.get_node("مغز و ترشحات")
+    assert moved.depth == 2
+    assert tree._find_parent("مغز و ترشحات").name == "فلسفه ذهن"
+    assert tree.get_max_depth() == 2
+
+
+def test_from_dict_indexes_parents(tree):
+    loaded = CategoryTree.from_dict(tree.dump_tree())
+
+    assert loaded.get_max_depth() == 3
+    assert loaded._find_parent("آگاهی").name == "فلسفه ذهن"
+
+
+def test_leaf_paths(tree):
+    assert tree.get_path("مغز و ترشحات") == ["فلسفه ذهن", "ذهن و بدن", "مغز و ترشحات"]
+    assert ["متافیزیک", "امکان و ضرورت"] in tree.get_leaf_paths()
+    assert len(tree.get_leaf_paths()) == 5
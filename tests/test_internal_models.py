@@ -0,0 +1,118 @@
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+from texttools.core import (
+    OperatorUtils,
+    TokenUsage,
+    TokenUsageAccumulator,
+    create_literal_model,
+)
+from texttools.core.internal_models import CompletionUsage
+
+
+def test_literal_model_is_memoized():
+    model = create_literal_model(["Science", "Art"])
+    assert create_literal_model(["Science", "Art"]) is model
+    assert create_literal_model(["Art", "Science"]) is not model
+
+
+def test_literal_model_schema_is_precomputed():
+    model = create_literal_model(["Science", "Art"])
+    response_format = OperatorUtils.get_response_format(model)
+
+    assert OperatorUtils.get_response_format(model) is response_format
+    schema = response_format["json_schema"]["schema"]
+    assert schema["properties"]["result"]["enum"] == ["Science", "Art"]
+
+
+class Entity(BaseModel):
+    name: str
+    note: str | None = None
+
+
+class Entities(BaseModel):
+    result: list[Entity]
+
+
+def test_response_format_is_strict():
+    response_format = OperatorUtils.get_response_format(Entities)
+    schema = response_format["json_schema"]["schema"]
+    entity = schema["$defs"]["Entity"]
+
+    assert response_format["json_schema"]["strict"] is True
+    assert response_format["json_schema"]["name"] == "Entities"
+    assert schema["additionalProperties"] is False
+    assert entity["additionalProperties"] is False
+    assert entity["required"] == ["name", "note"]
+    assert "default" not in entity["properties"]["note"]
+
+
+class Tone(str, Enum):
+    formal = "f"
+    relaxed = "r"
+
+
+class Address(BaseModel):
+    city: str
+
+
+class Contact(BaseModel):
+    address: Address = Field(description="Postal address")
+    tone: Tone = Tone.relaxed
+    tags: list[str]
+
+
+class ContactOutput(BaseModel):
+    result: Contact
+
+
+def test_response_format_inlines_refs_with_siblings():
+    schema = OperatorUtils.get_response_format(ContactOutput)["json_schema"]["schema"]
+    properties = schema["$defs"]["Contact"]["properties"]
+
+    assert properties["address"] == {
+        "description": "Postal address",
+        "properties": {"city": {"title": "City", "type": "string"}},
+        "required": ["city"],
+        "title": "Address",
+        "type": "object",
+        "additionalProperties": False,
+    }
+    # Without its default, the enum field is a plain $ref again
+    assert properties["tone"] == {"$ref": "#/$defs/Tone"}
+    assert schema["$defs"]["Contact"]["required"] == ["address", "tone", "tags"]
+
+
+def make_usage(prompt_tokens: int, completion_tokens: int) -> TokenUsage:
+    return TokenUsage(
+        completion_usage=CompletionUsage(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        ),
+        total_tokens=prompt_tokens + completion_tokens,
+    )
+
+
+def test_token_usage_add_leaves_operands_unchanged():
+    first = make_usage(10, 5)
+    usage = first
+    usage += make_usage(1, 1)
+
+    assert usage is not first
+    assert first == make_usage(10, 5)
+    assert usage.total_tokens == 17
+
+
+def test_token_usage_sum():
+    usages = [make_usage(10, 5), None, make_usage(1, 1)]
+    assert TokenUsage.sum(usages) == make_usage(11, 6)
+    assert TokenUsage.sum([]) == TokenUsage()
+
+
+def test_token_usage_accumulator():
+    accumulator = TokenUsageAccumulator()
+    accumulator += make_usage(10, 5)
+    accumulator.add(make_usage(1, 1))
+    assert accumulator.to_token_usage() == make_usage(11, 6)
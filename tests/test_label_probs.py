@@ -0,0 +1,197 @@
+import asyncio
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from texttools import AsyncTheTool, CategoryTree, TheTool
+from texttools.core import OperatorUtils
+
+
+def make_token(token, prob, alternatives=()):
+    return SimpleNamespace(
+        token=token,
+        logprob=math.log(prob),
+        top_logprobs=[
+            SimpleNamespace(token=alt, logprob=math.log(alt_prob))
+            for alt, alt_prob in alternatives
+        ],
+    )
+
+
+def make_label_completion(tokens):
+    content = "".join(token.token for token in tokens)
+    return SimpleNamespace(
+        choices=[
+            SimpleNamespace(
+                message=SimpleNamespace(content=content),
+                logprobs=SimpleNamespace(content=tokens),
+            )
+        ],
+        usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+    )
+
+
+def test_label_probs_follow_the_generated_tokens():
+    completion = make_label_completion(
+        [
+            make_token('{"reason": "x", "result": "', 1.0),
+            make_token("Sci", 0.6, [("Sci", 0.6), ("Sports", 0.3)]),
+            make_token("ence", 0.9, [("ence", 0.9), ("-fi", 0.1)]),
+            make_token('"}', 1.0),
+        ]
+    )
+
+    label_probs = OperatorUtils.extract_label_probs(
+        completion, ["Science", "Sci-fi", "Sports", "Art"]
+    )
+
+    assert label_probs["Science"] == pytest.approx(0.54)
+    assert label_probs["Sci-fi"] == pytest.approx(0.06)
+    assert label_probs["Sports"] == pytest.approx(0.3)
+    assert label_probs["Art"] == 0.0
+
+
+def test_bool_label_probs_compare_json_values():
+    completion = make_label_completion(
+        [
+            make_token('{"result":', 1.0),
+            make_token("true", 0.8, [("true", 0.8), ("false", 0.2)]),
+            make_token("}", 1.0),
+        ]
+    )
+
+    label_probs = OperatorUtils.extract_label_probs(completion, [True, False])
+
+    assert label_probs == pytest.approx({"true": 0.8, "false": 0.2})
+
+
+def test_label_probs_of_a_guided_choice():
+    completion = make_label_completion(
+        [
+            make_token("Sci", 0.6, [("Sci", 0.6), ("Sports", 0.3)]),
+            make_token("ence", 0.9, [("ence", 0.9), ("-fi", 0.1)]),
+        ]
+    )
+
+    label_probs = OperatorUtils.extract_label_probs(
+        completion, ["Science", "Sci-fi", "Sports"], plain=True
+    )
+
+    assert label_probs == pytest.approx(
+        {"Science": 0.54, "Sci-fi": 0.06, "Sports": 0.3}
+    )
+
+
+def test_score_labels_caps_the_label_completion():
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return make_label_completion(
+            [
+                make_token('{"result":', 1.0),
+                make_token("false", 0.7, [("false", 0.7), ("true", 0.3)]),
+                make_token("}", 1.0),
+            ]
+        )
+
+    client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    tool = TheTool(client=client, model="model")
+
+    output = tool.is_question("Nice weather", score_labels=True)
+
+    assert output.result is False
+    assert output.label_probs == pytest.approx({"true": 0.3, "false": 0.7})
+    assert requests[0]["logprobs"] is True
+    assert requests[0]["max_completion_tokens"] == OperatorUtils.label_token_budget(
+        [True, False]
+    )
+
+
+class AsyncLabelClient:
+    """
+    Answers every level with the most likely label of a fixed distribution.
+    """
+
+    def __init__(self, distributions):
+        self.distributions = distributions
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        schema = kwargs["response_format"]["json_schema"]["schema"]
+        labels = schema["properties"]["result"]["enum"]
+        distribution = self.distributions[labels[0]]
+        label = max(distribution, key=distribution.get)
+        return make_label_completion(
+            [
+                make_token('{"reason": "x", "result": "', 1.0),
+                make_token(label, distribution[label], distribution.items()),
+                make_token('"}', 1.0),
+            ]
+        )
+
+
+@pytest.fixture
+def tree():
+    tree = CategoryTree()
+    for name, parent in [("A", "root"), ("B", "root")]:
+        tree.add_node(name, parent)
+    for name, parent in [("A1", "A"), ("A2", "A"), ("B1", "B"), ("B2", "B")]:
+        tree.add_node(name, parent)
+    return tree
+
+
+@pytest.fixture
+def label_client():
+    return AsyncLabelClient(
+        {
+            "A": {"A": 0.55, "B": 0.45},
+            "A1": {"A1": 0.5, "A2": 0.5},
+            "B1": {"B1": 0.9, "B2": 0.1},
+        }
+    )
+
+
+def test_beam_search_finds_the_most_likely_path(tree, label_client):
+    tool = AsyncTheTool(client=label_client, model="model")
+
+    greedy = asyncio.run(tool.categorize("text", tree))
+    beam = asyncio.run(tool.categorize("text", tree, beam_width=2))
+
+    assert greedy.result == ["A", "A1"]
+    assert beam.result == ["B", "B1"]
+    assert beam.metadata.token_usage.completion_usage.total_tokens == 45
+
+
+def test_flat_tree_falls_back_on_low_confidence(tree, label_client):
+    label_client.distributions["A > A1"] = {"B > B2": 0.3, "A > A1": 0.25}
+    tool = AsyncTheTool(client=label_client, model="model")
+
+    confident = asyncio.run(
+        tool.categorize("text", tree, flatten_tree=True, min_confidence=0.2)
+    )
+    fallback = asyncio.run(
+        tool.categorize("text", tree, flatten_tree=True, min_confidence=0.5)
+    )
+
+    assert confident.result == ["B", "B2"]
+    assert confident.label_probs["B > B2"] == pytest.approx(0.3)
+    assert confident.metadata.token_usage.total_tokens == 15
+    assert fallback.result == ["A", "A1"]
+    assert fallback.metadata.token_usage.total_tokens == 45
+
+
+def test_flat_tree_rejects_names_with_the_path_separator(label_client):
+    tree = CategoryTree()
+    tree.add_node("A > B", "root")
+    tree.add_node("A", "root")
+    tree.add_node("B", "A")
+    tool = AsyncTheTool(client=label_client, model="model")
+
+    with pytest.raises(ValueError, match="path separator"):
+        asyncio.run(tool.categorize("text", tree, flatten_tree=True))
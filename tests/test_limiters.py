@@ -0,0 +1,176 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from texttools import (
+    AdaptiveConcurrencyLimiter,
+    AsyncTheTool,
+    RateLimiter,
+    TokenBudgetLimiter,
+)
+from texttools.core import LLMError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_limit_grows_only_while_it_is_used():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+
+    async def run_sequentially():
+        for _ in range(20):
+            await limiter.acquire()
+            limiter.release(latency=0.1)
+
+    async def run_saturated():
+        for _ in range(20):
+            slots = limiter.limit
+            for _ in range(slots):
+                await limiter.acquire()
+            for _ in range(slots):
+                limiter.release(latency=0.1)
+
+    asyncio.run(run_sequentially())
+    assert limiter.limit == 2
+
+    asyncio.run(run_saturated())
+    assert limiter.limit == 4
+    assert limiter.latency == limiter.baseline_latency == 0.1
+
+
+def test_limit_is_cut_on_rate_limits_and_latency_spikes():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, clock=clock)
+
+    async def run():
+        await limiter.acquire()
+        limiter.release(latency=0.1, error=LLMError("rate limited", status_code=429))
+        assert limiter.limit == 4
+
+        for latency in (0.1, 5.0):
+            clock.now += 10
+            await limiter.acquire()
+            limiter.release(latency=latency)
+
+    asyncio.run(run())
+
+    assert limiter.limit == 2
+
+
+def test_one_cut_per_latency_period():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, clock=clock)
+    rate_limited = LLMError("rate limited", status_code=429)
+
+    async def run():
+        await limiter.acquire()
+        limiter.release(latency=1.0)
+        for _ in range(2):
+            await limiter.acquire()
+            limiter.release(error=rate_limited)
+
+    asyncio.run(run())
+    assert limiter.limit == 4
+
+    clock.now += 1.0
+    asyncio.run(run())
+    assert limiter.limit == 2
+
+
+def test_waiters_are_admitted_in_order_within_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    order = []
+    peak = 0
+
+    async def task(index):
+        nonlocal peak
+        async with limiter:
+            peak = max(peak, limiter.in_flight)
+            order.append(index)
+            await asyncio.sleep(0)
+
+    async def run():
+        await asyncio.gather(*(task(index) for index in range(6)))
+
+    asyncio.run(run())
+
+    assert order == list(range(6))
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+def test_rate_limiter_waits_for_the_quota_to_refill():
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=600)
+
+    asyncio.run(limiter.acquire(500))
+
+    assert limiter.available_requests == pytest.approx(1, abs=0.01)
+    assert limiter.available_tokens == pytest.approx(100, abs=1)
+    # 10 tokens per second refill the missing 200 tokens in about 20 seconds
+    assert limiter._get_delay(300) == pytest.approx(20, abs=0.1)
+    assert limiter._get_delay(10_000) == pytest.approx(50, abs=0.1)
+
+
+def test_rate_limiter_settles_estimates_with_the_reported_usage():
+    async def create(**kwargs):
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(content='{"result": "summary"}'),
+                    logprobs=None,
+                )
+            ],
+            usage=usage,
+        )
+
+    client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    limiter = RateLimiter(tokens_per_minute=6_000)
+    tool = AsyncTheTool(client=client, model="model", rate_limiter=limiter)
+
+    asyncio.run(tool.summarize("Some text", max_completion_tokens=1_000))
+
+    # The bucket refills 0.1 tokens per millisecond while the call runs
+    assert limiter.available_tokens == pytest.approx(6_000 - 15, abs=1)
+
+
+def test_token_limiter_admits_in_order_within_the_budget():
+    limiter = TokenBudgetLimiter(max_tokens=100)
+    admitted = []
+
+    async def request(name, tokens):
+        await limiter.acquire(tokens)
+        admitted.append(name)
+
+    async def run():
+        await limiter.acquire(60)
+        large = asyncio.create_task(request("large", 50))
+        small = asyncio.create_task(request("small", 10))
+        await asyncio.sleep(0)
+        # The small request fits, but waits behind the large one
+        assert admitted == []
+
+        limiter.release(60)
+        await asyncio.gather(large, small)
+
+    asyncio.run(run())
+
+    assert admitted == ["large", "small"]
+    assert limiter.in_flight_tokens == 60
+
+
+def test_token_limiter_reserves_prompt_and_completion_tokens():
+    limiter = TokenBudgetLimiter(max_tokens=1_000, default_completion_tokens=200)
+    messages = [{"role": "user", "content": "x" * 400}]
+
+    assert limiter.estimate_tokens(messages, 300) == 3 + 4 + 100 + 300
+    assert limiter.estimate_tokens(messages, None) == 3 + 4 + 100 + 200
+    assert limiter.estimate_tokens(messages, 5_000) == 1_000
@@ -0,0 +1,110 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from texttools.core import (
+    CompactLogprobs,
+    LogprobsSummary,
+    MemoryCache,
+    Operator,
+    OperatorUtils,
+)
+from texttools.models import ToolOutput, ToolOutputMetadata
+
+
+def make_token(token, prob, alternatives=()):
+    return SimpleNamespace(
+        token=token,
+        logprob=math.log(prob),
+        top_logprobs=[
+            SimpleNamespace(token=alt, logprob=math.log(alt_prob))
+            for alt, alt_prob in alternatives
+        ],
+    )
+
+
+@pytest.fixture
+def completion():
+    content = [
+        make_token('{"', 1.0),
+        make_token("result", 1.0),
+        make_token('":"', 1.0),
+        make_token("Science", 0.8, [("Science", 0.8), ("Art", 0.15), ('"', 0.05)]),
+        make_token('"}', 1.0),
+    ]
+    choice = SimpleNamespace(logprobs=SimpleNamespace(content=content))
+    return SimpleNamespace(choices=[choice])
+
+
+def test_full_format(completion):
+    logprobs = OperatorUtils.extract_logprobs(completion)
+    assert logprobs == [
+        {
+            "token": "Science",
+            "prob": 0.8,
+            "top_alternatives": [
+                {"token": "Science", "prob": 0.8},
+                {"token": "Art", "prob": 0.15},
+            ],
+        }
+    ]
+
+
+def test_compact_format_materializes_the_same_items(completion):
+    compact = OperatorUtils.extract_logprobs(completion, "compact")
+    assert isinstance(compact, CompactLogprobs)
+    assert compact.to_list() == OperatorUtils.extract_logprobs(completion)
+    assert compact[-1]["token"] == "Science"
+
+    merged = OperatorUtils.merge_logprobs([compact, compact])
+    assert len(merged) == 2
+    assert merged[1] == compact[0]
+
+
+def test_compact_logprobs_survive_the_cache(completion, run_kwargs):
+    completion.choices[0].message = SimpleNamespace(content='{"result": "Science"}')
+    completion.usage = SimpleNamespace(
+        prompt_tokens=10, completion_tokens=5, total_tokens=15
+    )
+    client = SimpleNamespace(
+        chat=SimpleNamespace(
+            completions=SimpleNamespace(create=lambda **kwargs: completion)
+        )
+    )
+    operator = Operator(
+        client=client, model="model", cache=MemoryCache(), logprobs_format="compact"
+    )
+    run_kwargs["logprobs"] = True
+
+    miss = operator.run(**run_kwargs)
+    hit = operator.run(**run_kwargs)
+
+    assert hit.cache_hit
+    assert isinstance(hit.logprobs, CompactLogprobs)
+    assert hit.logprobs == miss.logprobs
+
+    # Tree levels and chunks may mix compact logprobs with plain lists
+    merged = OperatorUtils.merge_logprobs([miss.logprobs, hit.logprobs.to_list()])
+    assert isinstance(merged, CompactLogprobs)
+    assert merged.to_list() == miss.logprobs.to_list() * 2
+
+
+def test_summary_format(completion):
+    summary = OperatorUtils.extract_logprobs(completion, "summary")
+    assert summary.token_count == 1
+    assert summary.min_prob == pytest.approx(0.8)
+    assert summary.mean_entropy > 0
+
+    merged = LogprobsSummary.merge([summary, LogprobsSummary()])
+    assert merged.token_count == 1
+    assert merged.mean_prob == pytest.approx(0.8)
+
+
+def test_compact_logprobs_serialize_as_list(completion):
+    output = ToolOutput(
+        result="Science",
+        logprobs=OperatorUtils.extract_logprobs(completion, "compact"),
+        metadata=ToolOutputMetadata(tool_name="categorize"),
+    )
+    assert output.model_dump()["logprobs"][0]["token"] == "Science"
@@ -0,0 +1,28 @@
+from texttools.core.utils import TheToolUtils
+
+
+def test_separator_lines_are_removed():
+    text = "first\n*****\n  -----  \n\n   \nsecond"
+    assert TheToolUtils.normalize(text) == "first\nsecond"
+
+
+def test_typographic_punctuation():
+    text = "“quoted” it’s a–b wait… non\u00a0breaking zero\u200bwidth"
+    assert (
+        TheToolUtils.normalize(text)
+        == '"quoted" it\'s a-b wait... non breaking zerowidth'
+    )
+
+
+def test_blanks_are_collapsed():
+    assert TheToolUtils.normalize("a  b\tc \t d") == "a b c d"
+
+
+def test_normalize_many_matches_normalize():
+    texts = ["a  b", "x\n***\ny", "“q”"]
+    assert TheToolUtils.normalize_many(texts) == [
+        TheToolUtils.normalize(text) for text in texts
+    ]
+    assert TheToolUtils.normalize_many(texts, max_workers=2, min_total_chars=0) == [
+        TheToolUtils.normalize(text) for text in texts
+    ]
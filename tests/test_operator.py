@@ -0,0 +1,141 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from texttools.core import (
+    Bool,
+    ListStr,
+    Operator,
+    OperatorUtils,
+    Str,
+    create_literal_model,
+)
+from texttools.core.internal_models import create_inline_analysis_model
+
+
+def test_analysis_runs_before_completion(fake_client, run_kwargs):
+    operator = Operator(client=fake_client, model="model")
+    output = operator.run(**{**run_kwargs, "with_analysis": True})
+
+    assert fake_client.calls == 2
+    assert output.analysis == "analysis"
+    assert output.token_usage.analyze_usage.total_tokens == 15
+
+
+def test_precomputed_analysis_is_reused(fake_client, run_kwargs):
+    operator = Operator(client=fake_client, model="model")
+    output = operator.run(
+        **{**run_kwargs, "with_analysis": True}, analysis="cached analysis"
+    )
+
+    assert fake_client.calls == 1
+    assert output.analysis == "cached analysis"
+    assert output.token_usage.analyze_usage.total_tokens == 0
+    assert "cached analysis" in fake_client.requests[0]["messages"][0]["content"]
+
+
+def test_vllm_backend_sends_guided_choice(fake_client, run_kwargs):
+    fake_client.parsed = Bool(result=True)
+    operator = Operator(client=fake_client, model="model", decoding_backend="vllm")
+    output = operator.run(**{**run_kwargs, "output_model": Bool, "priority": 1})
+
+    request = fake_client.requests[0]
+    assert output.result is True
+    assert "response_format" not in request
+    assert request["extra_body"] == {"guided_choice": ["true", "false"], "priority": 1}
+
+
+def test_vllm_backend_guides_other_models_with_a_schema():
+    assert "guided_regex" in OperatorUtils.get_guided_params(Str)
+    assert OperatorUtils.get_guided_params(ListStr) == {
+        "guided_json": ListStr.model_json_schema()
+    }
+    assert OperatorUtils.get_guided_params(
+        create_literal_model(["a", "b"], with_reason=False)
+    ) == {"guided_choice": ["a", "b"]}
+
+
+class ConfidenceClient:
+    """
+    Answers the main completion with true at the given probability.
+    """
+
+    def __init__(self, prob):
+        self.prob = prob
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        tokens = [
+            SimpleNamespace(token=token, logprob=logprob, top_logprobs=[])
+            for token, logprob in (
+                ('{"result":', 0.0),
+                ("true", math.log(self.prob)),
+                ("}", 0.0),
+            )
+        ]
+        structured = "response_format" in kwargs
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(
+                        content='{"result":true}' if structured else "analysis"
+                    ),
+                    logprobs=SimpleNamespace(content=tokens) if structured else None,
+                )
+            ],
+            usage=SimpleNamespace(
+                prompt_tokens=10, completion_tokens=5, total_tokens=15
+            ),
+        )
+
+
+@pytest.mark.parametrize(
+    ("prob", "calls", "triggered"), [(0.95, 1, False), (0.5, 3, True)]
+)
+def test_adaptive_analysis_runs_only_when_uncertain(run_kwargs, prob, calls, triggered):
+    client = ConfidenceClient(prob)
+    operator = Operator(client=client, model="model", adaptive_analysis_threshold=0.9)
+    output = operator.run(
+        **{**run_kwargs, "with_analysis": "adaptive", "output_model": Bool}
+    )
+
+    assert client.calls == calls
+    assert output.analysis_triggered is triggered
+    assert output.analysis == ("analysis" if triggered else None)
+    assert output.logprobs is None
+    assert output.token_usage.total_tokens == 15 * calls
+
+
+def test_inline_analysis_uses_a_single_completion(fake_client, run_kwargs):
+    fake_client.parsed = create_inline_analysis_model(Str)(
+        analysis="inline analysis", result="summary"
+    )
+    operator = Operator(client=fake_client, model="model")
+    output = operator.run(**{**run_kwargs, "with_analysis": "inline"})
+
+    assert fake_client.calls == 1
+    assert output.analysis == "inline analysis"
+    assert output.result == "summary"
+    schema = fake_client.requests[0]["response_format"]["json_schema"]["schema"]
+    assert list(schema["properties"]) == ["analysis", "result"]
+
+
+def test_prefix_cache_layout_keeps_the_prefix_static(fake_client, run_kwargs):
+    operator = Operator(
+        client=fake_client,
+        model="model",
+        prompt_layout="prefix_cache",
+        prompt_cache_key="summaries",
+    )
+    for text in ("First text", "Second text"):
+        operator.run(**{**run_kwargs, "text": text, "user_prompt": "Be brief"})
+
+    first, second = (request["messages"] for request in fake_client.requests)
+    assert first[0]["role"] == "system"
+    assert first[0] == second[0]
+    assert first[1]["content"].startswith("First text")
+    assert first[1]["content"].endswith("Consider this instruction: Be brief")
+    assert fake_client.requests[0]["extra_body"] == {"prompt_cache_key": "summaries"}
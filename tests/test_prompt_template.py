@@ -0,0 +1,42 @@
+import pytest
+
+from texttools.core import OperatorUtils, PromptError, PromptTemplate
+
+
+def test_template_is_split_into_segments():
+    template = PromptTemplate("Categories: {category_list}\nText: {text}\n{{}}")
+    assert template.placeholders == ["category_list", "text"]
+    assert template.segments == ["Categories: ", "\nText: ", "\n{}"]
+
+
+def test_render_matches_str_format():
+    raw = 'Respond in JSON:\n{{"result": ...}}\n{category_list}\n{text}'
+    values = {"text": "Hello", "category_list": ["a", "b"]}
+    assert PromptTemplate(raw).render(values) == raw.format(**values)
+
+
+def test_missing_variable():
+    with pytest.raises(PromptError, match="Missing template variable"):
+        PromptTemplate("{text} {target_language}").render({"text": "Hello"})
+
+
+def test_prompt_is_compiled_once_per_mode():
+    templates = OperatorUtils.load_prompt("to_question.yaml", "from_text")
+    assert OperatorUtils.load_prompt("to_question.yaml", "from_text") is templates
+    assert "number_of_questions" in templates["main_template"].placeholders
+
+
+def test_unknown_mode():
+    with pytest.raises(PromptError, match="Mode 'unknown' not found"):
+        OperatorUtils.load_prompt("augment.yaml", "unknown")
+
+
+def test_render_split_cuts_before_the_text():
+    template = PromptTemplate("Categories: {category_list}\nText: {text}\nDone")
+    values = {"text": "Hello", "category_list": "a, b"}
+
+    assert template.render_split(values, "text") == (
+        "Categories: a, b\nText: ",
+        "Hello\nDone",
+    )
+    assert template.render_split(values, "source_text") == ("", template.render(values))
@@ -0,0 +1,136 @@
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from texttools.core import LLMError, MemoryCache, Operator, RetryPolicy
+
+
+def make_status_error(error_cls, status_code, headers=None):
+    response = SimpleNamespace(
+        status_code=status_code, headers=headers or {}, request=None
+    )
+    return error_cls("error", response=response, body=None)
+
+
+class FlakyClient:
+    """
+    Raises the given errors in order before answering like the fake client.
+    """
+
+    def __init__(self, fake_client, errors):
+        self.errors = list(errors)
+        self.attempts = 0
+        self._answer = fake_client.chat.completions.create
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self._answer(**kwargs)
+
+
+def test_transient_errors_are_retried(fake_client, run_kwargs):
+    client = FlakyClient(
+        fake_client,
+        [
+            make_status_error(openai.RateLimitError, 429),
+            make_status_error(openai.InternalServerError, 503),
+        ],
+    )
+    operator = Operator(
+        client=client, model="model", retry_policy=RetryPolicy(initial_delay=0)
+    )
+
+    output = operator.run(**run_kwargs)
+
+    assert client.attempts == 3
+    assert output.retry_count == 2
+    assert output.result == "summary"
+
+
+def test_client_errors_keep_their_status_code(fake_client, run_kwargs):
+    client = FlakyClient(fake_client, [make_status_error(openai.BadRequestError, 400)])
+    operator = Operator(
+        client=client, model="model", retry_policy=RetryPolicy(initial_delay=0)
+    )
+
+    with pytest.raises(LLMError) as error:
+        operator.run(**run_kwargs)
+
+    assert client.attempts == 1
+    assert error.value.status_code == 400
+
+
+def test_retry_after_wins_over_backoff():
+    policy = RetryPolicy(max_delay=10)
+
+    assert policy.get_delay(
+        0, make_status_error(openai.RateLimitError, 429, {"retry-after": "2"})
+    ) == pytest.approx(2)
+    assert policy.get_delay(
+        0, make_status_error(openai.RateLimitError, 429, {"retry-after-ms": "250"})
+    ) == pytest.approx(0.25)
+    assert policy.get_delay(
+        0, make_status_error(openai.RateLimitError, 429, {"retry-after": "60"})
+    ) == pytest.approx(10)
+    assert 0 <= policy.get_delay(3, make_status_error(openai.RateLimitError, 429)) <= 4
+
+
+@pytest.mark.parametrize("zone", ["GMT", "-0000"])
+def test_retry_after_http_dates(zone):
+    retry_at = datetime.now(UTC) + timedelta(seconds=5)
+    header = retry_at.strftime(f"%a, %d %b %Y %H:%M:%S {zone}")
+
+    delay = RetryPolicy().get_delay(
+        0, make_status_error(openai.RateLimitError, 429, {"retry-after": header})
+    )
+
+    assert 3 <= delay <= 5
+
+
+class RetriesRecordingClient:
+    """
+    Records the max_retries of the client copy each request is sent with.
+    """
+
+    def __init__(self, fake_client, max_retries=2, sent_with=None):
+        self.max_retries = max_retries
+        self.sent_with = sent_with if sent_with is not None else []
+        self._answer = fake_client.chat.completions.create
+        self._fake_client = fake_client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def with_options(self, max_retries):
+        return RetriesRecordingClient(self._fake_client, max_retries, self.sent_with)
+
+    def _create(self, **kwargs):
+        self.sent_with.append(self.max_retries)
+        return self._answer(**kwargs)
+
+
+def test_client_retries_are_left_to_the_policy(fake_client, run_kwargs):
+    client = RetriesRecordingClient(fake_client)
+
+    Operator(client=client, model="model").run(**run_kwargs)
+
+    assert client.sent_with == [0]
+
+
+def test_cache_hits_report_no_retries(fake_client, run_kwargs):
+    client = FlakyClient(fake_client, [make_status_error(openai.RateLimitError, 429)])
+    operator = Operator(
+        client=client,
+        model="model",
+        cache=MemoryCache(),
+        retry_policy=RetryPolicy(initial_delay=0),
+    )
+
+    first = operator.run(**run_kwargs)
+    second = operator.run(**run_kwargs)
+
+    assert first.retry_count == 1
+    assert second.cache_hit
+    assert second.retry_count == 0
@@ -0,0 +1,60 @@
+from time import perf_counter
+
+from texttools import TheTool
+from texttools.core import TokenUsage
+from texttools.core.internal_models import OperatorOutput
+from texttools.models import ToolOutput, ToolOutputMetadata
+
+
+def test_trusted_output_matches_validated_output():
+    data = {
+        "tool_name": "categorize",
+        "processed_by": "model",
+        "execution_time": 0.5,
+        "token_usage": TokenUsage(),
+        "cache_hit": True,
+    }
+    validated_metadata = ToolOutputMetadata(**data)
+    trusted_metadata = ToolOutputMetadata.model_construct(**data)
+    trusted_metadata.processed_at = validated_metadata.processed_at
+
+    validated = ToolOutput(result="Science", metadata=validated_metadata)
+    trusted = ToolOutput.model_construct(result="Science", metadata=trusted_metadata)
+
+    assert trusted == validated
+    assert trusted.model_dump_json() == validated.model_dump_json()
+
+
+def test_trusted_outputs_dont_share_errors():
+    metadata = ToolOutputMetadata.model_construct(tool_name="categorize")
+    first = ToolOutput.model_construct(metadata=metadata)
+    second = ToolOutput.model_construct(metadata=metadata)
+
+    first.errors.append("error")
+    assert second.errors == []
+
+
+def test_metadata_copies_every_shared_operator_field():
+    operator_output = OperatorOutput(
+        result="Science",
+        analysis=None,
+        logprobs=None,
+        processed_by="model",
+        token_usage=TokenUsage(),
+        cache_hit=True,
+        cascade_tier=1,
+        tier_token_usage=[TokenUsage()],
+        analysis_triggered=True,
+        retry_count=2,
+    )
+    tool = TheTool(client=None, model="model")
+
+    metadata = tool._metadata_from(
+        operator_output, "categorize", perf_counter(), shortlist_recall=0.5
+    )
+
+    shared = ToolOutputMetadata.model_fields.keys() & OperatorOutput.model_fields.keys()
+    for field in shared:
+        assert getattr(metadata, field) == getattr(operator_output, field)
+    assert metadata.shortlist_recall == 0.5
+    assert metadata.execution_time >= 0
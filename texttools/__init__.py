@@ -1,4 +1,27 @@
+from .core import (
+    AdaptiveConcurrencyLimiter,
+    CacheBackend,
+    CategoryIndex,
+    MemoryCache,
+    RateLimiter,
+    RetryPolicy,
+    SQLiteCache,
+    TokenBudgetLimiter,
+)
 from .models import CategoryTree
 from .tools import AsyncTheTool, BatchTheTool, TheTool
 
-__all__ = ["CategoryTree", "AsyncTheTool", "BatchTheTool", "TheTool"]
+__all__ = [
+    "AdaptiveConcurrencyLimiter",
+    "AsyncTheTool",
+    "BatchTheTool",
+    "CacheBackend",
+    "CategoryIndex",
+    "CategoryTree",
+    "MemoryCache",
+    "RateLimiter",
+    "RetryPolicy",
+    "SQLiteCache",
+    "TheTool",
+    "TokenBudgetLimiter",
+]
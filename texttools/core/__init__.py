@@ -1,3 +1,5 @@
+from .cache import CacheBackend, MemoryCache, SQLiteCache
+from .category_index import CategoryIndex
 from .exceptions import LLMError, PromptError, TextToolsError, ValidationError
 from .internal_models import (
     Bool,
@@ -6,12 +8,28 @@ from .internal_models import (
     ReasonListStr,
     Str,
     TokenUsage,
+    TokenUsageAccumulator,
     create_literal_model,
 )
-from .operators import AsyncOperator, Operator
-from .utils import OperatorUtils, TheToolUtils
+from .limiters import AdaptiveConcurrencyLimiter, RateLimiter, TokenBudgetLimiter
+from .logprobs import CompactLogprobs, LogprobsFormat, LogprobsSummary
+from .operators import AsyncCascadeOperator, AsyncOperator, CascadeOperator, Operator
+from .retry import RetryPolicy
+from .utils import (
+    DecodingBackend,
+    OperatorUtils,
+    PromptLayout,
+    PromptTemplate,
+    TheToolUtils,
+)
 
 __all__ = [
+    # Cache
+    "CacheBackend",
+    "MemoryCache",
+    "SQLiteCache",
+    # Category index
+    "CategoryIndex",
     # Exceptions
     "LLMError",
     "PromptError",
@@ -24,11 +42,27 @@ __all__ = [
     "ReasonListStr",
     "Str",
     "TokenUsage",
+    "TokenUsageAccumulator",
     "create_literal_model",
+    # Limiters
+    "AdaptiveConcurrencyLimiter",
+    "RateLimiter",
+    "TokenBudgetLimiter",
+    # Logprobs
+    "CompactLogprobs",
+    "LogprobsFormat",
+    "LogprobsSummary",
     # Operators
+    "AsyncCascadeOperator",
     "AsyncOperator",
+    "CascadeOperator",
     "Operator",
+    # Retry
+    "RetryPolicy",
     # Utils
+    "DecodingBackend",
     "OperatorUtils",
+    "PromptLayout",
+    "PromptTemplate",
     "TheToolUtils",
 ]
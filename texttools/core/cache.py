@@ -0,0 +1,292 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from time import monotonic, time
+from typing import Any, Protocol, runtime_checkable
+
+
+@runtime_checkable
+class CacheBackend(Protocol):
+    """
+    Interface for result cache stores used by the operators.
+    Keys are hex digests and values are serialized operator outputs.
+    """
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes) -> None: ...
+
+
+class MemoryCache:
+    """
+    In-memory LRU cache with optional TTL and byte-size eviction.
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = 10_000,
+        max_bytes: int | None = 256 * 1024 * 1024,
+        ttl: float | None = None,
+    ) -> None:
+        """
+        Arguments:
+            max_entries: Maximum number of entries to keep, None for no limit
+            max_bytes: Maximum total size of the stored values in bytes, None for no limit
+            ttl: Time in seconds after which an entry expires, None for no expiry
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= monotonic():
+                self._pop(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if self.max_bytes is not None and len(value) > self.max_bytes:
+            return
+
+        expires_at = monotonic() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+            self._entries[key] = (value, expires_at)
+            self._size += len(value)
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _pop(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._size -= len(value)
+
+    def _evict(self) -> None:
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._size > self.max_bytes)
+        ):
+            _, (value, _) = self._entries.popitem(last=False)
+            self._size -= len(value)
+
+
+class SQLiteCache:
+    """
+    Persistent cache stored in a SQLite database.
+    Uses WAL mode so that many processes on one host can share the same file.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            accessed_at REAL NOT NULL,
+            expires_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+        CREATE TABLE IF NOT EXISTS totals (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            size INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO totals (id, size) VALUES (0, 0);
+        CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+            UPDATE totals SET size = size + NEW.size WHERE id = 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+            UPDATE totals SET size = size + NEW.size - OLD.size WHERE id = 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+            UPDATE totals SET size = size - OLD.size WHERE id = 0;
+        END;
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int | None = 1024 * 1024 * 1024,
+        ttl: float | None = None,
+        busy_timeout: float = 30.0,
+    ) -> None:
+        """
+        Arguments:
+            path: Path of the database file, created if it doesn't exist
+            max_bytes: Maximum total size of the stored values in bytes, None for no limit
+            ttl: Time in seconds after which an entry expires, None for no expiry
+            busy_timeout: Time in seconds to wait for a lock held by another process
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+
+        with self._lock:
+            self._connection().executescript(self._SCHEMA)
+
+    def get(self, key: str) -> bytes | None:
+        now = time()
+
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if self.max_bytes is not None and len(value) > self.max_bytes:
+            return
+
+        now = time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    """
+                    INSERT INTO entries (key, value, size, accessed_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET
+                        value = excluded.value,
+                        size = excluded.size,
+                        accessed_at = excluded.accessed_at,
+                        expires_at = excluded.expires_at
+                    """,
+                    (key, value, len(value), now, expires_at),
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM entries")
+
+    def vacuum(self) -> None:
+        """
+        Removes expired entries and reclaims unused space in the database file.
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time(),),
+            )
+            conn.execute("VACUUM")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            conn = self._connection()
+            entries, expired = conn.execute(
+                """
+                SELECT COUNT(*), COALESCE(SUM(expires_at IS NOT NULL AND expires_at <= ?), 0)
+                FROM entries
+                """,
+                (time(),),
+            ).fetchone()
+            (size_bytes,) = conn.execute(
+                "SELECT size FROM totals WHERE id = 0"
+            ).fetchone()
+
+        return {
+            "entries": entries,
+            "expired_entries": expired,
+            "size_bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+            "file_size_bytes": self.path.stat().st_size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not be shared with forked worker processes
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._pid = os.getpid()
+
+        return self._conn
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self.max_bytes is None:
+            return
+
+        (size_bytes,) = conn.execute("SELECT size FROM totals WHERE id = 0").fetchone()
+        if size_bytes <= self.max_bytes:
+            return
+
+        # Evict least recently used entries down to 90% of the limit,
+        # so that the next writes don't trigger another eviction right away
+        conn.execute(
+            """
+            DELETE FROM entries WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS running_size
+                    FROM entries
+                )
+                WHERE running_size > ?
+            )
+            """,
+            (int(self.max_bytes * 0.9),),
+        )
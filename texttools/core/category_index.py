@@ -0,0 +1,116 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Literal
+
+_TERM_PATTERN = re.compile(r"\w+")
+
+
+class CategoryIndex:
+    """
+    BM25 inverted index over category names and descriptions.
+    Built once and reused to shortlist the candidate categories of each text,
+    so that very large category lists don't go into every prompt.
+    """
+
+    def __init__(
+        self,
+        categories: list[str] | dict[str, str | None],
+        k1: float = 1.5,
+        b: float = 0.75,
+        no_match: Literal["all", "raise"] = "all",
+    ) -> None:
+        """
+        Arguments:
+            categories: Category names, or a mapping of category names to descriptions
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            no_match: For a text that shares no term with any category, all -> shortlist every category, raise -> raise a ValueError
+        """
+        if not isinstance(categories, dict):
+            categories = dict.fromkeys(categories)
+
+        self.descriptions = categories
+        self.names = list(categories)
+        self.k1 = k1
+        self.b = b
+        self.no_match = no_match
+
+        # term -> list of (category position, term frequency)
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._lengths: list[int] = []
+
+        for position, (name, description) in enumerate(categories.items()):
+            terms = self.tokenize(f"{name} {description or ''}")
+            self._lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self._postings.setdefault(term, []).append((position, frequency))
+
+        count = len(self.names)
+        self._average_length = sum(self._lengths) / count if count else 0.0
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    @staticmethod
+    def tokenize(text: str) -> list[str]:
+        return _TERM_PATTERN.findall(text.casefold())
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def score(self, text: str) -> dict[int, float]:
+        """
+        Returns the BM25 score of every category that shares a term with the text,
+        keyed by the position of the category.
+        """
+        scores: dict[int, float] = {}
+        k1, b, average_length = self.k1, self.b, self._average_length
+
+        for term in set(self.tokenize(text)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+
+            idf = self._idf[term]
+            for position, frequency in postings:
+                # The average is 0 only when no category has a term
+                length_ratio = (
+                    self._lengths[position] / average_length if average_length else 1.0
+                )
+                norm = k1 * (1 - b + b * length_ratio)
+                scores[position] = scores.get(position, 0.0) + idf * (
+                    frequency * (k1 + 1) / (frequency + norm)
+                )
+
+        return scores
+
+    def shortlist(self, text: str, size: int) -> tuple[list[str], float]:
+        """
+        Returns up to `size` best matching category names and the share of the
+        total BM25 score they cover. Categories that share no term with the text
+        are left out, unrelated labels would only mislead the LLM.
+        """
+        scores = self.score(text)
+        if not scores:
+            if self.no_match == "raise":
+                raise ValueError("The text shares no term with any indexed category")
+            # Nothing is left out, so the whole score is covered
+            return list(self.names), 1.0
+
+        best = heapq.nlargest(size, scores.items(), key=lambda item: item[1])
+        score_share = sum(score for _, score in best) / sum(scores.values())
+        return [self.names[position] for position, _ in best], score_share
+
+    def render(self, names: list[str]) -> list[str]:
+        """
+        Formats the given categories for the categorize prompt.
+        """
+        return [
+            f"Category Name: {name}, Description: {self.descriptions[name]}"
+            if self.descriptions[name]
+            else name
+            for name in names
+        ]
@@ -13,7 +13,10 @@ class PromptError(TextToolsError):
 class LLMError(TextToolsError):
     """Errors from LLM API calls."""
 
-    pass
+    def __init__(self, message: str, status_code: int | None = None) -> None:
+        super().__init__(message)
+        # HTTP status code of the failed API call, if there was one
+        self.status_code = status_code
 
 
 class ValidationError(TextToolsError):
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-from typing import Any, Literal
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Any, Literal, Self
 
 from pydantic import BaseModel, Field, create_model
 
+from .logprobs import CompactLogprobs, LogprobsSummary
+
 
 class CompletionUsage(BaseModel):
     prompt_tokens: int = 0
@@ -18,8 +22,8 @@ class AnalyzeUsage(BaseModel):
 
 
 class TokenUsage(BaseModel):
-    completion_usage: CompletionUsage = CompletionUsage()
-    analyze_usage: AnalyzeUsage = AnalyzeUsage()
+    completion_usage: CompletionUsage = Field(default_factory=CompletionUsage)
+    analyze_usage: AnalyzeUsage = Field(default_factory=AnalyzeUsage)
     total_tokens: int = 0
 
     def __add__(self, other: TokenUsage) -> TokenUsage:
@@ -49,13 +53,82 @@ class TokenUsage(BaseModel):
             total_tokens=total_tokens,
         )
 
+    @classmethod
+    def sum(cls, usages: Iterable[TokenUsage | None]) -> TokenUsage:
+        """
+        Sums many usages, e.g. over the outputs of a batch, skipping missing ones.
+        """
+        accumulator = TokenUsageAccumulator()
+        for usage in usages:
+            if usage is not None:
+                accumulator.add(usage)
+        return accumulator.to_token_usage()
+
+
+class TokenUsageAccumulator:
+    """
+    Mutable token counter that converts to TokenUsage only when needed.
+    """
+
+    __slots__ = (
+        "analyze_completion_tokens",
+        "analyze_prompt_tokens",
+        "analyze_total_tokens",
+        "completion_completion_tokens",
+        "completion_prompt_tokens",
+        "completion_total_tokens",
+    )
+
+    def __init__(self) -> None:
+        self.completion_prompt_tokens = 0
+        self.completion_completion_tokens = 0
+        self.completion_total_tokens = 0
+        self.analyze_prompt_tokens = 0
+        self.analyze_completion_tokens = 0
+        self.analyze_total_tokens = 0
+
+    def add(self, usage: TokenUsage) -> None:
+        completion_usage = usage.completion_usage
+        analyze_usage = usage.analyze_usage
+        self.completion_prompt_tokens += completion_usage.prompt_tokens
+        self.completion_completion_tokens += completion_usage.completion_tokens
+        self.completion_total_tokens += completion_usage.total_tokens
+        self.analyze_prompt_tokens += analyze_usage.prompt_tokens
+        self.analyze_completion_tokens += analyze_usage.completion_tokens
+        self.analyze_total_tokens += analyze_usage.total_tokens
+
+    def __iadd__(self, usage: TokenUsage) -> Self:
+        self.add(usage)
+        return self
+
+    def to_token_usage(self) -> TokenUsage:
+        return TokenUsage.model_construct(
+            completion_usage=CompletionUsage.model_construct(
+                prompt_tokens=self.completion_prompt_tokens,
+                completion_tokens=self.completion_completion_tokens,
+                total_tokens=self.completion_total_tokens,
+            ),
+            analyze_usage=AnalyzeUsage.model_construct(
+                prompt_tokens=self.analyze_prompt_tokens,
+                completion_tokens=self.analyze_completion_tokens,
+                total_tokens=self.analyze_total_tokens,
+            ),
+            total_tokens=self.completion_total_tokens + self.analyze_total_tokens,
+        )
+
 
 class OperatorOutput(BaseModel):
     result: Any
     analysis: str | None
-    logprobs: list[dict[str, Any]] | None
+    logprobs: list[dict[str, Any]] | CompactLogprobs | LogprobsSummary | None
     processed_by: str
     token_usage: TokenUsage
+    cache_hit: bool = False
+    label_probs: dict[str, float] | None = None
+    cascade_tier: int | None = None
+    tier_token_usage: list[TokenUsage] | None = None
+    analysis_triggered: bool | None = None
+    retry_count: int = 0
 
 
 class Str(BaseModel):
@@ -82,18 +155,51 @@ class ReasonListStr(BaseModel):
 
 
 # Create a dynamic LiteralStr model
-def create_literal_model(allowed_values: list[str]) -> type[BaseModel]:
+def create_literal_model(
+    allowed_values: list[str], with_reason: bool = True
+) -> type[BaseModel]:
+    return _create_literal_model(tuple(allowed_values), with_reason)
+
+
+# Memoized so that the same category list always maps to the same model class
+@lru_cache(maxsize=1024)
+def _create_literal_model(
+    allowed_values: tuple[str, ...], with_reason: bool
+) -> type[BaseModel]:
     literal_type = Literal[*allowed_values]
+    fields = {}
 
-    LiteralStr = create_model(
-        "LiteralStr",
-        reason=(
+    if with_reason:
+        fields["reason"] = (
             str,
             Field(
                 ..., description="Explanation of why the input belongs to the category"
             ),
-        ),
+        )
+
+    LiteralStr = create_model(
+        "LiteralStr",
+        **fields,
         result=(literal_type, Field(..., description="Predicted category label")),
     )
 
     return LiteralStr
+
+
+# Memoized so that every output model maps to a single inline analysis model
+@lru_cache(maxsize=1024)
+def create_inline_analysis_model(output_model: type[BaseModel]) -> type[BaseModel]:
+    # The analysis comes first so that it is generated before the result
+    return create_model(
+        f"InlineAnalysis{output_model.__name__}",
+        analysis=(
+            str,
+            Field(
+                ..., description="Brief analysis of the input that leads to the output"
+            ),
+        ),
+        **{
+            name: (field.annotation, field)
+            for name, field in output_model.model_fields.items()
+        },
+    )
@@ -0,0 +1,393 @@
+import asyncio
+from collections import deque
+from collections.abc import Callable
+from time import monotonic
+from types import TracebackType
+from typing import Any, Self
+
+import openai
+
+from .exceptions import LLMError
+from .utils import OperatorUtils
+
+
+def _is_rate_limited(error: BaseException | None) -> bool:
+    if isinstance(error, openai.RateLimitError):
+        return True
+    return isinstance(error, LLMError) and error.status_code == 429
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limiter, usable wherever an asyncio.Semaphore is.
+    The limit grows by one per window of requests while latency stays near its
+    baseline and requests use the whole limit, and is cut multiplicatively on
+    latency spikes or rate-limit errors.
+    Waiters are admitted in arrival order.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 5,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        """
+        Arguments:
+            initial_limit: Number of concurrent requests allowed at the start
+            min_limit: The limit never goes below this value
+            max_limit: The limit never goes above this value
+            backoff: Factor applied to the limit on a latency spike or rate-limit error
+            tolerance: A smoothed latency above this multiple of the baseline latency counts as a spike
+            smoothing: Weight of the newest sample in the smoothed latency
+            clock: Time source in seconds for latencies and decrease periods
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Expected 1 <= min_limit <= initial_limit <= max_limit")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.clock = clock
+
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._started: dict[Any, float] = {}
+        self._latency: float | None = None
+        self._baseline_latency: float | None = None
+        self._last_decrease: float | None = None
+        # Whether a request used the whole limit since the last increase
+        self._saturated = False
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def latency(self) -> float | None:
+        """
+        Smoothed latency of the recent requests in seconds.
+        """
+        return self._latency
+
+    @property
+    def baseline_latency(self) -> float | None:
+        """
+        Latency in seconds the limiter considers normal for an unloaded server.
+        """
+        return self._baseline_latency
+
+    async def acquire(self) -> None:
+        if not self._waiters and self._in_flight < self.limit:
+            self._in_flight += 1
+            self._saturated = self._saturated or self._in_flight >= self.limit
+            return
+
+        # Waiting means the limit is in use
+        self._saturated = True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The slot may have been granted right before the cancellation
+            if not waiter.cancelled():
+                self._in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(
+        self, latency: float | None = None, error: BaseException | None = None
+    ) -> None:
+        """
+        Frees a slot and adjusts the limit from the latency or error of the request.
+        """
+        self._in_flight -= 1
+        self._record(latency, error)
+        self._wake()
+
+    async def __aenter__(self) -> Self:
+        await self.acquire()
+        self._started[asyncio.current_task()] = self.clock()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        started = self._started.pop(asyncio.current_task())
+        # Cancellations say nothing about the server
+        if isinstance(exc, asyncio.CancelledError):
+            self.release()
+        else:
+            self.release(self.clock() - started, exc)
+
+    def _record(self, latency: float | None, error: BaseException | None) -> None:
+        if _is_rate_limited(error):
+            self._decrease()
+            return
+
+        if latency is None or error is not None:
+            return
+
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += self.smoothing * (latency - self._latency)
+
+        # The baseline follows the lowest latency, and drifts up slowly so that
+        # it keeps up with requests that are slower for reasons other than load
+        if self._baseline_latency is None:
+            self._baseline_latency = latency
+        else:
+            self._baseline_latency = min(latency, self._baseline_latency * 1.01)
+
+        if self._latency > self.tolerance * self._baseline_latency:
+            self._decrease()
+        elif self._saturated:
+            # Additive increase: one more slot per window of `limit` requests.
+            # A limit that is not in use proves nothing about the server
+            self._saturated = False
+            self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+
+    def _decrease(self) -> None:
+        # At most one cut per latency period, requests already in flight
+        # still carry the latency of the old limit
+        now = self.clock()
+        if self._last_decrease is not None and now - self._last_decrease < (
+            self._latency or 0.0
+        ):
+            return
+
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+
+
+class RateLimiter:
+    """
+    Client-side token bucket limiter for requests per minute and tokens per minute quotas.
+    Every request takes its estimated tokens before it is sent, and the difference with
+    the usage reported by the server is settled when it returns.
+    Waiters are admitted in arrival order.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        chars_per_token: float = 4.0,
+    ) -> None:
+        """
+        Arguments:
+            requests_per_minute: Requests allowed per minute, None for no request quota
+            tokens_per_minute: Prompt and completion tokens allowed per minute, None for no token quota
+            chars_per_token: Characters per token used to estimate prompt tokens before a request is sent
+        """
+        if requests_per_minute is None and tokens_per_minute is None:
+            raise ValueError("Expected requests_per_minute or tokens_per_minute")
+
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.chars_per_token = chars_per_token
+
+        # The buckets start full, so a burst of up to one minute of quota goes out at once
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def available_requests(self) -> float | None:
+        if self.requests_per_minute is None:
+            return None
+        self._refill()
+        return self._requests
+
+    @property
+    def available_tokens(self) -> float | None:
+        """
+        Tokens left in the bucket, negative when past requests used more than estimated.
+        """
+        if self.tokens_per_minute is None:
+            return None
+        self._refill()
+        return self._tokens
+
+    def estimate_tokens(
+        self, messages: list[dict[str, str]], max_completion_tokens: int | None
+    ) -> int:
+        """
+        Tokens a request may use, counted against the quota before it is sent.
+        Without max_completion_tokens, the completion is only counted when it returns.
+        """
+        return OperatorUtils.estimate_prompt_tokens(messages, self.chars_per_token) + (
+            max_completion_tokens or 0
+        )
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """
+        Waits until the quotas allow one more request of `tokens` tokens, and takes them.
+        """
+        async with self._lock:
+            while True:
+                self._refill()
+                delay = self._get_delay(tokens)
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+
+            if self.requests_per_minute is not None:
+                self._requests -= 1
+            if self.tokens_per_minute is not None:
+                self._tokens -= tokens
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """
+        Settles the estimate taken by `acquire` against the usage of the completion.
+        """
+        if self.tokens_per_minute is None:
+            return
+        self._refill()
+        self._tokens = min(
+            float(self.tokens_per_minute),
+            self._tokens + estimated_tokens - actual_tokens,
+        )
+
+    def _refill(self) -> None:
+        now = monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+
+        if self.requests_per_minute is not None:
+            self._requests = min(
+                float(self.requests_per_minute),
+                self._requests + elapsed * self.requests_per_minute / 60,
+            )
+        if self.tokens_per_minute is not None:
+            self._tokens = min(
+                float(self.tokens_per_minute),
+                self._tokens + elapsed * self.tokens_per_minute / 60,
+            )
+
+    def _get_delay(self, tokens: int) -> float:
+        delay = 0.0
+        if self.requests_per_minute is not None and self._requests < 1:
+            delay = (1 - self._requests) * 60 / self.requests_per_minute
+        if self.tokens_per_minute is not None:
+            # A request larger than the whole quota only waits for a full bucket
+            needed = min(tokens, self.tokens_per_minute)
+            if self._tokens < needed:
+                delay = max(
+                    delay, (needed - self._tokens) * 60 / self.tokens_per_minute
+                )
+        return delay
+
+
+class TokenBudgetLimiter:
+    """
+    Admission control by tokens instead of request count.
+    Caps the estimated tokens (prompt and completion) of the requests in flight, so that a
+    few large requests cannot fill the KV cache of a server while small ones wait.
+    Waiters are admitted in arrival order, so large requests are not starved by small ones.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        default_completion_tokens: int = 512,
+        chars_per_token: float = 4.0,
+    ) -> None:
+        """
+        Arguments:
+            max_tokens: Maximum estimated tokens of all requests in flight
+            default_completion_tokens: Completion tokens reserved for requests without max_completion_tokens
+            chars_per_token: Characters per token used to estimate prompt tokens
+        """
+        if max_tokens < 1:
+            raise ValueError("max_tokens should be a positive int")
+
+        self.max_tokens = max_tokens
+        self.default_completion_tokens = default_completion_tokens
+        self.chars_per_token = chars_per_token
+
+        self._in_flight_tokens = 0
+        self._waiters: deque[tuple[asyncio.Future, int]] = deque()
+
+    @property
+    def in_flight_tokens(self) -> int:
+        return self._in_flight_tokens
+
+    def estimate_tokens(
+        self, messages: list[dict[str, str]], max_completion_tokens: int | None
+    ) -> int:
+        """
+        Tokens a request reserves while it is in flight, capped at max_tokens.
+        """
+        tokens = OperatorUtils.estimate_prompt_tokens(
+            messages, self.chars_per_token
+        ) + (max_completion_tokens or self.default_completion_tokens)
+        # A request larger than the budget runs alone instead of waiting forever
+        return min(tokens, self.max_tokens)
+
+    async def acquire(self, tokens: int) -> None:
+        if not self._waiters and self._fits(tokens):
+            self._in_flight_tokens += tokens
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((waiter, tokens))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The tokens may have been granted right before the cancellation
+            if not waiter.cancelled():
+                self.release(tokens)
+            else:
+                self._waiters = deque(
+                    item for item in self._waiters if item[0] is not waiter
+                )
+                self._wake()
+            raise
+
+    def release(self, tokens: int) -> None:
+        self._in_flight_tokens -= tokens
+        self._wake()
+
+    def _fits(self, tokens: int) -> bool:
+        return self._in_flight_tokens + tokens <= self.max_tokens
+
+    def _wake(self) -> None:
+        # Only the head of the queue may go in, so large requests keep their turn
+        while self._waiters:
+            waiter, tokens = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+            if not self._fits(tokens):
+                break
+            self._waiters.popleft()
+            self._in_flight_tokens += tokens
+            waiter.set_result(None)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import math
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, Literal
+
+from pydantic import BaseModel
+from pydantic_core import core_schema
+
+LogprobsFormat = Literal["full", "compact", "summary"]
+
+
+def _to_logprob(prob: float) -> float:
+    # Materialized probabilities are rounded, tiny ones may have become 0
+    return math.log(prob) if prob > 0 else -math.inf
+
+
+class CompactLogprobs(Sequence):
+    """
+    Array-backed token logprobs.
+    Items are materialized as the usual `{"token", "prob", "top_alternatives"}` dicts only when accessed.
+    """
+
+    __slots__ = ("_alt_logprobs", "_alt_offsets", "_alt_tokens", "_logprobs", "_tokens")
+
+    def __init__(self) -> None:
+        self._tokens: list[str] = []
+        self._logprobs = array("d")
+        self._alt_offsets = array("I", [0])
+        self._alt_tokens: list[str] = []
+        self._alt_logprobs = array("d")
+
+    def append(
+        self, token: str, logprob: float, alternatives: Iterable[tuple[str, float]]
+    ) -> None:
+        # Interning shares the memory of tokens that repeat across the batch
+        self._tokens.append(sys.intern(token))
+        self._logprobs.append(logprob)
+        for alt_token, alt_logprob in alternatives:
+            self._alt_tokens.append(sys.intern(alt_token))
+            self._alt_logprobs.append(alt_logprob)
+        self._alt_offsets.append(len(self._alt_tokens))
+
+    @property
+    def tokens(self) -> list[str]:
+        return self._tokens
+
+    @property
+    def probs(self) -> array:
+        return array("d", map(math.exp, self._logprobs))
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [self._materialize(i) for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("logprobs index out of range")
+
+        return self._materialize(index)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for i in range(len(self)):
+            yield self._materialize(i)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CompactLogprobs):
+            return self.to_list() == other.to_list()
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"CompactLogprobs(tokens={len(self)})"
+
+    def to_list(self) -> list[dict[str, Any]]:
+        return list(self)
+
+    @classmethod
+    def from_list(cls, items: Iterable[dict[str, Any]]) -> CompactLogprobs:
+        """
+        Builds compact logprobs from materialized items, e.g. read back from JSON.
+        """
+        compact = cls()
+        for item in items:
+            compact.append(
+                item["token"],
+                _to_logprob(item["prob"]),
+                (
+                    (alternative["token"], _to_logprob(alternative["prob"]))
+                    for alternative in item["top_alternatives"]
+                ),
+            )
+        return compact
+
+    @classmethod
+    def concat(
+        cls, parts: Iterable[CompactLogprobs | list[dict[str, Any]]]
+    ) -> CompactLogprobs:
+        merged = cls()
+        for part in parts:
+            if not isinstance(part, CompactLogprobs):
+                part = cls.from_list(part)
+            base = len(merged._alt_tokens)
+            merged._tokens.extend(part._tokens)
+            merged._logprobs.extend(part._logprobs)
+            merged._alt_tokens.extend(part._alt_tokens)
+            merged._alt_logprobs.extend(part._alt_logprobs)
+            merged._alt_offsets.extend(
+                offset + base for offset in part._alt_offsets[1:]
+            )
+        return merged
+
+    def _materialize(self, index: int) -> dict[str, Any]:
+        start, end = self._alt_offsets[index], self._alt_offsets[index + 1]
+        return {
+            "token": self._tokens[index],
+            "prob": round(math.exp(self._logprobs[index]), 8),
+            "top_alternatives": [
+                {
+                    "token": self._alt_tokens[i],
+                    "prob": round(math.exp(self._alt_logprobs[i]), 8),
+                }
+                for i in range(start, end)
+            ],
+        }
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> Any:
+        return core_schema.is_instance_schema(
+            cls,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda value: value.to_list()
+            ),
+        )
+
+
+class LogprobsSummary(BaseModel):
+    """
+    Confidence statistics of the generated tokens, without the per-token data.
+    """
+
+    token_count: int = 0
+    min_prob: float | None = None
+    mean_prob: float | None = None
+    mean_entropy: float | None = None
+
+    @classmethod
+    def merge(cls, summaries: Sequence[LogprobsSummary]) -> LogprobsSummary:
+        summaries = [summary for summary in summaries if summary.token_count]
+        token_count = sum(summary.token_count for summary in summaries)
+        if not token_count:
+            return cls()
+
+        return cls(
+            token_count=token_count,
+            min_prob=min(summary.min_prob for summary in summaries),
+            mean_prob=sum(s.mean_prob * s.token_count for s in summaries) / token_count,
+            mean_entropy=sum(s.mean_entropy * s.token_count for s in summaries)
+            / token_count,
+        )
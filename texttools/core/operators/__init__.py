@@ -1,4 +1,5 @@
 from .async_operator import AsyncOperator
+from .cascade import AsyncCascadeOperator, CascadeOperator
 from .sync_operator import Operator
 
-__all__ = ["AsyncOperator", "Operator"]
+__all__ = ["AsyncCascadeOperator", "AsyncOperator", "CascadeOperator", "Operator"]
@@ -1,13 +1,21 @@
 import logging
 from collections.abc import Callable
-from typing import Any
+from typing import Any, Literal
 
 from openai import AsyncOpenAI
 from pydantic import BaseModel
 
+from ..cache import CacheBackend
 from ..exceptions import LLMError, PromptError, TextToolsError, ValidationError
-from ..internal_models import OperatorOutput
-from ..utils import OperatorUtils
+from ..internal_models import (
+    OperatorOutput,
+    TokenUsage,
+    create_inline_analysis_model,
+)
+from ..limiters import AdaptiveConcurrencyLimiter, RateLimiter, TokenBudgetLimiter
+from ..logprobs import CompactLogprobs, LogprobsFormat
+from ..retry import RetryPolicy
+from ..utils import DecodingBackend, OperatorUtils, PromptLayout
 
 
 class AsyncOperator:
@@ -15,17 +23,154 @@ class AsyncOperator:
     Core engine for running text-processing operations with an LLM.
     """
 
-    def __init__(self, client: AsyncOpenAI, model: str) -> None:
-        self._client = client
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        model: str,
+        cache: CacheBackend | None = None,
+        logprobs_format: LogprobsFormat = "full",
+        decoding_backend: DecodingBackend = "openai",
+        adaptive_analysis_threshold: float = 0.9,
+        prompt_layout: PromptLayout = "default",
+        prompt_cache_key: str | None = None,
+        retry_policy: RetryPolicy | None = None,
+        concurrency_limiter: AdaptiveConcurrencyLimiter | None = None,
+        rate_limiter: RateLimiter | None = None,
+        token_limiter: TokenBudgetLimiter | None = None,
+    ) -> None:
         self._model = model
+        self._cache = cache
+        self._logprobs_format = logprobs_format
+        self._decoding_backend = decoding_backend
+        self._adaptive_analysis_threshold = adaptive_analysis_threshold
+        self._prompt_layout = prompt_layout
+        self._prompt_cache_key = prompt_cache_key
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        # The policy makes every retry, the retries of the client would multiply the attempts
+        self._client = (
+            client.with_options(max_retries=0)
+            if hasattr(client, "with_options")
+            else client
+        )
+        self._concurrency_limiter = concurrency_limiter
+        self._rate_limiter = rate_limiter
+        self._token_limiter = token_limiter
         self.logger = logging.getLogger(self.__class__.__name__)
 
+    def _read_cache(
+        self,
+        cache_key: str,
+        validator: Callable[[Any], bool] | None,
+        output_model: type[BaseModel],
+    ) -> OperatorOutput | None:
+        try:
+            cached = self._cache.get(cache_key)
+            if cached is None:
+                return None
+
+            operator_output = OperatorOutput.model_validate_json(cached)
+            # JSON loses the result type, e.g. nested models come back as dicts
+            operator_output.result = OperatorUtils.get_result_adapter(
+                output_model
+            ).validate_python(operator_output.result)
+            # Compact logprobs are stored as their list of dicts
+            if self._logprobs_format == "compact" and isinstance(
+                operator_output.logprobs, list
+            ):
+                operator_output.logprobs = CompactLogprobs.from_list(
+                    operator_output.logprobs
+                )
+        # Any CacheBackend can be plugged in, so its errors are not known up front.
+        # A broken backend or entry counts as a miss instead of failing the call
+        except Exception as e:  # noqa: BLE001
+            self.logger.warning(f"Cache lookup failed: {e}")
+            return None
+
+        if validator and not validator(operator_output.result):
+            return None
+
+        self.logger.debug("Cache hit, skipping completions...")
+
+        # Cached results cost no tokens or retries on this call
+        operator_output.cache_hit = True
+        operator_output.token_usage = TokenUsage()
+        operator_output.retry_count = 0
+        return operator_output
+
+    def _write_cache(self, cache_key: str, operator_output: OperatorOutput) -> None:
+        try:
+            self._cache.set(cache_key, operator_output.model_dump_json().encode())
+        # A failed write only costs the next lookup, see _read_cache
+        except Exception as e:  # noqa: BLE001
+            self.logger.warning(f"Cache write failed: {e}")
+
+    def _extract_label_probs(
+        self, completion: Any, output_model: type[BaseModel]
+    ) -> dict[str, float]:
+        # A guided choice generates the bare label instead of a JSON object
+        plain = (
+            self._decoding_backend == "vllm"
+            and "guided_choice" in OperatorUtils.get_guided_params(output_model)
+        )
+        return OperatorUtils.extract_label_probs(
+            completion, OperatorUtils.get_literal_labels(output_model), plain=plain
+        )
+
+    async def _create(self, request_kwargs: dict[str, Any]) -> Any:
+        """
+        Sends one chat completion request once the token limiter admits it.
+        """
+        if self._token_limiter is None:
+            return await self._send(request_kwargs)
+
+        reserved_tokens = self._token_limiter.estimate_tokens(
+            request_kwargs["messages"], request_kwargs.get("max_completion_tokens")
+        )
+        await self._token_limiter.acquire(reserved_tokens)
+        try:
+            return await self._send(request_kwargs)
+        finally:
+            self._token_limiter.release(reserved_tokens)
+
+    async def _send(self, request_kwargs: dict[str, Any]) -> Any:
+        """
+        Sends one chat completion request within the quotas of the rate limiter.
+        """
+        if self._rate_limiter is None:
+            return await self._request(request_kwargs)
+
+        estimated_tokens = self._rate_limiter.estimate_tokens(
+            request_kwargs["messages"], request_kwargs.get("max_completion_tokens")
+        )
+        await self._rate_limiter.acquire(estimated_tokens)
+        completion = await self._request(request_kwargs)
+
+        actual_tokens = getattr(
+            getattr(completion, "usage", None), "total_tokens", None
+        )
+        if actual_tokens is not None:
+            self._rate_limiter.reconcile(estimated_tokens, actual_tokens)
+        return completion
+
+    async def _request(self, request_kwargs: dict[str, Any]) -> Any:
+        """
+        Sends one chat completion request within the adaptive concurrency limit.
+        Every attempt reports its own latency or rate-limit error to the limiter,
+        before the retry policy sees the error.
+        """
+        if self._concurrency_limiter is None:
+            return await self._client.chat.completions.create(**request_kwargs)
+
+        async with self._concurrency_limiter:
+            return await self._client.chat.completions.create(**request_kwargs)
+
     async def _run_analysis(
         self,
         analysis_messages: list[dict[str, str]],
         max_completion_tokens: int | None,
         priority: int | None,
-    ) -> tuple[str, Any]:
+        deadline: float | None = None,
+    ) -> tuple[str, Any, int]:
         try:
             self.logger.debug("Running analysis completion...")
 
@@ -37,10 +182,19 @@ class AsyncOperator:
             if max_completion_tokens:
                 request_kwargs["max_completion_tokens"] = max_completion_tokens
 
+            extra_body: dict[str, Any] = {}
             if priority is not None:
-                request_kwargs["extra_body"] = {"priority": priority}
+                extra_body["priority"] = priority
+            if self._prompt_cache_key:
+                extra_body["prompt_cache_key"] = self._prompt_cache_key
+
+            if extra_body:
+                request_kwargs["extra_body"] = extra_body
 
-            completion = await self._client.chat.completions.create(**request_kwargs)
+            completion, retries = await self._retry_policy.acall(
+                lambda: self._create(request_kwargs),
+                deadline,
+            )
 
             if not completion.choices:
                 raise LLMError("No choices returned from LLM")
@@ -50,10 +204,12 @@ class AsyncOperator:
             if not analysis:
                 raise LLMError("Empty analysis response")
 
-            return analysis, completion
+            return analysis, completion, retries
 
         except Exception as e:
-            raise LLMError(f"Analysis failed: {e}")
+            raise LLMError(
+                f"Analysis failed: {e}", status_code=getattr(e, "status_code", None)
+            )
 
     async def _run_completion(
         self,
@@ -64,10 +220,12 @@ class AsyncOperator:
         top_logprobs: int,
         max_completion_tokens: int | None,
         priority: int | None,
-    ) -> tuple[BaseModel, Any]:
+        deadline: float | None = None,
+    ) -> tuple[BaseModel, Any, int]:
         """
-        Parses a chat completion using OpenAI's structured output format.
-        Returns both the parsed output and the completion for logprobs.
+        Runs a chat completion using OpenAI's structured output format,
+        or vLLM guided decoding with the "vllm" backend.
+        Returns the parsed output, the completion for logprobs and the number of retries.
         """
         try:
             self.logger.debug("Running main chat completion...")
@@ -75,9 +233,18 @@ class AsyncOperator:
             request_kwargs = {
                 "model": self._model,
                 "messages": main_messages,
-                "response_format": output_model,
                 "temperature": temperature,
             }
+            extra_body: dict[str, Any] = {}
+
+            guided_params: dict[str, Any] | None = None
+            if self._decoding_backend == "vllm":
+                guided_params = OperatorUtils.get_guided_params(output_model)
+                extra_body.update(guided_params)
+            else:
+                request_kwargs["response_format"] = OperatorUtils.get_response_format(
+                    output_model
+                )
 
             if logprobs:
                 request_kwargs["logprobs"] = True
@@ -87,28 +254,45 @@ class AsyncOperator:
                 request_kwargs["max_completion_tokens"] = max_completion_tokens
 
             if priority is not None:
-                request_kwargs["extra_body"] = {"priority": priority}
+                extra_body["priority"] = priority
+            if self._prompt_cache_key:
+                extra_body["prompt_cache_key"] = self._prompt_cache_key
 
-            completion = await self._client.chat.completions.parse(**request_kwargs)
+            if extra_body:
+                request_kwargs["extra_body"] = extra_body
+
+            completion, retries = await self._retry_policy.acall(
+                lambda: self._create(request_kwargs),
+                deadline,
+            )
 
             if not completion.choices:
                 raise LLMError("No choices returned from LLM")
 
             self.logger.debug("Parsing the completion...")
-            parsed_output = completion.choices[0].message.parsed
+            content = completion.choices[0].message.content
 
-            if not parsed_output:
+            if not content:
                 raise LLMError("Failed to parse LLM response")
 
-            return parsed_output, completion
+            if guided_params:
+                parsed_output = OperatorUtils.parse_guided_content(
+                    output_model, guided_params, content
+                )
+            else:
+                parsed_output = output_model.model_validate_json(content)
+
+            return parsed_output, completion, retries
 
         except Exception as e:
-            raise LLMError(f"Completion failed: {e}")
+            raise LLMError(
+                f"Completion failed: {e}", status_code=getattr(e, "status_code", None)
+            )
 
     async def run(
         self,
         text: str,
-        with_analysis: bool,
+        with_analysis: bool | Literal["adaptive", "inline"],
         output_lang: str | None,
         user_prompt: str | None,
         temperature: float,
@@ -121,46 +305,164 @@ class AsyncOperator:
         tool_name: str,
         output_model: type[BaseModel],
         mode: str | None,
+        analysis: str | None = None,
+        label_probs: bool = False,
         **extra_kwargs,
     ) -> OperatorOutput:
         """
         Execute the LLM pipeline with the given input text.
+        A precomputed `analysis` is reused instead of running the analysis completion.
+        With `label_probs`, the output carries the estimated probability of every
+        allowed value of a literal output model. If the model only has the result
+        field, the main completion is also capped to the length of the longest label.
+        With `with_analysis="adaptive"`, the analysis and a second main completion
+        only run when the confidence of the first main completion is below the
+        adaptive analysis threshold.
+        With `with_analysis="inline"`, the analysis is generated in an `analysis`
+        field of the main completion instead of a separate completion.
         """
         try:
             self.logger.debug("Loading the prompts...")
 
-            prompt_configs = OperatorUtils.load_prompt(
-                prompt_file=tool_name + ".yaml",
-                text=text.strip(),
-                mode=mode,
-                **extra_kwargs,
-            )
-
-            analysis: str | None = None
-            analysis_completion: Any = None
+            prompt_templates = OperatorUtils.load_prompt(tool_name + ".yaml", mode)
+            format_args = {"text": text.strip(), **extra_kwargs}
+            main_template = prompt_templates["main_template"]
+
+            if not with_analysis:
+                analysis = None
+            adaptive = with_analysis == "adaptive" and not analysis
+            inline = with_analysis == "inline" and not analysis
+            if inline:
+                output_model = create_inline_analysis_model(output_model)
+
+            # The analyze template is only rendered when an analysis has to be generated
+            analysis_messages: list[dict[str, str]] | None = None
+            if with_analysis and not analysis and not inline:
+                analysis_messages = OperatorUtils.build_template_messages(
+                    prompt_templates["analyze_template"],
+                    format_args,
+                    self._prompt_layout,
+                )
 
-            if with_analysis:
-                analysis_messages = OperatorUtils.build_message(
-                    prompt_configs["analyze_template"]
+            cache_key: str | None = None
+            if self._cache is not None:
+                key_messages = OperatorUtils.build_main_messages(
+                    main_template,
+                    format_args,
+                    analysis,
+                    output_lang,
+                    user_prompt,
+                    inline,
+                    self._prompt_layout,
                 )
-                analysis, analysis_completion = await self._run_analysis(
-                    analysis_messages, max_completion_tokens, priority
+                if analysis_messages:
+                    key_messages = analysis_messages + key_messages
+
+                cache_key = OperatorUtils.build_cache_key(
+                    model=self._model,
+                    prompt_file=tool_name + ".yaml",
+                    messages=key_messages,
+                    output_model=output_model,
+                    temperature=temperature,
+                    logprobs=logprobs,
+                    top_logprobs=top_logprobs,
+                    max_completion_tokens=max_completion_tokens,
+                    logprobs_format=self._logprobs_format,
+                    label_probs=label_probs,
+                    decoding_backend=self._decoding_backend,
+                    adaptive_analysis_threshold=self._adaptive_analysis_threshold
+                    if adaptive
+                    else None,
                 )
+                cached_output = self._read_cache(cache_key, validator, output_model)
+                if cached_output:
+                    return cached_output
 
-            main_prompt = OperatorUtils.build_main_prompt(
-                prompt_configs["main_template"], analysis, output_lang, user_prompt
+            analysis_completion: Any = None
+            first_completion: Any = None
+            analysis_triggered: bool | None = None
+            retry_count = 0
+            deadline = self._retry_policy.get_deadline()
+
+            if analysis_messages and not adaptive:
+                analysis, analysis_completion, retries = await self._run_analysis(
+                    analysis_messages, max_completion_tokens, priority, deadline
+                )
+                retry_count += retries
+
+            main_messages = OperatorUtils.build_main_messages(
+                main_template,
+                format_args,
+                analysis,
+                output_lang,
+                user_prompt,
+                inline,
+                self._prompt_layout,
             )
-            main_messages = OperatorUtils.build_message(main_prompt)
 
-            parsed_output, main_completion = await self._run_completion(
+            main_max_completion_tokens = max_completion_tokens
+            if (
+                label_probs
+                and not max_completion_tokens
+                and list(output_model.model_fields) == ["result"]
+            ):
+                main_max_completion_tokens = OperatorUtils.label_token_budget(
+                    OperatorUtils.get_literal_labels(output_model)
+                )
+
+            parsed_output, main_completion, retries = await self._run_completion(
                 main_messages,
                 output_model,
                 temperature,
-                logprobs,
+                logprobs or label_probs or adaptive,
                 top_logprobs,
-                max_completion_tokens,
+                main_max_completion_tokens,
                 priority,
+                deadline,
             )
+            retry_count += retries
+
+            if adaptive:
+                confidence = OperatorUtils.get_confidence(
+                    parsed_output.result,
+                    OperatorUtils.extract_logprobs(main_completion, "summary"),
+                    self._extract_label_probs(main_completion, output_model)
+                    if OperatorUtils.has_literal_result(output_model)
+                    else None,
+                )
+                analysis_triggered = (
+                    confidence is not None
+                    and confidence < self._adaptive_analysis_threshold
+                )
+
+            if analysis_triggered:
+                self.logger.debug(
+                    f"Confidence {confidence:.3f} is below the threshold, running the analysis..."
+                )
+                first_completion = main_completion
+                analysis, analysis_completion, retries = await self._run_analysis(
+                    analysis_messages, max_completion_tokens, priority, deadline
+                )
+                retry_count += retries
+                main_messages = OperatorUtils.build_main_messages(
+                    main_template,
+                    format_args,
+                    analysis,
+                    output_lang,
+                    user_prompt,
+                    prompt_layout=self._prompt_layout,
+                )
+                parsed_output, main_completion, retries = await self._run_completion(
+                    main_messages,
+                    output_model,
+                    temperature,
+                    logprobs or label_probs,
+                    top_logprobs,
+                    main_max_completion_tokens,
+                    priority,
+                    deadline,
+                )
+                retry_count += retries
 
             # Retry logic in case output validation fails
             if validator and not validator(parsed_output.result):
@@ -181,15 +483,21 @@ class AsyncOperator:
                     )
 
                     try:
-                        parsed_output, main_completion = await self._run_completion(
+                        (
+                            parsed_output,
+                            main_completion,
+                            retries,
+                        ) = await self._run_completion(
                             main_messages,
                             output_model,
                             retry_temperature,
-                            logprobs,
+                            logprobs or label_probs,
                             top_logprobs,
-                            max_completion_tokens=max_completion_tokens,
+                            max_completion_tokens=main_max_completion_tokens,
                             priority=priority,
+                            deadline=deadline,
                         )
+                        retry_count += retries
 
                         # Check if retry was successful
                         if validator(parsed_output.result):
@@ -202,18 +510,38 @@ class AsyncOperator:
                 if not succeeded:
                     raise ValidationError("Validation failed after all retries")
 
-            operator_output = OperatorOutput(
+            if inline:
+                analysis = parsed_output.analysis
+
+            # The fields are already parsed or built by the operator, so validation is skipped
+            operator_output = OperatorOutput.model_construct(
                 result=parsed_output.result,
-                analysis=analysis if with_analysis else None,
-                logprobs=OperatorUtils.extract_logprobs(main_completion)
+                analysis=analysis,
+                logprobs=OperatorUtils.extract_logprobs(
+                    main_completion, self._logprobs_format
+                )
                 if logprobs
                 else None,
                 processed_by=self._model,
+                label_probs=self._extract_label_probs(main_completion, output_model)
+                if label_probs
+                else None,
                 token_usage=OperatorUtils.extract_token_usage(
                     main_completion, analysis_completion
                 ),
+                analysis_triggered=analysis_triggered,
+                retry_count=retry_count,
             )
 
+            # The discarded first pass of an adaptive analysis is part of the cost
+            if first_completion is not None:
+                operator_output.token_usage += OperatorUtils.extract_token_usage(
+                    first_completion, None
+                )
+
+            if cache_key:
+                self._write_cache(cache_key, operator_output)
+
             return operator_output
 
         except (PromptError, LLMError, ValidationError):
@@ -0,0 +1,206 @@
+import logging
+from typing import Any
+
+from pydantic import BaseModel
+
+from ..exceptions import LLMError, ValidationError
+from ..internal_models import OperatorOutput, TokenUsage
+from ..utils import OperatorUtils
+from .async_operator import AsyncOperator
+from .sync_operator import Operator
+
+
+class _BaseCascade:
+    """
+    Shared configuration and bookkeeping of the sync and async cascades.
+    """
+
+    def __init__(
+        self,
+        operators: list[Any],
+        thresholds: float | dict[str, float] = 0.9,
+    ) -> None:
+        """
+        Arguments:
+            operators: Operators ordered from the cheapest model to the largest, the last one always answers
+            thresholds: Minimum confidence to keep an answer of an earlier tier, or a mapping of tool names to it. Tools missing from the mapping only run on the last tier
+        """
+        if not operators:
+            raise ValueError("A cascade needs at least one operator")
+
+        self._operators = operators
+        self._thresholds = thresholds
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _first_tier(self, tool_name: str) -> tuple[int, float | None]:
+        if isinstance(self._thresholds, dict):
+            threshold = self._thresholds.get(tool_name)
+        else:
+            threshold = self._thresholds
+
+        if threshold is None:
+            return len(self._operators) - 1, None
+        return 0, threshold
+
+    def _is_confident(
+        self, operator_output: OperatorOutput, threshold: float, tier: int
+    ) -> bool:
+        confidence = OperatorUtils.get_confidence(
+            operator_output.result,
+            operator_output.logprobs,
+            operator_output.label_probs,
+        )
+        if confidence is None or confidence >= threshold:
+            return True
+
+        self.logger.info(
+            f"Confidence {confidence:.3f} of tier {tier} is below {threshold}, escalating..."
+        )
+        return False
+
+    def _finish(
+        self,
+        operator_output: OperatorOutput,
+        tier: int,
+        tier_token_usage: list[TokenUsage],
+        logprobs: bool,
+        label_probs: bool,
+    ) -> OperatorOutput:
+        tier_token_usage[tier] = operator_output.token_usage
+        operator_output.token_usage = TokenUsage.sum(tier_token_usage)
+        operator_output.cascade_tier = tier
+        operator_output.tier_token_usage = tier_token_usage
+
+        # Confidence data requested by the cascade itself is not returned
+        if not logprobs:
+            operator_output.logprobs = None
+        if not label_probs:
+            operator_output.label_probs = None
+
+        return operator_output
+
+
+class CascadeOperator(_BaseCascade):
+    """
+    Runs operations on a chain of operators ordered from the cheapest model to the largest.
+    An answer is kept when its confidence reaches the threshold of the tool,
+    otherwise the operation is escalated to the next tier.
+    """
+
+    def __init__(
+        self,
+        operators: list[Operator],
+        thresholds: float | dict[str, float] = 0.9,
+    ) -> None:
+        super().__init__(operators, thresholds)
+
+    def run(
+        self,
+        tool_name: str,
+        output_model: type[BaseModel],
+        logprobs: bool,
+        label_probs: bool = False,
+        **run_kwargs: Any,
+    ) -> OperatorOutput:
+        """
+        Same arguments as `Operator.run`.
+        Earlier tiers also request logprobs, or label probabilities for literal
+        and boolean outputs, to measure their confidence.
+        """
+        first_tier, threshold = self._first_tier(tool_name)
+        last_tier = len(self._operators) - 1
+        tier_token_usage = [TokenUsage() for _ in self._operators]
+        has_labels = OperatorUtils.has_literal_result(output_model)
+
+        for tier in range(first_tier, last_tier):
+            try:
+                operator_output = self._operators[tier].run(
+                    tool_name=tool_name,
+                    output_model=output_model,
+                    logprobs=logprobs or not has_labels,
+                    label_probs=label_probs or has_labels,
+                    **run_kwargs,
+                )
+            except (LLMError, ValidationError) as e:
+                self.logger.warning(f"Tier {tier} failed, escalating: {e}")
+                continue
+
+            if self._is_confident(operator_output, threshold, tier):
+                return self._finish(
+                    operator_output, tier, tier_token_usage, logprobs, label_probs
+                )
+            tier_token_usage[tier] = operator_output.token_usage
+
+        operator_output = self._operators[last_tier].run(
+            tool_name=tool_name,
+            output_model=output_model,
+            logprobs=logprobs,
+            label_probs=label_probs,
+            **run_kwargs,
+        )
+        return self._finish(
+            operator_output, last_tier, tier_token_usage, logprobs, label_probs
+        )
+
+
+class AsyncCascadeOperator(_BaseCascade):
+    """
+    Runs operations on a chain of operators ordered from the cheapest model to the largest.
+    An answer is kept when its confidence reaches the threshold of the tool,
+    otherwise the operation is escalated to the next tier.
+    """
+
+    def __init__(
+        self,
+        operators: list[AsyncOperator],
+        thresholds: float | dict[str, float] = 0.9,
+    ) -> None:
+        super().__init__(operators, thresholds)
+
+    async def run(
+        self,
+        tool_name: str,
+        output_model: type[BaseModel],
+        logprobs: bool,
+        label_probs: bool = False,
+        **run_kwargs: Any,
+    ) -> OperatorOutput:
+        """
+        Same arguments as `AsyncOperator.run`.
+        Earlier tiers also request logprobs, or label probabilities for literal
+        and boolean outputs, to measure their confidence.
+        """
+        first_tier, threshold = self._first_tier(tool_name)
+        last_tier = len(self._operators) - 1
+        tier_token_usage = [TokenUsage() for _ in self._operators]
+        has_labels = OperatorUtils.has_literal_result(output_model)
+
+        for tier in range(first_tier, last_tier):
+            try:
+                operator_output = await self._operators[tier].run(
+                    tool_name=tool_name,
+                    output_model=output_model,
+                    logprobs=logprobs or not has_labels,
+                    label_probs=label_probs or has_labels,
+                    **run_kwargs,
+                )
+            except (LLMError, ValidationError) as e:
+                self.logger.warning(f"Tier {tier} failed, escalating: {e}")
+                continue
+
+            if self._is_confident(operator_output, threshold, tier):
+                return self._finish(
+                    operator_output, tier, tier_token_usage, logprobs, label_probs
+                )
+            tier_token_usage[tier] = operator_output.token_usage
+
+        operator_output = await self._operators[last_tier].run(
+            tool_name=tool_name,
+            output_model=output_model,
+            logprobs=logprobs,
+            label_probs=label_probs,
+            **run_kwargs,
+        )
+        return self._finish(
+            operator_output, last_tier, tier_token_usage, logprobs, label_probs
+        )
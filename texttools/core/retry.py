@@ -0,0 +1,154 @@
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, TypeVar
+
+import openai
+
+T = TypeVar("T")
+
+_RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class RetryPolicy:
+    """
+    Retries transient LLM API errors (rate limits, server errors and connection failures)
+    with exponential backoff and full jitter, honoring Retry-After headers.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        initial_delay: float = 0.5,
+        max_delay: float = 30.0,
+        multiplier: float = 2.0,
+        deadline: float | None = None,
+        retry_statuses: frozenset[int] = frozenset({408, 409, 429, 500, 502, 503, 504}),
+    ) -> None:
+        """
+        Arguments:
+            max_retries: Maximum number of retries of one request, 0 disables retries
+            initial_delay: Backoff ceiling in seconds of the first retry
+            max_delay: Maximum wait in seconds before a retry, also caps Retry-After
+            multiplier: Growth factor of the backoff ceiling after each retry
+            deadline: Time in seconds after which a run stops retrying, None for no deadline
+            retry_statuses: HTTP status codes that are retried
+        """
+        self.max_retries = max_retries
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.deadline = deadline
+        self.retry_statuses = retry_statuses
+
+    def get_deadline(self) -> float | None:
+        """
+        Returns the monotonic time at which a run starting now stops retrying.
+        """
+        return time.monotonic() + self.deadline if self.deadline is not None else None
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, _RETRYABLE_ERRORS):
+            return True
+        return (
+            isinstance(error, openai.APIStatusError)
+            and error.status_code in self.retry_statuses
+        )
+
+    def get_delay(self, attempt: int, error: Exception) -> float:
+        """
+        Returns the wait before retry number `attempt` (starting at 0).
+        A Retry-After header wins over the exponential backoff.
+        """
+        retry_after = self._parse_retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+
+        ceiling = min(self.max_delay, self.initial_delay * self.multiplier**attempt)
+        return random.uniform(0, ceiling)
+
+    def call(
+        self, func: Callable[[], T], deadline: float | None = None
+    ) -> tuple[T, int]:
+        """
+        Calls `func` until it succeeds or fails with a non-retryable error.
+        Returns the result and the number of retries.
+        """
+        attempt = 0
+        while True:
+            try:
+                return func(), attempt
+            except Exception as e:
+                delay = self._next_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(
+        self, func: Callable[[], Awaitable[T]], deadline: float | None = None
+    ) -> tuple[T, int]:
+        """
+        Async version of `call`.
+        """
+        attempt = 0
+        while True:
+            try:
+                return await func(), attempt
+            except Exception as e:
+                delay = self._next_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _next_delay(
+        self, attempt: int, error: Exception, deadline: float | None
+    ) -> float | None:
+        if attempt >= self.max_retries or not self.is_retryable(error):
+            return None
+
+        delay = self.get_delay(attempt, error)
+        if deadline is not None and time.monotonic() + delay > deadline:
+            return None
+        return delay
+
+    @staticmethod
+    def _parse_retry_after(error: Exception) -> float | None:
+        response: Any = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms:
+            try:
+                return max(float(retry_after_ms) / 1000, 0.0)
+            except ValueError:
+                pass
+
+        retry_after = headers.get("retry-after")
+        if not retry_after:
+            return None
+
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            pass
+
+        # Retry-After may also be an HTTP date
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        # Dates in -0000 parse as naive datetimes, they are UTC as well
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=UTC)
+        return max((retry_at - datetime.now(UTC)).total_seconds(), 0.0)
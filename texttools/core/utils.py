@@ -1,15 +1,179 @@
 import asyncio
+import hashlib
+import json
 import math
+import os
 import random
 import re
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
 from functools import lru_cache
+from itertools import pairwise
 from pathlib import Path
-from typing import Any
+from string import Formatter
+from typing import Any, Literal, get_args, get_origin
 
 import yaml
+from pydantic import BaseModel, TypeAdapter
 
 from .exceptions import PromptError
 from .internal_models import AnalyzeUsage, CompletionUsage, TokenUsage
+from .logprobs import CompactLogprobs, LogprobsFormat, LogprobsSummary
+
+_NORMALIZE_REPLACEMENTS = (
+    # Quotes
+    ("\u201c", '"'),
+    ("\u201d", '"'),
+    ("\u2018", "'"),
+    ("\u2019", "'"),
+    # Additional typographic punctuation
+    ("\u2013", "-"),
+    ("\u2014", "-"),
+    ("\u2026", "..."),
+    ("\u00a0", " "),
+    ("\u200b", ""),
+)
+
+_LOGPROBS_IGNORE_PATTERN = re.compile(r'^(result|[\s\[\]\{\}",:]+)$')
+
+# Runs of two or more blanks, or a single tab
+_WHITESPACE_RUN = re.compile(r"[ \t]{2,}|\t")
+
+# Start of the value of the "result" field in a structured output
+_RESULT_VALUE_START = re.compile(r'"result"\s*:\s*')
+
+# A {"result": "..."} object holding a single JSON string
+_GUIDED_STR_PATTERN = (
+    r'\{"result": "(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*"\}'
+)
+
+DecodingBackend = Literal["openai", "vllm"]
+
+PromptLayout = Literal["default", "prefix_cache"]
+
+
+def _to_strict_schema(
+    schema: dict[str, Any], root: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """
+    Adapts a pydantic JSON schema in place to OpenAI strict structured outputs:
+    objects list every property as required and allow no other properties.
+    """
+    root = schema if root is None else root
+
+    for definitions in ("$defs", "definitions"):
+        for sub_schema in schema.get(definitions, {}).values():
+            _to_strict_schema(sub_schema, root)
+
+    if schema.get("type") == "object" and "additionalProperties" not in schema:
+        schema["additionalProperties"] = False
+
+    properties = schema.get("properties")
+    if properties is not None:
+        schema["required"] = list(properties)
+        for property_schema in properties.values():
+            _to_strict_schema(property_schema, root)
+
+    for key in ("items", "additionalProperties"):
+        if isinstance(schema.get(key), dict):
+            _to_strict_schema(schema[key], root)
+    for key in ("anyOf", "oneOf", "prefixItems"):
+        for sub_schema in schema.get(key, ()):
+            _to_strict_schema(sub_schema, root)
+
+    all_of = schema.get("allOf")
+    if all_of is not None:
+        if len(all_of) == 1:
+            schema.update(_to_strict_schema(all_of.pop(), root))
+            del schema["allOf"]
+        else:
+            for sub_schema in all_of:
+                _to_strict_schema(sub_schema, root)
+
+    # Strict mode does not apply defaults, and rejects them next to a $ref
+    schema.pop("default", None)
+
+    # A $ref cannot have sibling keys such as a description, so it is inlined
+    ref = schema.get("$ref")
+    if ref is not None and len(schema) > 1:
+        if not ref.startswith("#/"):
+            raise ValueError(f"Unsupported $ref in output model schema: {ref}")
+        resolved = root
+        for key in ref[2:].split("/"):
+            resolved = resolved[key]
+        # Keys next to the $ref take priority over the referenced schema
+        schema.update({**resolved, **schema})
+        del schema["$ref"]
+        return _to_strict_schema(schema, root)
+
+    return schema
+
+
+class PromptTemplate:
+    """
+    A prompt template compiled into its static segments and placeholders.
+    """
+
+    _formatter = Formatter()
+
+    def __init__(self, template: str) -> None:
+        self.template = template
+        self.segments: list[str] = []
+        self.placeholders: list[str] = []
+        self._fields: list[tuple[str, str | None, str]] = []
+
+        try:
+            parsed = list(self._formatter.parse(template))
+        except ValueError as e:
+            raise PromptError(f"Invalid template: {e}")
+
+        literal_parts = []
+        for literal, field_name, format_spec, conversion in parsed:
+            literal_parts.append(literal)
+            if field_name is None:
+                continue
+
+            self.segments.append("".join(literal_parts))
+            literal_parts = []
+            self.placeholders.append(field_name)
+            self._fields.append((field_name, conversion, format_spec or ""))
+
+        # There is always one more static segment than placeholders
+        self.segments.append("".join(literal_parts))
+
+    def render(self, values: dict[str, Any]) -> str:
+        return "".join(self._render_parts(values))
+
+    def render_split(self, values: dict[str, Any], split_at: str) -> tuple[str, str]:
+        """
+        Renders the template in two parts, cut before the first `split_at` placeholder.
+        The first part is empty when the template doesn't have that placeholder.
+        """
+        parts = self._render_parts(values)
+        if split_at not in self.placeholders:
+            return "", "".join(parts)
+
+        # Values sit at the odd positions, between the static segments
+        cut = 1 + 2 * self.placeholders.index(split_at)
+        return "".join(parts[:cut]), "".join(parts[cut:])
+
+    def _render_parts(self, values: dict[str, Any]) -> list[str]:
+        parts = [self.segments[0]]
+
+        for (field_name, conversion, format_spec), segment in zip(
+            self._fields, self.segments[1:]
+        ):
+            try:
+                value = values[field_name]
+            except KeyError:
+                raise PromptError(f"Missing template variable: '{field_name}'")
+
+            if conversion:
+                value = self._formatter.convert_field(value, conversion)
+            parts.append(format(value, format_spec))
+            parts.append(segment)
+
+        return parts
 
 
 class OperatorUtils:
@@ -32,9 +196,17 @@ class OperatorUtils:
             raise PromptError(f"Invalid YAML in {prompt_file}: {e}")
 
     @staticmethod
-    def load_prompt(
-        prompt_file: str, text: str, mode: str, **extra_kwargs
-    ) -> dict[str, str]:
+    @lru_cache(maxsize=32)
+    def _hash_prompt_file(prompt_file: str) -> str:
+        prompt_path = Path(__file__).parent.parent / "prompts" / prompt_file
+        return hashlib.sha256(prompt_path.read_bytes()).hexdigest()
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def load_prompt(prompt_file: str, mode: str | None) -> dict[str, PromptTemplate]:
+        """
+        Loads, validates and compiles the templates of a prompt file once per mode.
+        """
         try:
             data = OperatorUtils._load_prompt_yaml(prompt_file)
 
@@ -65,34 +237,23 @@ class OperatorUtils:
                     + (f" for mode '{mode}'" if mode else "")
                 )
 
-            template_configs = {
-                "main_template": main_template,
-                "analyze_template": analyze_template,
+            return {
+                "main_template": PromptTemplate(main_template),
+                "analyze_template": PromptTemplate(analyze_template),
             }
 
-            format_args = {"text": text}
-            format_args.update(extra_kwargs)
-
-            # Inject variables into the templates
-            for key, value in template_configs.items():
-                template_configs[key] = value.format(**format_args)
-
-            return template_configs
-
-        except yaml.YAMLError as e:
-            raise PromptError(f"Invalid YAML in {prompt_file}: {e}")
-        except KeyError as e:
-            raise PromptError(f"Missing template variable: {e}")
+        except PromptError:
+            raise
         except Exception as e:
             raise PromptError(f"Failed to load prompt {prompt_file}: {e}")
 
     @staticmethod
-    def build_main_prompt(
-        main_template: str,
+    def _build_instructions(
         analysis: str | None,
         output_lang: str | None,
         user_prompt: str | None,
-    ) -> str:
+        inline_analysis: bool,
+    ) -> list[str]:
         parts = []
 
         if analysis:
@@ -101,48 +262,454 @@ class OperatorUtils:
             parts.append(f"Respond only in the {output_lang} language.")
         if user_prompt:
             parts.append(f"Consider this instruction: {user_prompt}")
+        if inline_analysis:
+            parts.append(
+                'First write a brief analysis of the input that helps with the task in the "analysis" field, then give the result.'
+            )
+
+        return parts
 
+    @staticmethod
+    def build_main_prompt(
+        main_template: str,
+        analysis: str | None,
+        output_lang: str | None,
+        user_prompt: str | None,
+        inline_analysis: bool = False,
+    ) -> str:
+        parts = OperatorUtils._build_instructions(
+            analysis, output_lang, user_prompt, inline_analysis
+        )
         parts.append(main_template)
         return "\n".join(parts)
 
+    @staticmethod
+    def build_main_messages(
+        main_template: PromptTemplate,
+        format_args: dict[str, Any],
+        analysis: str | None,
+        output_lang: str | None,
+        user_prompt: str | None,
+        inline_analysis: bool = False,
+        prompt_layout: PromptLayout = "default",
+    ) -> list[dict[str, str]]:
+        """
+        Builds the messages of the main completion.
+        The "prefix_cache" layout sends the instructions that come before the text
+        as a system message, and puts every per-request part after the text,
+        so that requests of a tool share the longest possible prompt prefix.
+        """
+        if prompt_layout != "prefix_cache":
+            return OperatorUtils.build_message(
+                OperatorUtils.build_main_prompt(
+                    main_template.render(format_args),
+                    analysis,
+                    output_lang,
+                    user_prompt,
+                    inline_analysis,
+                )
+            )
+
+        static, variable = main_template.render_split(format_args, "text")
+        parts = [variable.rstrip()]
+        parts += OperatorUtils._build_instructions(
+            analysis, output_lang, user_prompt, inline_analysis
+        )
+        return OperatorUtils.build_split_message(static, "\n".join(parts))
+
+    @staticmethod
+    def build_template_messages(
+        template: PromptTemplate,
+        format_args: dict[str, Any],
+        prompt_layout: PromptLayout = "default",
+    ) -> list[dict[str, str]]:
+        if prompt_layout != "prefix_cache":
+            return OperatorUtils.build_message(template.render(format_args))
+        return OperatorUtils.build_split_message(
+            *template.render_split(format_args, "text")
+        )
+
+    @staticmethod
+    def build_split_message(static: str, variable: str) -> list[dict[str, str]]:
+        if not static.strip():
+            return OperatorUtils.build_message(variable)
+        return [
+            {"role": "system", "content": static},
+            {"role": "user", "content": variable},
+        ]
+
     @staticmethod
     def build_message(prompt: str) -> list[dict[str, str]]:
         return [{"role": "user", "content": prompt}]
 
     @staticmethod
-    def extract_logprobs(completion: Any) -> list[dict[str, Any]]:
+    @lru_cache(maxsize=1024)
+    def get_response_format(output_model: type[BaseModel]) -> dict[str, Any]:
+        """
+        Derives the strict JSON schema response format once per output model.
+        """
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "schema": _to_strict_schema(output_model.model_json_schema()),
+                "name": output_model.__name__,
+                "strict": True,
+            },
+        }
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def get_result_adapter(output_model: type[BaseModel]) -> TypeAdapter:
+        """
+        Validates a stored result back into the type of the result field.
+        """
+        return TypeAdapter(output_model.model_fields["result"].annotation)
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def get_guided_params(output_model: type[BaseModel]) -> dict[str, Any]:
+        """
+        Derives the vLLM guided decoding parameters once per output model.
+        A boolean or literal result alone is decoded as a plain choice among its labels,
+        a string result alone with a regex, and any other model with its JSON schema.
+        """
+        if list(output_model.model_fields) == ["result"]:
+            if OperatorUtils.has_literal_result(output_model):
+                return {
+                    "guided_choice": [
+                        label if isinstance(label, str) else json.dumps(label)
+                        for label in OperatorUtils.get_literal_labels(output_model)
+                    ]
+                }
+            if output_model.model_fields["result"].annotation is str:
+                return {"guided_regex": _GUIDED_STR_PATTERN}
+
+        return {"guided_json": output_model.model_json_schema()}
+
+    @staticmethod
+    def parse_guided_content(
+        output_model: type[BaseModel], guided_params: dict[str, Any], content: str
+    ) -> BaseModel:
+        """
+        Parses the raw content of a guided completion into the output model.
+        """
+        if "guided_choice" in guided_params:
+            # The content is the bare label, lax validation turns "true" into True
+            return output_model.model_validate({"result": content.strip()})
+        return output_model.model_validate_json(content)
+
+    @staticmethod
+    def build_cache_key(
+        model: str,
+        prompt_file: str,
+        messages: list[dict[str, str]],
+        output_model: type[BaseModel],
+        temperature: float,
+        logprobs: bool,
+        top_logprobs: int,
+        max_completion_tokens: int | None,
+        logprobs_format: LogprobsFormat = "full",
+        label_probs: bool = False,
+        decoding_backend: DecodingBackend = "openai",
+        adaptive_analysis_threshold: float | None = None,
+    ) -> str:
+        """
+        Builds a content hash of everything that affects the operator output.
+        """
+        payload = {
+            "model": model,
+            "prompt_hash": OperatorUtils._hash_prompt_file(prompt_file),
+            "messages": messages,
+            "schema": OperatorUtils.get_response_format(output_model),
+            "temperature": temperature,
+            "logprobs": logprobs,
+            "top_logprobs": top_logprobs if logprobs or label_probs else None,
+            "logprobs_format": logprobs_format if logprobs else None,
+            "max_completion_tokens": max_completion_tokens,
+            "label_probs": label_probs,
+        }
+        # Only added for other backends, so that existing cache entries stay valid
+        if decoding_backend != "openai":
+            payload["decoding_backend"] = decoding_backend
+        if adaptive_analysis_threshold is not None:
+            payload["adaptive_analysis_threshold"] = adaptive_analysis_threshold
+        serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def extract_logprobs(
+        completion: Any, logprobs_format: LogprobsFormat = "full"
+    ) -> list[dict[str, Any]] | CompactLogprobs | LogprobsSummary:
         """
         Extracts and filters logprobs from completion.
         Skips punctuation and structural tokens.
+
+        The "full" format returns a list of dicts, "compact" stores the same data
+        in arrays and "summary" only keeps confidence statistics.
         """
-        logprobs_data = []
-        ignore_pattern = re.compile(r'^(result|[\s\[\]\{\}",:]+)$')
+        if logprobs_format == "summary":
+            return OperatorUtils._summarize_logprobs(completion)
+
+        compact = logprobs_format == "compact"
+        logprobs_data = CompactLogprobs() if compact else []
+        ignore_match = _LOGPROBS_IGNORE_PATTERN.match
 
         for choice in completion.choices:
             if not getattr(choice, "logprobs", None):
                 raise ValueError("Your model does not support logprobs")
 
             for logprob_item in choice.logprobs.content:
-                if ignore_pattern.match(logprob_item.token):
+                if ignore_match(logprob_item.token):
                     continue
-                token_entry = {
-                    "token": logprob_item.token,
-                    "prob": round(math.exp(logprob_item.logprob), 8),
-                    "top_alternatives": [],
-                }
-                for alt in logprob_item.top_logprobs:
-                    if ignore_pattern.match(alt.token):
-                        continue
-                    token_entry["top_alternatives"].append(
-                        {
-                            "token": alt.token,
-                            "prob": round(math.exp(alt.logprob), 8),
-                        }
+
+                if compact:
+                    logprobs_data.append(
+                        logprob_item.token,
+                        logprob_item.logprob,
+                        (
+                            (alt.token, alt.logprob)
+                            for alt in logprob_item.top_logprobs
+                            if not ignore_match(alt.token)
+                        ),
                     )
-                logprobs_data.append(token_entry)
+                    continue
+
+                logprobs_data.append(
+                    {
+                        "token": logprob_item.token,
+                        "prob": round(math.exp(logprob_item.logprob), 8),
+                        "top_alternatives": [
+                            {
+                                "token": alt.token,
+                                "prob": round(math.exp(alt.logprob), 8),
+                            }
+                            for alt in logprob_item.top_logprobs
+                            if not ignore_match(alt.token)
+                        ],
+                    }
+                )
 
         return logprobs_data
 
+    @staticmethod
+    def _summarize_logprobs(completion: Any) -> LogprobsSummary:
+        token_count = 0
+        min_prob = 1.0
+        prob_sum = 0.0
+        entropy_sum = 0.0
+        ignore_match = _LOGPROBS_IGNORE_PATTERN.match
+
+        for choice in completion.choices:
+            if not getattr(choice, "logprobs", None):
+                raise ValueError("Your model does not support logprobs")
+
+            for logprob_item in choice.logprobs.content:
+                if ignore_match(logprob_item.token):
+                    continue
+
+                prob = math.exp(logprob_item.logprob)
+                token_count += 1
+                prob_sum += prob
+                min_prob = min(min_prob, prob)
+                # Entropy is estimated from the returned top alternatives
+                entropy_sum -= sum(
+                    math.exp(alt.logprob) * alt.logprob
+                    for alt in logprob_item.top_logprobs
+                )
+
+        if not token_count:
+            return LogprobsSummary()
+
+        return LogprobsSummary(
+            token_count=token_count,
+            min_prob=min_prob,
+            mean_prob=prob_sum / token_count,
+            mean_entropy=entropy_sum / token_count,
+        )
+
+    @staticmethod
+    def combine_call_metadata(outputs: Iterable[Any]) -> dict[str, Any]:
+        """
+        Combines the per-call metadata of a run made of many calls, for operator
+        outputs or tool metadata alike. Retries add up, the analysis counts as
+        triggered when it ran for any call, and the cascade tier is the highest one reached.
+        """
+        retry_count = 0
+        analysis_triggered: bool | None = None
+        cascade_tier: int | None = None
+        for output in outputs:
+            retry_count += output.retry_count or 0
+            if output.analysis_triggered is not None:
+                analysis_triggered = (
+                    bool(analysis_triggered) or output.analysis_triggered
+                )
+            if output.cascade_tier is not None:
+                cascade_tier = max(cascade_tier or 0, output.cascade_tier)
+
+        return {
+            "retry_count": retry_count,
+            "analysis_triggered": analysis_triggered,
+            "cascade_tier": cascade_tier,
+        }
+
+    @staticmethod
+    def merge_logprobs(
+        parts: list[list[dict[str, Any]] | CompactLogprobs | LogprobsSummary],
+    ) -> list[dict[str, Any]] | CompactLogprobs | LogprobsSummary:
+        """
+        Merges the logprobs of several completions, e.g. tree levels or text chunks.
+        """
+        if parts and isinstance(parts[0], LogprobsSummary):
+            return LogprobsSummary.merge(parts)
+        if any(isinstance(part, CompactLogprobs) for part in parts):
+            return CompactLogprobs.concat(parts)
+        return [item for part in parts for item in part]
+
+    @staticmethod
+    def has_literal_result(output_model: type[BaseModel]) -> bool:
+        """
+        Whether the result of the model is one of a fixed set of labels.
+        """
+        annotation = output_model.model_fields["result"].annotation
+        return annotation is bool or get_origin(annotation) is Literal
+
+    @staticmethod
+    def get_literal_labels(output_model: type[BaseModel]) -> tuple[str | bool, ...]:
+        """
+        Returns the allowed values of a model built by `create_literal_model`,
+        or True and False for a boolean result.
+        """
+        annotation = output_model.model_fields["result"].annotation
+        if annotation is bool:
+            return (True, False)
+        return get_args(annotation)
+
+    @staticmethod
+    def label_token_budget(labels: Sequence[str | bool]) -> int:
+        """
+        Upper bound of the completion tokens of a result-only JSON output.
+        Counts bytes since byte-level tokenizers may split a character.
+        """
+        longest = max(
+            len(json.dumps({"result": label}, ensure_ascii=False).encode("utf-8"))
+            for label in labels
+        )
+        # Margin for whitespace the model may add around the structure
+        return longest + 8
+
+    @staticmethod
+    def extract_label_probs(
+        completion: Any, labels: Sequence[str | bool], plain: bool = False
+    ) -> dict[str, float]:
+        """
+        Estimates the probability of every label from the logprobs of the result value.
+        Boolean labels are keyed as "true" and "false".
+        With `plain`, the content is the bare label of a guided choice instead of a JSON object.
+
+        The generated label gets the joint probability of its tokens.
+        The other labels get the probability of the first token where they diverge
+        from the generated one, when it appears among the top alternatives, else 0.
+        """
+        # Labels are compared with the text the model generates
+        encoded = {}
+        for label in labels:
+            key = label if isinstance(label, str) else json.dumps(label)
+            encoded[key if plain else json.dumps(label, ensure_ascii=False)] = key
+        label_probs = dict.fromkeys(encoded.values(), 0.0)
+
+        choice = completion.choices[0]
+        if not getattr(choice, "logprobs", None):
+            raise ValueError("Your model does not support logprobs")
+
+        items = choice.logprobs.content
+        content = "".join(item.token for item in items)
+
+        if plain:
+            value_start, value_end = 0, len(content)
+            value = encoded.get(content.strip())
+        else:
+            match = _RESULT_VALUE_START.search(content)
+            if not match:
+                return label_probs
+
+            value_start = match.end()
+            try:
+                value, value_end = json.JSONDecoder().raw_decode(content, value_start)
+            except ValueError:
+                return label_probs
+
+        token_start = 0
+        generated = ""
+        prefix_logprob = 0.0
+
+        for item in items:
+            token_end = token_start + len(item.token)
+            if token_end <= value_start:
+                token_start = token_end
+                continue
+            if token_start >= value_end:
+                break
+
+            # The first value token may also hold the end of the key
+            skip = max(value_start - token_start, 0)
+            for alt in item.top_logprobs:
+                if alt.token[:skip] != item.token[:skip]:
+                    continue
+
+                candidate = generated + alt.token[skip:]
+                alt_prob = math.exp(prefix_logprob + alt.logprob)
+                for text, key in encoded.items():
+                    # The token may run past the label into the closing brace
+                    if text.startswith(candidate) or candidate.startswith(text):
+                        label_probs[key] = alt_prob
+
+            generated += item.token[skip:]
+            prefix_logprob += item.logprob
+            token_start = token_end
+
+        key = value if isinstance(value, str) else json.dumps(value)
+        if key in label_probs:
+            label_probs[key] = math.exp(prefix_logprob)
+
+        return label_probs
+
+    @staticmethod
+    def get_confidence(
+        result: Any,
+        logprobs: list[dict[str, Any]] | CompactLogprobs | LogprobsSummary | None,
+        label_probs: dict[str, float] | None = None,
+    ) -> float | None:
+        """
+        Estimates how confident the model was in an output.
+        Uses the probability of the chosen label when label probabilities are known,
+        else the mean probability of the generated tokens. None without logprobs.
+        """
+        if label_probs:
+            key = result if isinstance(result, str) else json.dumps(result)
+            return label_probs.get(key, 0.0)
+
+        if isinstance(logprobs, LogprobsSummary):
+            return logprobs.mean_prob
+        if isinstance(logprobs, CompactLogprobs):
+            probs = logprobs.probs
+            return sum(probs) / len(probs) if probs else None
+        if logprobs:
+            return sum(item["prob"] for item in logprobs) / len(logprobs)
+        return None
+
+    @staticmethod
+    def estimate_prompt_tokens(
+        messages: list[dict[str, str]], chars_per_token: float = 4.0
+    ) -> int:
+        """
+        Rough prompt token count of chat messages, without a tokenizer.
+        Every message adds a few tokens of chat formatting.
+        """
+        return 3 + sum(
+            4 + math.ceil(len(message["content"]) / chars_per_token)
+            for message in messages
+        )
+
     @staticmethod
     def get_retry_temp(base_temp: float) -> float:
         new_temp = base_temp + random.choice([-1, 1]) * random.uniform(0.1, 0.9)
@@ -282,6 +849,32 @@ class TheToolUtils:
 
         return _split_text(text, separators)
 
+    @staticmethod
+    def split_groups(items: list[Any], max_size: int) -> list[list[Any]]:
+        """
+        Splits the items into the fewest contiguous groups of at most `max_size`,
+        with group sizes differing by one at most.
+        """
+        group_count = -(-len(items) // max_size)
+        bounds = [len(items) * i // group_count for i in range(group_count + 1)]
+        return [items[start:end] for start, end in pairwise(bounds)]
+
+    @staticmethod
+    def label_paths(
+        paths: list[list[str]], separator: str = " > "
+    ) -> dict[str, list[str]]:
+        """
+        Maps a label joining the names of every path to the path.
+        Names containing the separator are rejected, two paths could share a label.
+        """
+        for path in paths:
+            for name in path:
+                if separator in name:
+                    raise ValueError(
+                        f"Category name '{name}' contains the path separator '{separator}'"
+                    )
+        return {separator.join(path): path for path in paths}
+
     @staticmethod
     async def run_with_timeout(coro: Any, timeout: float | None) -> Any:
         if timeout is None:
@@ -293,36 +886,44 @@ class TheToolUtils:
 
     @staticmethod
     def normalize(text: str) -> str:
-        # Remove separators
-        text = "\n".join(
-            line
-            for line in text.splitlines()
-            if line.strip() and not all(c == "*" for c in line.strip())
-        )
+        # Remove empty lines and separator lines made of "*" or "-"
         text = "\n".join(
             line
             for line in text.splitlines()
-            if line.strip() and not all(c == "-" for c in line.strip())
+            if (stripped := line.strip())
+            and stripped.strip("*")
+            and stripped.strip("-")
         )
 
-        trans = str.maketrans(
-            {
-                # Quotes (existing)
-                "\u201c": '"',
-                "\u201d": '"',
-                "\u2018": "'",
-                "\u2019": "'",
-                # Additional typographic punctuation
-                "\u2013": "-",
-                "\u2014": "-",
-                "\u2026": "...",
-                "\u00a0": " ",
-                "\u200b": None,
-            }
-        )
-        text = ("" if text is None else str(text)).translate(trans)
+        # Normalize typographic punctuation, str.replace is much faster than
+        # str.translate with a dict table on large texts
+        for char, replacement in _NORMALIZE_REPLACEMENTS:
+            if char in text:
+                text = text.replace(char, replacement)
 
         # Collapse multiple spaces and tabs
-        text = re.sub(r"[ \t]+", " ", text)
+        if "\t" in text or "  " in text:
+            text = _WHITESPACE_RUN.sub(" ", text)
 
         return text
+
+    @staticmethod
+    def normalize_many(
+        texts: list[str],
+        max_workers: int | None = None,
+        min_total_chars: int = 1_000_000,
+    ) -> list[str]:
+        """
+        Normalizes many texts, using a process pool for large corpora.
+        Inputs smaller than `min_total_chars` are normalized in the current process.
+        """
+        if len(texts) < 2 or sum(len(text) for text in texts) < min_total_chars:
+            return [TheToolUtils.normalize(text) for text in texts]
+
+        max_workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(texts) // (max_workers * 4))
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(
+                executor.map(TheToolUtils.normalize, texts, chunksize=chunksize)
+            )
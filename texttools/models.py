@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+from collections import Counter
+from collections.abc import Iterator
 from datetime import datetime
 from typing import Any
 
 from pydantic import BaseModel, Field
 
-from .core import TokenUsage
+from .core import CompactLogprobs, LogprobsSummary, TokenUsage
 
 
 class ToolOutputMetadata(BaseModel):
@@ -14,12 +16,20 @@ class ToolOutputMetadata(BaseModel):
     processed_at: datetime = Field(default_factory=datetime.now)
     execution_time: float | None = None
     token_usage: TokenUsage | None = None
+    cache_hit: bool = False
+    # Share of the BM25 score the CategoryIndex shortlist covers, not a measured recall
+    shortlist_recall: float | None = None
+    cascade_tier: int | None = None
+    tier_token_usage: list[TokenUsage] | None = None
+    analysis_triggered: bool | None = None
+    retry_count: int | None = None
 
 
 class ToolOutput(BaseModel):
     result: Any = None
     analysis: str | None = None
-    logprobs: list[dict[str, Any]] | None = None
+    logprobs: list[dict[str, Any]] | CompactLogprobs | LogprobsSummary | None = None
+    label_probs: dict[str, float] | None = None
     errors: list[str] = []
     metadata: ToolOutputMetadata
 
@@ -38,16 +48,40 @@ class CategoryTree:
     def __init__(self):
         self._root = CategoryNode(name="root", description="root", depth=0)
         self._all_nodes = {"root": self._root}
+        # Parent name of every node and number of nodes per depth,
+        # kept in sync with the nodes so lookups don't walk the tree
+        self._parents: dict[str, str | None] = {"root": None}
+        self._depth_counts: Counter[int] = Counter({0: 1})
 
     def get_all_nodes(self) -> dict[str, CategoryNode]:
         return self._all_nodes
 
     def get_max_depth(self) -> int:
-        return max(node.depth for node in self._all_nodes.values())
+        return max(self._depth_counts)
 
     def get_node(self, name: str) -> CategoryNode | None:
         return self._all_nodes.get(name)
 
+    def get_path(self, name: str) -> list[str]:
+        """
+        Returns the category names from the first level down to the given node.
+        """
+        if name not in self._all_nodes:
+            raise ValueError(f"Category: {name} not found")
+
+        path = []
+        while name is not None and name != self._root.name:
+            path.append(name)
+            name = self._parents[name]
+        return path[::-1]
+
+    def get_leaf_paths(self) -> list[list[str]]:
+        return [
+            self.get_path(name)
+            for name, node in self._all_nodes.items()
+            if not node.children and node is not self._root
+        ]
+
     def add_node(
         self,
         name: str,
@@ -70,6 +104,8 @@ class CategoryTree:
         new_node = CategoryNode(**node_data)
         parent.children[name] = new_node
         self._all_nodes[name] = new_node
+        self._parents[name] = parent_name
+        self._depth_counts[new_node.depth] += 1
 
     def remove_node(self, name: str, remove_children: bool = True) -> None:
         if name == "root":
@@ -84,26 +120,31 @@ class CategoryTree:
             raise ValueError("Parent not found, tree inconsistent")
 
         if remove_children:
-            # Recursively remove children
-            for child_name in list(node.children.keys()):
-                self.remove_node(child_name, remove_children=True)
+            for removed in self._iter_subtree(node):
+                del self._all_nodes[removed.name]
+                del self._parents[removed.name]
+                self._discount_depth(removed.depth)
         else:
             # Move children to parent (grandparent for the children)
-            for child_name, child in list(node.children.items()):
+            for child_name in node.children:
                 if child_name in parent.children:
                     raise ValueError(f"Name conflict when moving child {child_name}")
+
+            for child_name, child in node.children.items():
                 parent.children[child_name] = child
+                self._parents[child_name] = parent.name
 
-                # Update depths for moved subtree
-                def update_depths(n: CategoryNode, new_depth: int):
-                    n.depth = new_depth
-                    for c in n.children.values():
-                        update_depths(c, new_depth + 1)
+                # Moved subtrees go up by one level
+                for moved in self._iter_subtree(child):
+                    self._discount_depth(moved.depth)
+                    moved.depth -= 1
+                    self._depth_counts[moved.depth] += 1
 
-                update_depths(child, parent.depth + 1)
+            del self._all_nodes[name]
+            del self._parents[name]
+            self._discount_depth(node.depth)
 
         del parent.children[name]
-        del self._all_nodes[name]
 
     def dump_tree(self) -> dict:
         return self._root.model_dump()
@@ -113,29 +154,38 @@ class CategoryTree:
         tree = cls()
         tree._root = CategoryNode.model_validate(root)
         tree._all_nodes = {}
+        tree._parents = {tree._root.name: None}
+        tree._depth_counts = Counter()
         tree._index_subtree(tree._root)
         return tree
 
     def _index_subtree(self, node: CategoryNode):
-        if node.name in self._all_nodes:
-            raise ValueError(f"Duplicate node name: {node.name}")
+        for indexed in self._iter_subtree(node):
+            if indexed.name in self._all_nodes:
+                raise ValueError(f"Duplicate node name: {indexed.name}")
 
-        self._all_nodes[node.name] = node
-
-        for child in node.children.values():
-            self._index_subtree(child)
+            self._all_nodes[indexed.name] = indexed
+            self._depth_counts[indexed.depth] += 1
+            for child_name in indexed.children:
+                self._parents[child_name] = indexed.name
 
     def _find_parent(self, name: str) -> CategoryNode | None:
-        def traverse(node: CategoryNode) -> CategoryNode | None:
-            if name in node.children:
-                return node
-            for child in node.children.values():
-                found = traverse(child)
-                if found:
-                    return found
-            return None
-
-        if name == "root":
+        parent_name = self._parents.get(name)
+        if parent_name is None:
             return None
 
-        return traverse(self._root)
+        return self._all_nodes[parent_name]
+
+    def _discount_depth(self, depth: int) -> None:
+        self._depth_counts[depth] -= 1
+        if not self._depth_counts[depth]:
+            del self._depth_counts[depth]
+
+    @staticmethod
+    def _iter_subtree(node: CategoryNode) -> Iterator[CategoryNode]:
+        # Iterative pre-order traversal, deep taxonomies don't hit the recursion limit
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(current.children.values())
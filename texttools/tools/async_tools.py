@@ -1,7 +1,11 @@
 import asyncio
+import heapq
 import logging
+import math
 import warnings
+from collections import Counter
 from collections.abc import Callable
+from itertools import count
 from time import perf_counter
 from typing import Any, Literal
 
@@ -10,17 +14,29 @@ from pydantic import BaseModel
 from typing_extensions import deprecated
 
 from ..core import (
+    AdaptiveConcurrencyLimiter,
+    AsyncCascadeOperator,
     AsyncOperator,
     Bool,
+    CacheBackend,
+    CategoryIndex,
+    DecodingBackend,
     ListDictStrStr,
     ListStr,
+    LogprobsFormat,
+    OperatorUtils,
+    PromptLayout,
+    RateLimiter,
     ReasonListStr,
+    RetryPolicy,
     Str,
     TheToolUtils,
-    TokenUsage,
+    TokenBudgetLimiter,
+    TokenUsageAccumulator,
     create_literal_model,
 )
-from ..models import CategoryTree, ToolOutput, ToolOutputMetadata
+from ..core.internal_models import OperatorOutput
+from ..models import CategoryNode, CategoryTree, ToolOutput, ToolOutputMetadata
 
 
 class AsyncTheTool:
@@ -29,6 +45,19 @@ class AsyncTheTool:
         client: AsyncOpenAI,
         model: str,
         raise_on_error: bool = True,
+        cache: CacheBackend | None = None,
+        logprobs_format: LogprobsFormat = "full",
+        validate_outputs: bool = False,
+        decoding_backend: DecodingBackend = "openai",
+        cascade_models: list[str] | None = None,
+        cascade_threshold: float | dict[str, float] = 0.9,
+        adaptive_analysis_threshold: float = 0.9,
+        prompt_layout: PromptLayout = "default",
+        prompt_cache_key: str | None = None,
+        retry_policy: RetryPolicy | None = None,
+        concurrency_limiter: AdaptiveConcurrencyLimiter | None = None,
+        rate_limiter: RateLimiter | None = None,
+        token_limiter: TokenBudgetLimiter | None = None,
     ) -> None:
         """
         Initialize the AsyncTheTool instance.
@@ -37,16 +66,98 @@ class AsyncTheTool:
             client: An AsyncOpenAI client instance for making asynchronous API calls
             model: The name of the model
             raise_on_error: If True, raises exceptions on errors; if False, logs errors and continues
+            cache: Optional cache backend used to reuse results of identical requests
+            logprobs_format: full -> list of dicts, compact -> array-backed CompactLogprobs, summary -> LogprobsSummary with confidence statistics only
+            validate_outputs: If True, outputs are built with full pydantic validation instead of the trusted fast path
+            decoding_backend: openai -> structured outputs with a response_format, vllm -> vLLM guided decoding (guided_choice, guided_regex or guided_json) in extra_body
+            cascade_models: Cheaper models tried in order before `model`, an answer is escalated to the next model when its confidence is below cascade_threshold
+            cascade_threshold: Minimum confidence to keep the answer of a cascade model, or a mapping of tool names to it. Tools missing from the mapping only run on `model`
+            adaptive_analysis_threshold: With with_analysis="adaptive", minimum confidence of the first answer to skip the analysis
+            prompt_layout: default -> one user message, prefix_cache -> the static instructions go first in a system message and the per-request parts last, so that requests share their prompt prefix on servers with prefix caching
+            prompt_cache_key: Stable key sent as prompt_cache_key with every request, which helps providers route requests with the same prefix to the same cache
+            retry_policy: Retries of rate limits, server errors and connection failures, defaults to RetryPolicy()
+            concurrency_limiter: Adaptive limit on the requests in flight, it can be shared by many instances
+            rate_limiter: Client-side requests and tokens per minute quotas, it can be shared by many instances
+            token_limiter: Caps the estimated tokens of the requests in flight, it can be shared by many instances
         """
-        self._operator = AsyncOperator(client=client, model=model)
+        self._operator = AsyncOperator(
+            client=client,
+            model=model,
+            cache=cache,
+            logprobs_format=logprobs_format,
+            decoding_backend=decoding_backend,
+            adaptive_analysis_threshold=adaptive_analysis_threshold,
+            prompt_layout=prompt_layout,
+            prompt_cache_key=prompt_cache_key,
+            retry_policy=retry_policy,
+            concurrency_limiter=concurrency_limiter,
+            rate_limiter=rate_limiter,
+            token_limiter=token_limiter,
+        )
+        if cascade_models:
+            self._operator = AsyncCascadeOperator(
+                operators=[
+                    AsyncOperator(
+                        client=client,
+                        model=cascade_model,
+                        cache=cache,
+                        logprobs_format=logprobs_format,
+                        decoding_backend=decoding_backend,
+                        adaptive_analysis_threshold=adaptive_analysis_threshold,
+                        prompt_layout=prompt_layout,
+                        prompt_cache_key=prompt_cache_key,
+                        retry_policy=retry_policy,
+                        concurrency_limiter=concurrency_limiter,
+                        rate_limiter=rate_limiter,
+                        token_limiter=token_limiter,
+                    )
+                    for cascade_model in cascade_models
+                ]
+                + [self._operator],
+                thresholds=cascade_threshold,
+            )
         self.logger = logging.getLogger(self.__class__.__name__)
         self.raise_on_error = raise_on_error
+        self.validate_outputs = validate_outputs
+
+    def _build_metadata(self, **data: Any) -> ToolOutputMetadata:
+        if self.validate_outputs:
+            return ToolOutputMetadata(**data)
+        return ToolOutputMetadata.model_construct(**data)
+
+    def _metadata_from(
+        self,
+        operator_output: OperatorOutput,
+        tool_name: str,
+        start: float,
+        **extra: Any,
+    ) -> ToolOutputMetadata:
+        """
+        Builds the metadata of a run that made a single operator call.
+        """
+        return self._build_metadata(
+            tool_name=tool_name,
+            execution_time=perf_counter() - start,
+            processed_by=operator_output.processed_by,
+            token_usage=operator_output.token_usage,
+            cache_hit=operator_output.cache_hit,
+            cascade_tier=operator_output.cascade_tier,
+            tier_token_usage=operator_output.tier_token_usage,
+            analysis_triggered=operator_output.analysis_triggered,
+            retry_count=operator_output.retry_count,
+            **extra,
+        )
+
+    def _build_output(self, **data: Any) -> ToolOutput:
+        if self.validate_outputs:
+            return ToolOutput(**data)
+        return ToolOutput.model_construct(**data)
 
     async def categorize(
         self,
         text: str,
-        categories: list[str] | CategoryTree,
-        with_analysis: bool = False,
+        categories: list[str] | CategoryTree | CategoryIndex,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         user_prompt: str | None = None,
         temperature: float = 0.0,
         normalize: bool = True,
@@ -57,14 +168,20 @@ class AsyncTheTool:
         max_validation_retries: int = 3,
         priority: int | None = None,
         timeout: float | None = None,
+        beam_width: int = 1,
+        flatten_tree: bool = False,
+        min_confidence: float | None = None,
+        shortlist_size: int = 50,
+        max_group_size: int | None = None,
+        score_labels: bool = False,
     ) -> ToolOutput:
         """
         Classify text into given categories
 
         Arguments:
             text: The input text
-            categories: The category list or category tree
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            categories: The category list, category tree or category index
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             user_prompt: Additional instructions
             temperature: Controls randomness
             normalize: Whether to apply text normalization before sending to the LLM
@@ -75,6 +192,12 @@ class AsyncTheTool:
             max_validation_retries: Maximum number of retry attempts if validation fails
             priority: Task execution priority (if enabled by vLLM and the model)
             timeout: Maximum time in seconds to wait for the response before raising a timeout error
+            beam_width: With a category tree, number of candidate children explored concurrently at each level, 1 walks the tree greedily
+            flatten_tree: With a category tree, classifies among all root-to-leaf paths in a single call instead of one call per level
+            min_confidence: With flatten_tree, falls back to the level-by-level walk when the probability of the chosen path is below this value
+            shortlist_size: With a CategoryIndex, maximum number of matching categories offered to the LLM
+            max_group_size: With a category tree, levels with more children are split into groups classified concurrently, and the group winners go through a run-off
+            score_labels: Asks only for the label with a capped completion, and returns the estimated probability of every label in label_probs (flat category lists only)
 
         Returns:
             ToolOutput
@@ -101,33 +224,213 @@ class AsyncTheTool:
                         priority=priority,
                         # Internal parameters
                         tool_name=tool_name,
-                        output_model=create_literal_model(categories),
+                        label_probs=score_labels,
+                        output_model=create_literal_model(
+                            categories, with_reason=not score_labels
+                        ),
                         mode=None,
                         output_lang=None,
                     ),
                     timeout=timeout,
                 )
 
-                metadata = ToolOutputMetadata(
-                    tool_name=tool_name,
-                    execution_time=perf_counter() - start,
-                    processed_by=operator_output.processed_by,
-                    token_usage=operator_output.token_usage,
+                metadata = self._metadata_from(operator_output, tool_name, start)
+                tool_output = self._build_output(
+                    result=operator_output.result,
+                    analysis=operator_output.analysis,
+                    logprobs=operator_output.logprobs,
+                    label_probs=operator_output.label_probs,
+                    metadata=metadata,
+                )
+
+            elif isinstance(categories, CategoryIndex):
+                text = TheToolUtils.normalize(text) if normalize else text
+                category_names, shortlist_recall = categories.shortlist(
+                    text, shortlist_size
+                )
+
+                self.logger.info(
+                    f"Shortlisted {len(category_names)} of {len(categories)} categories"
                 )
-                tool_output = ToolOutput(
+
+                operator_output = await TheToolUtils.run_with_timeout(
+                    self._operator.run(
+                        # Parameters used for prompt injection
+                        text=text,
+                        category_list=categories.render(category_names),
+                        # Parameters used for chat completions & operator usage
+                        with_analysis=with_analysis,
+                        user_prompt=user_prompt,
+                        temperature=temperature,
+                        logprobs=logprobs,
+                        top_logprobs=top_logprobs,
+                        max_completion_tokens=max_completion_tokens,
+                        validator=validator,
+                        max_validation_retries=max_validation_retries,
+                        priority=priority,
+                        # Internal parameters
+                        tool_name=tool_name,
+                        label_probs=score_labels,
+                        output_model=create_literal_model(
+                            category_names, with_reason=not score_labels
+                        ),
+                        mode=None,
+                        output_lang=None,
+                    ),
+                    timeout=timeout,
+                )
+
+                metadata = self._metadata_from(
+                    operator_output, tool_name, start, shortlist_recall=shortlist_recall
+                )
+                tool_output = self._build_output(
                     result=operator_output.result,
                     analysis=operator_output.analysis,
                     logprobs=operator_output.logprobs,
+                    label_probs=operator_output.label_probs,
+                    metadata=metadata,
+                )
+
+            elif flatten_tree:
+                # Normalize once, the fallback walk reuses the normalized text
+                text = TheToolUtils.normalize(text) if normalize else text
+                paths = TheToolUtils.label_paths(categories.get_leaf_paths())
+                category_list = [
+                    f"Category Name: {label}, Description: {categories.get_node(path[-1]).description}"
+                    for label, path in paths.items()
+                ]
+
+                operator_output = await TheToolUtils.run_with_timeout(
+                    self._operator.run(
+                        # Parameters used for prompt injection
+                        text=text,
+                        category_list=category_list,
+                        # Parameters used for chat completions & operator usage
+                        with_analysis=with_analysis,
+                        user_prompt=user_prompt,
+                        temperature=temperature,
+                        logprobs=logprobs,
+                        top_logprobs=top_logprobs,
+                        max_completion_tokens=max_completion_tokens,
+                        validator=validator,
+                        max_validation_retries=max_validation_retries,
+                        priority=priority,
+                        label_probs=min_confidence is not None,
+                        # Internal parameters
+                        tool_name=tool_name,
+                        output_model=create_literal_model(list(paths)),
+                        mode=None,
+                        output_lang=None,
+                    ),
+                    timeout=timeout,
+                )
+
+                confidence = (
+                    operator_output.label_probs[operator_output.result]
+                    if min_confidence is not None
+                    else None
+                )
+
+                if confidence is not None and confidence < min_confidence:
+                    self.logger.info(
+                        f"Path confidence {confidence:.3f} is below {min_confidence}, walking the tree level by level..."
+                    )
+                    tool_output = await self.categorize(
+                        text=text,
+                        categories=categories,
+                        with_analysis=with_analysis,
+                        user_prompt=user_prompt,
+                        temperature=temperature,
+                        normalize=False,
+                        logprobs=logprobs,
+                        top_logprobs=top_logprobs,
+                        max_completion_tokens=max_completion_tokens,
+                        validator=validator,
+                        max_validation_retries=max_validation_retries,
+                        priority=priority,
+                        timeout=timeout,
+                        beam_width=beam_width,
+                        max_group_size=max_group_size,
+                    )
+
+                    # The flat attempt is part of the cost of this call
+                    if tool_output.metadata.token_usage is not None:
+                        tool_output.metadata.token_usage += operator_output.token_usage
+                    tool_output.metadata.cache_hit = (
+                        tool_output.metadata.cache_hit and operator_output.cache_hit
+                    )
+                    tool_output.metadata.execution_time = perf_counter() - start
+                    tool_output.metadata = tool_output.metadata.model_copy(
+                        update=OperatorUtils.combine_call_metadata(
+                            [tool_output.metadata, operator_output]
+                        )
+                    )
+
+                else:
+                    metadata = self._metadata_from(operator_output, tool_name, start)
+                    tool_output = self._build_output(
+                        result=paths[operator_output.result],
+                        analysis=operator_output.analysis,
+                        logprobs=operator_output.logprobs,
+                        label_probs=operator_output.label_probs,
+                        metadata=metadata,
+                    )
+
+            elif beam_width > 1:
+                (
+                    path,
+                    path_outputs,
+                    token_usage,
+                    cache_hit,
+                    call_metadata,
+                ) = await self._beam_search_tree(
+                    # Normalize once instead of once per level
+                    text=TheToolUtils.normalize(text) if normalize else text,
+                    categories=categories,
+                    beam_width=beam_width,
+                    with_analysis=with_analysis,
+                    user_prompt=user_prompt,
+                    temperature=temperature,
+                    logprobs=logprobs,
+                    top_logprobs=top_logprobs,
+                    max_completion_tokens=max_completion_tokens,
+                    validator=validator,
+                    max_validation_retries=max_validation_retries,
+                    priority=priority,
+                    timeout=timeout,
+                    max_group_size=max_group_size,
+                )
+
+                metadata = self._build_metadata(
+                    tool_name=tool_name,
+                    execution_time=perf_counter() - start,
+                    processed_by=path_outputs[-1].processed_by,
+                    token_usage=token_usage.to_token_usage(),
+                    cache_hit=cache_hit,
+                    **call_metadata,
+                )
+                tool_output = self._build_output(
+                    result=path,
+                    analysis=path_outputs[0].analysis,
+                    logprobs=OperatorUtils.merge_logprobs(
+                        [output.logprobs for output in path_outputs]
+                    )
+                    if logprobs
+                    else None,
                     metadata=metadata,
                 )
 
             else:
                 max_depth = categories.get_max_depth()
                 parent_node = categories.get_node("root")
+                # Normalize once instead of once per level
+                text = TheToolUtils.normalize(text) if normalize else text
                 final_categories = []
-                analysis = ""
+                analysis: str | None = None
                 logprobs_list = []
-                token_usage = TokenUsage()
+                level_outputs = []
+                token_usage = TokenUsageAccumulator()
+                cache_hit = True
 
                 for level in range(max_depth):
                     self.logger.info(f"Processing level {level + 1} of the tree...")
@@ -135,40 +438,30 @@ class AsyncTheTool:
                     if not parent_node.children:
                         break
 
-                    category_list = [
-                        f"Category Name: {name}, Description: {node.description}"
-                        for name, node in parent_node.children.items()
-                    ]
                     category_names = list(parent_node.children.keys())
 
                     self.logger.info(
                         f"Categories available in the current level: {category_names}"
                     )
 
-                    level_operator_output = await TheToolUtils.run_with_timeout(
-                        self._operator.run(
-                            # Parameters used for prompt injection
-                            text=TheToolUtils.normalize(text) if normalize else text,
-                            category_list=category_list,
-                            # Parameters used for chat completions & operator usage
-                            with_analysis=with_analysis,
-                            user_prompt=user_prompt,
-                            temperature=temperature,
-                            logprobs=logprobs,
-                            top_logprobs=top_logprobs,
-                            max_completion_tokens=max_completion_tokens,
-                            validator=validator,
-                            max_validation_retries=max_validation_retries,
-                            priority=priority,
-                            # Internal parameters
-                            tool_name=tool_name,
-                            output_model=create_literal_model(category_names),
-                            mode=None,
-                            output_lang=None,
-                        ),
+                    level_operator_output = await self.run_tree_level(
+                        text=text,
+                        node=parent_node,
+                        with_analysis=with_analysis,
+                        analysis=analysis,
+                        user_prompt=user_prompt,
+                        temperature=temperature,
+                        logprobs=logprobs,
+                        top_logprobs=top_logprobs,
+                        max_completion_tokens=max_completion_tokens,
+                        validator=validator,
+                        max_validation_retries=max_validation_retries,
+                        priority=priority,
                         timeout=timeout,
+                        max_group_size=max_group_size,
                     )
 
+                    level_outputs.append(level_operator_output)
                     chosen_category = level_operator_output.result
                     parent_node = categories.get_node(chosen_category)
 
@@ -181,22 +474,26 @@ class AsyncTheTool:
 
                     final_categories.append(chosen_category)
 
+                    # The analysis only depends on the text, so it is reused by the next levels
                     if with_analysis:
-                        analysis += level_operator_output.analysis
+                        analysis = level_operator_output.analysis
                     if logprobs:
-                        logprobs_list.extend(level_operator_output.logprobs)
+                        logprobs_list.append(level_operator_output.logprobs)
                     token_usage += level_operator_output.token_usage
+                    cache_hit = cache_hit and level_operator_output.cache_hit
 
-                metadata = ToolOutputMetadata(
+                metadata = self._build_metadata(
                     tool_name=tool_name,
                     execution_time=perf_counter() - start,
                     processed_by=level_operator_output.processed_by,
-                    token_usage=token_usage,
+                    token_usage=token_usage.to_token_usage(),
+                    cache_hit=cache_hit,
+                    **OperatorUtils.combine_call_metadata(level_outputs),
                 )
-                tool_output = ToolOutput(
+                tool_output = self._build_output(
                     result=final_categories,
                     analysis=analysis,
-                    logprobs=logprobs_list,
+                    logprobs=OperatorUtils.merge_logprobs(logprobs_list),
                     metadata=metadata,
                 )
 
@@ -206,19 +503,271 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
         return tool_output
 
+    async def run_tree_level(
+        self,
+        text: str,
+        node: CategoryNode,
+        with_analysis: bool | Literal["adaptive", "inline"],
+        analysis: str | None,
+        user_prompt: str | None,
+        temperature: float,
+        logprobs: bool,
+        top_logprobs: int,
+        max_completion_tokens: int | None,
+        validator: Callable[[Any], bool] | None,
+        max_validation_retries: int,
+        priority: int | None,
+        timeout: float | None,
+        label_probs: bool = False,
+        max_group_size: int | None = None,
+    ) -> OperatorOutput:
+        """
+        Chooses one of the children of `node` for the text.
+        Wider levels than `max_group_size` are classified as concurrent groups
+        whose winners go through a run-off, until one group is left.
+        Internal step of categorize, also used by the level-synchronous walk of BatchTheTool.
+        """
+
+        async def run_group(
+            children: list[CategoryNode], analysis: str | None
+        ) -> OperatorOutput:
+            return await TheToolUtils.run_with_timeout(
+                self._operator.run(
+                    # Parameters used for prompt injection
+                    text=text,
+                    category_list=[
+                        f"Category Name: {child.name}, Description: {child.description}"
+                        for child in children
+                    ],
+                    # Parameters used for chat completions & operator usage
+                    with_analysis=with_analysis,
+                    analysis=analysis,
+                    user_prompt=user_prompt,
+                    temperature=temperature,
+                    logprobs=logprobs,
+                    top_logprobs=top_logprobs,
+                    max_completion_tokens=max_completion_tokens,
+                    validator=validator,
+                    max_validation_retries=max_validation_retries,
+                    priority=priority,
+                    label_probs=label_probs,
+                    # Internal parameters
+                    tool_name="categorize",
+                    output_model=create_literal_model(
+                        [child.name for child in children]
+                    ),
+                    mode=None,
+                    output_lang=None,
+                ),
+                timeout=timeout,
+            )
+
+        if max_group_size is not None and max_group_size < 2:
+            raise ValueError("max_group_size should be at least 2")
+
+        candidates = list(node.children.values())
+        token_usage = TokenUsageAccumulator()
+        cache_hit = True
+        group_calls: list[OperatorOutput] = []
+
+        while max_group_size and len(candidates) > max_group_size:
+            groups = TheToolUtils.split_groups(candidates, max_group_size)
+            self.logger.info(
+                f"Splitting {len(candidates)} categories into {len(groups)} groups..."
+            )
+
+            # The first group generates the analysis that the other groups reuse
+            if with_analysis and not analysis:
+                first_output = await run_group(groups.pop(0), analysis)
+                analysis = first_output.analysis
+                group_outputs = [first_output]
+            else:
+                group_outputs = []
+
+            group_outputs += await asyncio.gather(
+                *(run_group(group, analysis) for group in groups)
+            )
+            for group_output in group_outputs:
+                token_usage += group_output.token_usage
+                cache_hit = cache_hit and group_output.cache_hit
+
+            group_calls += group_outputs
+            candidates = [node.children[output.result] for output in group_outputs]
+
+        final_output = await run_group(candidates, analysis)
+        if len(candidates) == len(node.children):
+            return final_output
+
+        # The run-off decides, the groups only add to the cost
+        token_usage += final_output.token_usage
+        final_output.token_usage = token_usage.to_token_usage()
+        final_output.cache_hit = cache_hit and final_output.cache_hit
+        return final_output.model_copy(
+            update=OperatorUtils.combine_call_metadata(group_calls + [final_output])
+        )
+
+    async def _beam_search_tree(
+        self,
+        text: str,
+        categories: CategoryTree,
+        beam_width: int,
+        with_analysis: bool | Literal["adaptive", "inline"],
+        user_prompt: str | None,
+        temperature: float,
+        logprobs: bool,
+        top_logprobs: int,
+        max_completion_tokens: int | None,
+        validator: Callable[[Any], bool] | None,
+        max_validation_retries: int,
+        priority: int | None,
+        timeout: float | None,
+        max_group_size: int | None,
+    ) -> tuple[
+        list[str], list[OperatorOutput], TokenUsageAccumulator, bool, dict[str, Any]
+    ]:
+        """
+        Best-first search over the category tree, scored by the joint probability of the path.
+        Each finished level launches its top `beam_width` children right away, and at most
+        `beam_width` levels run concurrently and are expanded per depth.
+        In-flight branches that can no longer beat the best complete path are cancelled.
+
+        Returns the best path, the level outputs along it, the token usage, whether every call
+        hit the cache and the combined metadata of every call.
+        """
+        token_usage = TokenUsageAccumulator()
+        cache_hit = True
+        finished: list[OperatorOutput] = []
+        analysis: str | None = None
+        expansions: Counter[int] = Counter()
+        order = count()
+        # Heap of (-log probability, insertion order, path, node, level outputs)
+        frontier: list[
+            tuple[float, int, list[str], CategoryNode, list[OperatorOutput]]
+        ] = [(0.0, next(order), [], categories.get_node("root"), [])]
+        best: tuple[float, list[str], list[OperatorOutput]] | None = None
+        in_flight: dict[
+            asyncio.Task, tuple[float, list[str], list[OperatorOutput]]
+        ] = {}
+
+        async def run_level(node: CategoryNode) -> OperatorOutput:
+            return await self.run_tree_level(
+                text=text,
+                node=node,
+                with_analysis=with_analysis,
+                analysis=analysis,
+                user_prompt=user_prompt,
+                temperature=temperature,
+                logprobs=logprobs,
+                top_logprobs=max(top_logprobs, beam_width),
+                max_completion_tokens=max_completion_tokens,
+                validator=validator,
+                max_validation_retries=max_validation_retries,
+                priority=priority,
+                timeout=timeout,
+                label_probs=True,
+                max_group_size=max_group_size,
+            )
+
+        try:
+            while frontier or in_flight:
+                while frontier and len(in_flight) < beam_width:
+                    neg_score, _, path, node, outputs = heapq.heappop(frontier)
+                    # Log probabilities only decrease along a path
+                    if best and -neg_score <= best[0]:
+                        frontier.clear()
+                        break
+                    if expansions[len(path)] >= beam_width:
+                        continue
+
+                    expansions[len(path)] += 1
+                    task = asyncio.create_task(run_level(node))
+                    in_flight[task] = (-neg_score, path, outputs)
+
+                if not in_flight:
+                    break
+
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    score, path, outputs = in_flight.pop(task)
+                    level_output = task.result()
+                    finished.append(level_output)
+                    token_usage += level_output.token_usage
+                    cache_hit = cache_hit and level_output.cache_hit
+                    # The analysis only depends on the text, so it is reused by the next levels
+                    if with_analysis and analysis is None:
+                        analysis = level_output.analysis
+
+                    candidates = sorted(
+                        (
+                            (name, prob)
+                            for name, prob in level_output.label_probs.items()
+                            if prob > 0
+                        ),
+                        key=lambda item: item[1],
+                        reverse=True,
+                    )[:beam_width] or [(level_output.result, 1.0)]
+
+                    self.logger.info(f"Candidate categories: {candidates}")
+
+                    for name, prob in candidates:
+                        child = categories.get_node(name)
+                        if not child:
+                            continue
+
+                        child_score = score + math.log(prob)
+                        child_path = path + [name]
+                        child_outputs = outputs + [level_output]
+                        if child.children:
+                            heapq.heappush(
+                                frontier,
+                                (
+                                    -child_score,
+                                    next(order),
+                                    child_path,
+                                    child,
+                                    child_outputs,
+                                ),
+                            )
+                        elif best is None or child_score > best[0]:
+                            best = (child_score, child_path, child_outputs)
+
+                if best:
+                    for task, (score, _, _) in list(in_flight.items()):
+                        if score <= best[0]:
+                            task.cancel()
+                            del in_flight[task]
+
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        if best is None:
+            raise ValueError("No category path found in the tree")
+
+        _, path, outputs = best
+        return (
+            path,
+            outputs,
+            token_usage,
+            cache_hit,
+            OperatorUtils.combine_call_metadata(finished),
+        )
+
     async def extract_keywords(
         self,
         text: str,
         mode: Literal["auto", "threshold", "count"] = "auto",
         number_of_keywords: int | None = None,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -238,7 +787,7 @@ class AsyncTheTool:
             text: The input text
             mode: auto -> decide n of keywords automatically, threshold -> decide n of keywords by a threshold, count -> takes number of keywords as the parameter
             number_of_keywords: Must be set only when using "count" mode
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -287,13 +836,8 @@ class AsyncTheTool:
                 timeout=timeout,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -306,8 +850,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -317,7 +861,7 @@ class AsyncTheTool:
         self,
         text: str,
         entities: list[str] = ["all named entities"],
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -336,7 +880,7 @@ class AsyncTheTool:
         Arguments:
             text: The input text
             entities: List of entities
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -380,13 +924,8 @@ class AsyncTheTool:
                 timeout=timeout,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -399,8 +938,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -409,7 +948,7 @@ class AsyncTheTool:
     async def is_question(
         self,
         text: str,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         user_prompt: str | None = None,
         temperature: float = 0.0,
         normalize: bool = True,
@@ -420,13 +959,14 @@ class AsyncTheTool:
         max_validation_retries: int = 3,
         priority: int | None = None,
         timeout: float | None = None,
+        score_labels: bool = False,
     ) -> ToolOutput:
         """
         Detect if the input is phrased as a question.
 
         Arguments:
             text: The input text
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             user_prompt: Additional instructions
             temperature: Controls randomness
             normalize: Whether to apply text normalization before sending to the LLM
@@ -437,6 +977,7 @@ class AsyncTheTool:
             max_validation_retries: Maximum number of retry attempts if validation fails
             priority: Task execution priority (if enabled by vLLM and the model)
             timeout: Maximum time in seconds to wait for the response before raising a timeout error
+            score_labels: Asks only for the label with a capped completion, and returns the estimated probability of every label in label_probs
 
         Returns:
             ToolOutput
@@ -459,6 +1000,7 @@ class AsyncTheTool:
                     validator=validator,
                     max_validation_retries=max_validation_retries,
                     priority=priority,
+                    label_probs=score_labels,
                     # Internal parameters
                     tool_name=tool_name,
                     output_model=Bool,
@@ -468,16 +1010,12 @@ class AsyncTheTool:
                 timeout=timeout,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
+                label_probs=operator_output.label_probs,
                 metadata=metadata,
             )
 
@@ -487,8 +1025,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -499,7 +1037,7 @@ class AsyncTheTool:
         text: str,
         number_of_questions: int = 1,
         mode: Literal["from_text", "from_subject"] = "from_text",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -519,7 +1057,7 @@ class AsyncTheTool:
             text: The input text
             mode: from_text -> generate questions from an answer, from_subject -> generate questions from a subject
             number_of_questions: Number of questions to generate
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -563,13 +1101,8 @@ class AsyncTheTool:
                 timeout=timeout,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -582,8 +1115,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -593,7 +1126,7 @@ class AsyncTheTool:
         self,
         text: list[str],
         mode: Literal["simple", "stepwise"] = "simple",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -612,7 +1145,7 @@ class AsyncTheTool:
         Arguments:
             text: List of questions to merge
             mode: simple -> regular question merging, stepwise -> merge questions in two steps
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -656,13 +1189,8 @@ class AsyncTheTool:
                 timeout=timeout,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -675,8 +1203,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -686,7 +1214,7 @@ class AsyncTheTool:
         self,
         text: str,
         mode: Literal["positive", "negative", "hard_negative"] = "positive",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -705,7 +1233,7 @@ class AsyncTheTool:
         Arguments:
             text: The input text
             mode: positive -> positive augmentation, negative -> negative augmentation, hard_negative -> hard negative augmentation
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -748,13 +1276,8 @@ class AsyncTheTool:
                 timeout=timeout,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -767,8 +1290,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -777,7 +1300,7 @@ class AsyncTheTool:
     async def summarize(
         self,
         text: str,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -795,7 +1318,7 @@ class AsyncTheTool:
 
         Arguments:
             text: The input text
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -838,13 +1361,8 @@ class AsyncTheTool:
                 timeout=timeout,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -857,8 +1375,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -870,7 +1388,7 @@ class AsyncTheTool:
         target_language: str,
         use_chunker: bool = True,
         max_concurrent_chunks: int = 5,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         user_prompt: str | None = None,
         temperature: float = 0.0,
         normalize: bool = True,
@@ -892,7 +1410,7 @@ class AsyncTheTool:
             target_language: The target language for translation
             use_chunker: Whether to use text chunker for large texts
             max_concurrent_chunks: Maximum number of chunks to process in parallel when chunking is enabled
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             user_prompt: Additional instructions
             temperature: Controls randomness
             normalize: Whether to apply text normalization before sending to the LLM
@@ -953,25 +1471,27 @@ class AsyncTheTool:
                 translation = ""
                 analysis = ""
                 logprobs_list = []
-                token_usage = TokenUsage()
+                token_usage = TokenUsageAccumulator()
 
                 for chunk_output in chunk_outputs:
                     translation += chunk_output.result + "\n"
                     if with_analysis:
-                        analysis += chunk_output.analysis
+                        analysis += chunk_output.analysis or ""
                     if logprobs:
-                        logprobs_list.extend(chunk_output.logprobs)
+                        logprobs_list.append(chunk_output.logprobs)
                     token_usage += chunk_output.token_usage
 
-                metadata = ToolOutputMetadata(
+                metadata = self._build_metadata(
                     tool_name=tool_name,
                     execution_time=perf_counter() - start,
                     processed_by=chunk_outputs[0].processed_by,
-                    token_usage=token_usage,
+                    token_usage=token_usage.to_token_usage(),
+                    cache_hit=all(output.cache_hit for output in chunk_outputs),
+                    **OperatorUtils.combine_call_metadata(chunk_outputs),
                 )
-                tool_output = ToolOutput(
+                tool_output = self._build_output(
                     result=translation,
-                    logprobs=logprobs_list,
+                    logprobs=OperatorUtils.merge_logprobs(logprobs_list),
                     analysis=analysis,
                     metadata=metadata,
                 )
@@ -1001,13 +1521,8 @@ class AsyncTheTool:
                     timeout=timeout,
                 )
 
-                metadata = ToolOutputMetadata(
-                    tool_name=tool_name,
-                    execution_time=perf_counter() - start,
-                    processed_by=operator_output.processed_by,
-                    token_usage=operator_output.token_usage,
-                )
-                tool_output = ToolOutput(
+                metadata = self._metadata_from(operator_output, tool_name, start)
+                tool_output = self._build_output(
                     result=operator_output.result,
                     logprobs=operator_output.logprobs,
                     analysis=operator_output.analysis,
@@ -1020,8 +1535,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -1030,7 +1545,7 @@ class AsyncTheTool:
     async def propositionize(
         self,
         text: str,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -1050,7 +1565,7 @@ class AsyncTheTool:
 
         Arguments:
             text: The input text
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -1093,13 +1608,8 @@ class AsyncTheTool:
                 timeout=timeout,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -1112,8 +1622,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -1123,7 +1633,7 @@ class AsyncTheTool:
         self,
         text: str,
         source_text: str,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -1135,6 +1645,7 @@ class AsyncTheTool:
         max_validation_retries: int = 3,
         priority: int | None = None,
         timeout: float | None = None,
+        score_labels: bool = False,
     ) -> ToolOutput:
         """
         Check whether a statement is a fact based on the source text
@@ -1144,7 +1655,7 @@ class AsyncTheTool:
         Arguments:
             text: The input text
             source_text: The source text
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -1156,6 +1667,7 @@ class AsyncTheTool:
             max_validation_retries: Maximum number of retry attempts if validation fails
             priority: Task execution priority (if enabled by vLLM and the model)
             timeout: Maximum time in seconds to wait for the response before raising a timeout error
+            score_labels: Asks only for the label with a capped completion, and returns the estimated probability of every label in label_probs
 
         Returns:
             ToolOutput
@@ -1180,6 +1692,7 @@ class AsyncTheTool:
                     validator=validator,
                     max_validation_retries=max_validation_retries,
                     priority=priority,
+                    label_probs=score_labels,
                     # Internal parameters
                     tool_name=tool_name,
                     output_model=Bool,
@@ -1188,16 +1701,12 @@ class AsyncTheTool:
                 timeout=timeout,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
+                label_probs=operator_output.label_probs,
                 metadata=metadata,
             )
 
@@ -1207,8 +1716,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -1218,7 +1727,7 @@ class AsyncTheTool:
         self,
         prompt: str,
         output_model: BaseModel,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         analyze_template: str | None = None,
         output_lang: str | None = None,
         temperature: float = 0.0,
@@ -1236,7 +1745,7 @@ class AsyncTheTool:
         Arguments:
             prompt: The user prompt
             output_model: Pydantic BaseModel used for structured output
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             analyze_template: The analyze template used for reasoning analysis
             output_lang: Forces the model to respond in a specific language
             temperature: Controls randomness
@@ -1280,13 +1789,8 @@ class AsyncTheTool:
                 timeout=timeout,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -1299,8 +1803,8 @@ class AsyncTheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -1311,7 +1815,7 @@ class AsyncTheTool:
         self,
         text: str,
         number_of_questions: int = 1,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -1353,7 +1857,7 @@ class AsyncTheTool:
         self,
         text: str,
         number_of_questions: int = 1,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -1395,7 +1899,7 @@ class AsyncTheTool:
         self,
         text: str,
         mode: Literal["positive", "negative", "hard_negative"] = "positive",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -1436,7 +1940,7 @@ class AsyncTheTool:
         self,
         text: str,
         source_text: str,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -1,12 +1,29 @@
 import asyncio
 import logging
+from collections import defaultdict
 from collections.abc import Callable
+from time import perf_counter
 from typing import Any, Literal
 
 from openai import AsyncOpenAI
 from tqdm import tqdm
 
-from ..models import CategoryTree, ToolOutput
+from ..core import (
+    AdaptiveConcurrencyLimiter,
+    CacheBackend,
+    CategoryIndex,
+    DecodingBackend,
+    LogprobsFormat,
+    OperatorUtils,
+    PromptLayout,
+    RateLimiter,
+    RetryPolicy,
+    TheToolUtils,
+    TokenBudgetLimiter,
+    TokenUsageAccumulator,
+)
+from ..core.internal_models import OperatorOutput
+from ..models import CategoryTree, ToolOutput, ToolOutputMetadata
 from .async_tools import AsyncTheTool
 
 
@@ -17,6 +34,19 @@ class BatchTheTool:
         model: str,
         raise_on_error: bool = True,
         max_concurrency: int = 5,
+        cache: CacheBackend | None = None,
+        logprobs_format: LogprobsFormat = "full",
+        validate_outputs: bool = False,
+        decoding_backend: DecodingBackend = "openai",
+        cascade_models: list[str] | None = None,
+        cascade_threshold: float | dict[str, float] = 0.9,
+        adaptive_analysis_threshold: float = 0.9,
+        prompt_layout: PromptLayout = "default",
+        prompt_cache_key: str | None = None,
+        retry_policy: RetryPolicy | None = None,
+        concurrency_limiter: AdaptiveConcurrencyLimiter | None = None,
+        rate_limiter: RateLimiter | None = None,
+        token_limiter: TokenBudgetLimiter | None = None,
     ) -> None:
         """
         Initialize the BatchTheTool instance.
@@ -26,17 +56,63 @@ class BatchTheTool:
             model: The name of the model
             raise_on_error: If True, raises exceptions on errors; if False, logs errors and continues
             max_concurrency: Maximum number of concurrent API requests allowed
+            cache: Optional cache backend used to reuse results of identical requests
+            logprobs_format: full -> list of dicts, compact -> array-backed CompactLogprobs, summary -> LogprobsSummary with confidence statistics only
+            validate_outputs: If True, outputs are built with full pydantic validation instead of the trusted fast path
+            decoding_backend: openai -> structured outputs with a response_format, vllm -> vLLM guided decoding (guided_choice, guided_regex or guided_json) in extra_body
+            cascade_models: Cheaper models tried in order before `model`, an answer is escalated to the next model when its confidence is below cascade_threshold
+            cascade_threshold: Minimum confidence to keep the answer of a cascade model, or a mapping of tool names to it. Tools missing from the mapping only run on `model`
+            adaptive_analysis_threshold: With with_analysis="adaptive", minimum confidence of the first answer to skip the analysis
+            prompt_layout: default -> one user message, prefix_cache -> the static instructions go first in a system message and the per-request parts last, so that requests share their prompt prefix on servers with prefix caching
+            prompt_cache_key: Stable key sent as prompt_cache_key with every request, which helps providers route requests with the same prefix to the same cache
+            retry_policy: Retries of rate limits, server errors and connection failures, defaults to RetryPolicy()
+            concurrency_limiter: Adaptive limit on the requests in flight used instead of the fixed max_concurrency, it can be shared by many instances
+            rate_limiter: Client-side requests and tokens per minute quotas, it can be shared by many instances
+            token_limiter: Caps the estimated tokens of the requests in flight, it can be shared by many instances
         """
-        self.tool = AsyncTheTool(client, model, raise_on_error)
-        self.max_concurrency = max_concurrency
-        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.tool = AsyncTheTool(
+            client,
+            model,
+            raise_on_error,
+            cache,
+            logprobs_format,
+            validate_outputs,
+            decoding_backend,
+            cascade_models,
+            cascade_threshold,
+            adaptive_analysis_threshold,
+            prompt_layout,
+            prompt_cache_key,
+            retry_policy,
+            concurrency_limiter,
+            rate_limiter,
+            token_limiter,
+        )
+        # The adaptive limiter gates every request, the semaphore only bounds the
+        # texts in flight and leaves the limiter room to grow
+        self.max_concurrency = (
+            concurrency_limiter.max_limit
+            if concurrency_limiter is not None
+            else max_concurrency
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
         self.logger = logging.getLogger(self.__class__.__name__)
 
+    def _build_metadata(self, **data: Any) -> ToolOutputMetadata:
+        if self.tool.validate_outputs:
+            return ToolOutputMetadata(**data)
+        return ToolOutputMetadata.model_construct(**data)
+
+    def _build_output(self, **data: Any) -> ToolOutput:
+        if self.tool.validate_outputs:
+            return ToolOutput(**data)
+        return ToolOutput.model_construct(**data)
+
     async def categorize(
         self,
         texts: list[str],
-        categories: list[str] | CategoryTree,
-        with_analysis: bool = False,
+        categories: list[str] | CategoryTree | CategoryIndex,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         user_prompt: str | None = None,
         temperature: float = 0.0,
         normalize: bool = True,
@@ -47,14 +123,21 @@ class BatchTheTool:
         max_validation_retries: int = 3,
         priority: int | None = None,
         timeout: float | None = None,
+        beam_width: int = 1,
+        flatten_tree: bool = False,
+        min_confidence: float | None = None,
+        level_synchronous: bool = False,
+        shortlist_size: int = 50,
+        max_group_size: int | None = None,
+        score_labels: bool = False,
     ) -> list[ToolOutput]:
         """
         Classify texts into given categories
 
         Arguments:
             texts: The input texts
-            categories: The category list or category tree
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            categories: The category list, category tree or category index
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             user_prompt: Additional instructions
             temperature: Controls randomness
             normalize: Whether to apply text normalization before sending to the LLM
@@ -65,6 +148,13 @@ class BatchTheTool:
             max_validation_retries: Maximum number of retry attempts if validation fails
             priority: Task execution priority (if enabled by vLLM and the model)
             timeout: Maximum time in seconds to wait for the response before raising a timeout error
+            beam_width: With a category tree, number of candidate children explored concurrently at each level, 1 walks the tree greedily
+            flatten_tree: With a category tree, classifies among all root-to-leaf paths in a single call instead of one call per level
+            min_confidence: With flatten_tree, falls back to the level-by-level walk when the probability of the chosen path is below this value
+            level_synchronous: With a category tree, walks all texts one level at a time and sends the texts under the same parent node back to back, so they share the category-list prompt prefix
+            shortlist_size: With a CategoryIndex, maximum number of matching categories offered to the LLM
+            max_group_size: With a category tree, levels with more children are split into groups classified concurrently, and the group winners go through a run-off
+            score_labels: Asks only for the label with a capped completion, and returns the estimated probability of every label in label_probs (flat category lists only)
 
         Returns:
             list[ToolOutput]
@@ -75,6 +165,46 @@ class BatchTheTool:
         total = len(texts)
         pbar = tqdm(total=total, desc="Categorizing...", unit="text")
 
+        if isinstance(categories, CategoryTree) and level_synchronous:
+            unsupported = [
+                name
+                for name, is_set in (
+                    ("beam_width", beam_width > 1),
+                    ("flatten_tree", flatten_tree),
+                    ("min_confidence", min_confidence is not None),
+                    ("score_labels", score_labels),
+                )
+                if is_set
+            ]
+            if unsupported:
+                pbar.close()
+                raise ValueError(
+                    f"level_synchronous does not support {', '.join(unsupported)}"
+                )
+
+            try:
+                results = await self._categorize_tree_by_level(
+                    texts=texts,
+                    categories=categories,
+                    with_analysis=with_analysis,
+                    user_prompt=user_prompt,
+                    temperature=temperature,
+                    normalize=normalize,
+                    logprobs=logprobs,
+                    top_logprobs=top_logprobs,
+                    max_completion_tokens=max_completion_tokens,
+                    validator=validator,
+                    max_validation_retries=max_validation_retries,
+                    priority=priority,
+                    timeout=timeout,
+                    max_group_size=max_group_size,
+                    pbar=pbar,
+                )
+            finally:
+                # An error of a level is raised from inside the walk
+                pbar.close()
+            return results
+
         async def _throttled_task(text: str) -> ToolOutput:
             async with self.semaphore:
                 result = await self.tool.categorize(
@@ -91,6 +221,12 @@ class BatchTheTool:
                     max_validation_retries=max_validation_retries,
                     priority=priority,
                     timeout=timeout,
+                    beam_width=beam_width,
+                    flatten_tree=flatten_tree,
+                    min_confidence=min_confidence,
+                    shortlist_size=shortlist_size,
+                    max_group_size=max_group_size,
+                    score_labels=score_labels,
                 )
             pbar.update(1)
             return result
@@ -100,12 +236,146 @@ class BatchTheTool:
         pbar.close()
         return results
 
+    async def _categorize_tree_by_level(
+        self,
+        texts: list[str],
+        categories: CategoryTree,
+        with_analysis: bool | Literal["adaptive", "inline"],
+        user_prompt: str | None,
+        temperature: float,
+        normalize: bool,
+        logprobs: bool,
+        top_logprobs: int,
+        max_completion_tokens: int | None,
+        validator: Callable[[Any], bool] | None,
+        max_validation_retries: int,
+        priority: int | None,
+        timeout: float | None,
+        max_group_size: int | None,
+        pbar: tqdm,
+    ) -> list[ToolOutput]:
+        """
+        Walks the tree for all texts together, one level at a time.
+        The calls of each level are ordered by parent node, so requests with the same
+        category list reach the server back to back and reuse its prefix cache.
+        """
+        texts = [TheToolUtils.normalize(text) if normalize else text for text in texts]
+        # Time spent on the calls of every text, the waits for other texts are left out
+        execution_times = [0.0] * len(texts)
+        root = categories.get_node("root")
+        nodes = [root] * len(texts)
+        paths: list[list[str]] = [[] for _ in texts]
+        level_outputs: list[list[OperatorOutput]] = [[] for _ in texts]
+        errors: dict[int, str] = {}
+        active = list(range(len(texts))) if root.children else []
+
+        async def _throttled_level(index: int) -> OperatorOutput:
+            async with self.semaphore:
+                start = perf_counter()
+                try:
+                    return await self.tool.run_tree_level(
+                        text=texts[index],
+                        node=nodes[index],
+                        with_analysis=with_analysis,
+                        # The analysis only depends on the text, so it is reused by the next levels
+                        analysis=level_outputs[index][0].analysis
+                        if level_outputs[index]
+                        else None,
+                        user_prompt=user_prompt,
+                        temperature=temperature,
+                        logprobs=logprobs,
+                        top_logprobs=top_logprobs,
+                        max_completion_tokens=max_completion_tokens,
+                        validator=validator,
+                        max_validation_retries=max_validation_retries,
+                        priority=priority,
+                        timeout=timeout,
+                        max_group_size=max_group_size,
+                    )
+                finally:
+                    execution_times[index] += perf_counter() - start
+
+        while active:
+            groups: dict[str, list[int]] = defaultdict(list)
+            for index in active:
+                groups[nodes[index].name].append(index)
+            ordered = [index for group in groups.values() for index in group]
+
+            self.logger.info(
+                f"Dispatching {len(ordered)} texts under {len(groups)} parent categories..."
+            )
+
+            # The semaphore wakes its waiters in order, so each group is sent contiguously
+            outputs = await asyncio.gather(
+                *(_throttled_level(index) for index in ordered),
+                return_exceptions=True,
+            )
+
+            active = []
+            for index, output in zip(ordered, outputs):
+                if isinstance(output, Exception):
+                    self.logger.error(str(output))
+                    if self.tool.raise_on_error:
+                        raise output
+
+                    errors[index] = f"{type(output).__name__}: {output}"
+                    pbar.update(1)
+                    continue
+
+                level_outputs[index].append(output)
+                node = categories.get_node(output.result)
+                if node:
+                    paths[index].append(output.result)
+                    nodes[index] = node
+
+                if node and node.children:
+                    active.append(index)
+                else:
+                    pbar.update(1)
+
+        results = []
+        for index, outputs in enumerate(level_outputs):
+            if index in errors:
+                metadata = self._build_metadata(tool_name="categorize")
+                results.append(
+                    self._build_output(errors=[errors[index]], metadata=metadata)
+                )
+                continue
+
+            token_usage = TokenUsageAccumulator()
+            for output in outputs:
+                token_usage += output.token_usage
+
+            metadata = self._build_metadata(
+                tool_name="categorize",
+                execution_time=execution_times[index],
+                processed_by=outputs[-1].processed_by if outputs else None,
+                token_usage=token_usage.to_token_usage(),
+                # A root without children makes no call, so nothing came from the cache
+                cache_hit=bool(outputs) and all(output.cache_hit for output in outputs),
+                **OperatorUtils.combine_call_metadata(outputs),
+            )
+            results.append(
+                self._build_output(
+                    result=paths[index],
+                    analysis=outputs[0].analysis if outputs else None,
+                    logprobs=OperatorUtils.merge_logprobs(
+                        [output.logprobs for output in outputs]
+                    )
+                    if logprobs
+                    else None,
+                    metadata=metadata,
+                )
+            )
+
+        return results
+
     async def extract_keywords(
         self,
         texts: list[str],
         mode: Literal["auto", "threshold", "count"] = "auto",
         number_of_keywords: int | None = None,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -125,7 +395,7 @@ class BatchTheTool:
             texts: The input texts
             mode: auto -> decide n of keywords automatically, threshold -> decide n of keywords by a threshold, count -> takes number of keywords as the parameter
             number_of_keywords: Must be set only when using "count" mode
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -178,7 +448,7 @@ class BatchTheTool:
         self,
         texts: list[str],
         entities: list[str] = ["all named entities"],
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -197,7 +467,7 @@ class BatchTheTool:
         Arguments:
             texts: The input texts
             entities: List of entities
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -248,7 +518,7 @@ class BatchTheTool:
     async def is_question(
         self,
         texts: list[str],
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         user_prompt: str | None = None,
         temperature: float = 0.0,
         normalize: bool = True,
@@ -259,13 +529,14 @@ class BatchTheTool:
         max_validation_retries: int = 3,
         priority: int | None = None,
         timeout: float | None = None,
+        score_labels: bool = False,
     ) -> list[ToolOutput]:
         """
         Detect if the inputs are phrased as questions.
 
         Arguments:
             texts: The input texts
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             user_prompt: Additional instructions
             temperature: Controls randomness
             normalize: Whether to apply text normalization before sending to the LLM
@@ -276,6 +547,7 @@ class BatchTheTool:
             max_validation_retries: Maximum number of retry attempts if validation fails
             priority: Task execution priority (if enabled by vLLM and the model)
             timeout: Maximum time in seconds to wait for the response before raising a timeout error
+            score_labels: Asks only for the label with a capped completion, and returns the estimated probability of every label in label_probs
 
         Returns:
             list[ToolOutput]
@@ -301,6 +573,7 @@ class BatchTheTool:
                     max_validation_retries=max_validation_retries,
                     priority=priority,
                     timeout=timeout,
+                    score_labels=score_labels,
                 )
             pbar.update(1)
             return result
@@ -315,7 +588,7 @@ class BatchTheTool:
         texts: list[str],
         number_of_questions: int = 1,
         mode: Literal["from_text", "from_subject"] = "from_text",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -335,7 +608,7 @@ class BatchTheTool:
             texts: The input texts
             mode: from_text -> generate questions from an answer, from_subject -> generate questions from a subject
             number_of_questions: Number of questions to generate
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -388,7 +661,7 @@ class BatchTheTool:
         self,
         texts: list[list[str]],
         mode: Literal["simple", "stepwise"] = "simple",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -407,7 +680,7 @@ class BatchTheTool:
         Arguments:
             texts: List of groups of questions to merge
             mode: simple -> regular question merging, stepwise -> merge questions in two steps
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -460,7 +733,7 @@ class BatchTheTool:
         self,
         texts: list[str],
         mode: Literal["positive", "negative", "hard_negative"] = "positive",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -479,7 +752,7 @@ class BatchTheTool:
         Arguments:
             texts: The input texts
             mode: positive -> positive augmentation, negative -> negative augmentation, hard_negative -> hard negative augmentation
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -530,7 +803,7 @@ class BatchTheTool:
     async def summarize(
         self,
         texts: list[str],
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -548,7 +821,7 @@ class BatchTheTool:
 
         Arguments:
             texts: The input texts
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -601,7 +874,7 @@ class BatchTheTool:
         target_language: str,
         use_chunker: bool = True,
         max_concurrent_chunks: int = 5,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         user_prompt: str | None = None,
         temperature: float = 0.0,
         normalize: bool = True,
@@ -623,7 +896,7 @@ class BatchTheTool:
             target_language: The target language for translation
             use_chunker: Whether to use text chunker for large texts
             max_concurrent_chunks: Maximum number of chunks to process in parallel when chunking is enabled
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             user_prompt: Additional instructions
             temperature: Controls randomness
             normalize: Whether to apply text normalization before sending to the LLM
@@ -674,7 +947,7 @@ class BatchTheTool:
     async def propositionize(
         self,
         texts: list[str],
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -694,7 +967,7 @@ class BatchTheTool:
 
         Arguments:
             texts: The input texts
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -745,7 +1018,7 @@ class BatchTheTool:
         self,
         texts: list[str],
         source_texts: list[str],
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -757,6 +1030,7 @@ class BatchTheTool:
         max_validation_retries: int = 3,
         priority: int | None = None,
         timeout: float | None = None,
+        score_labels: bool = False,
     ) -> list[ToolOutput]:
         """
         Check whether statements are facts based on source texts
@@ -766,7 +1040,7 @@ class BatchTheTool:
         Arguments:
             texts: The input texts (statements to check)
             source_texts: The source texts
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -778,6 +1052,7 @@ class BatchTheTool:
             max_validation_retries: Maximum number of retry attempts if validation fails
             priority: Task execution priority (if enabled by vLLM and the model)
             timeout: Maximum time in seconds to wait for the response before raising a timeout error
+            score_labels: Asks only for the label with a capped completion, and returns the estimated probability of every label in label_probs
 
         Returns:
             list[ToolOutput]
@@ -806,6 +1081,7 @@ class BatchTheTool:
                     max_validation_retries=max_validation_retries,
                     priority=priority,
                     timeout=timeout,
+                    score_labels=score_labels,
                 )
             pbar.update(1)
             return result
@@ -10,16 +10,25 @@ from typing_extensions import deprecated
 
 from ..core import (
     Bool,
+    CacheBackend,
+    CascadeOperator,
+    CategoryIndex,
+    DecodingBackend,
     ListDictStrStr,
     ListStr,
+    LogprobsFormat,
     Operator,
+    OperatorUtils,
+    PromptLayout,
     ReasonListStr,
+    RetryPolicy,
     Str,
     TheToolUtils,
-    TokenUsage,
+    TokenUsageAccumulator,
     create_literal_model,
 )
-from ..models import CategoryTree, ToolOutput, ToolOutputMetadata
+from ..core.internal_models import OperatorOutput
+from ..models import CategoryNode, CategoryTree, ToolOutput, ToolOutputMetadata
 
 
 class TheTool:
@@ -28,6 +37,16 @@ class TheTool:
         client: OpenAI,
         model: str,
         raise_on_error: bool = True,
+        cache: CacheBackend | None = None,
+        logprobs_format: LogprobsFormat = "full",
+        validate_outputs: bool = False,
+        decoding_backend: DecodingBackend = "openai",
+        cascade_models: list[str] | None = None,
+        cascade_threshold: float | dict[str, float] = 0.9,
+        adaptive_analysis_threshold: float = 0.9,
+        prompt_layout: PromptLayout = "default",
+        prompt_cache_key: str | None = None,
+        retry_policy: RetryPolicy | None = None,
     ) -> None:
         """
         Initialize the TheTool instance.
@@ -36,16 +55,89 @@ class TheTool:
             client: An OpenAI client instance for making API calls
             model: The name of the model
             raise_on_error: If True, raises exceptions on errors; if False, logs errors and continues
+            cache: Optional cache backend used to reuse results of identical requests
+            logprobs_format: full -> list of dicts, compact -> array-backed CompactLogprobs, summary -> LogprobsSummary with confidence statistics only
+            validate_outputs: If True, outputs are built with full pydantic validation instead of the trusted fast path
+            decoding_backend: openai -> structured outputs with a response_format, vllm -> vLLM guided decoding (guided_choice, guided_regex or guided_json) in extra_body
+            cascade_models: Cheaper models tried in order before `model`, an answer is escalated to the next model when its confidence is below cascade_threshold
+            cascade_threshold: Minimum confidence to keep the answer of a cascade model, or a mapping of tool names to it. Tools missing from the mapping only run on `model`
+            adaptive_analysis_threshold: With with_analysis="adaptive", minimum confidence of the first answer to skip the analysis
+            prompt_layout: default -> one user message, prefix_cache -> the static instructions go first in a system message and the per-request parts last, so that requests share their prompt prefix on servers with prefix caching
+            prompt_cache_key: Stable key sent as prompt_cache_key with every request, which helps providers route requests with the same prefix to the same cache
+            retry_policy: Retries of rate limits, server errors and connection failures, defaults to RetryPolicy()
         """
-        self._operator = Operator(client=client, model=model)
+        self._operator = Operator(
+            client=client,
+            model=model,
+            cache=cache,
+            logprobs_format=logprobs_format,
+            decoding_backend=decoding_backend,
+            adaptive_analysis_threshold=adaptive_analysis_threshold,
+            prompt_layout=prompt_layout,
+            prompt_cache_key=prompt_cache_key,
+            retry_policy=retry_policy,
+        )
+        if cascade_models:
+            self._operator = CascadeOperator(
+                operators=[
+                    Operator(
+                        client=client,
+                        model=cascade_model,
+                        cache=cache,
+                        logprobs_format=logprobs_format,
+                        decoding_backend=decoding_backend,
+                        adaptive_analysis_threshold=adaptive_analysis_threshold,
+                        prompt_layout=prompt_layout,
+                        prompt_cache_key=prompt_cache_key,
+                        retry_policy=retry_policy,
+                    )
+                    for cascade_model in cascade_models
+                ]
+                + [self._operator],
+                thresholds=cascade_threshold,
+            )
         self.logger = logging.getLogger(self.__class__.__name__)
         self.raise_on_error = raise_on_error
+        self.validate_outputs = validate_outputs
+
+    def _build_metadata(self, **data: Any) -> ToolOutputMetadata:
+        if self.validate_outputs:
+            return ToolOutputMetadata(**data)
+        return ToolOutputMetadata.model_construct(**data)
+
+    def _metadata_from(
+        self,
+        operator_output: OperatorOutput,
+        tool_name: str,
+        start: float,
+        **extra: Any,
+    ) -> ToolOutputMetadata:
+        """
+        Builds the metadata of a run that made a single operator call.
+        """
+        return self._build_metadata(
+            tool_name=tool_name,
+            execution_time=perf_counter() - start,
+            processed_by=operator_output.processed_by,
+            token_usage=operator_output.token_usage,
+            cache_hit=operator_output.cache_hit,
+            cascade_tier=operator_output.cascade_tier,
+            tier_token_usage=operator_output.tier_token_usage,
+            analysis_triggered=operator_output.analysis_triggered,
+            retry_count=operator_output.retry_count,
+            **extra,
+        )
+
+    def _build_output(self, **data: Any) -> ToolOutput:
+        if self.validate_outputs:
+            return ToolOutput(**data)
+        return ToolOutput.model_construct(**data)
 
     def categorize(
         self,
         text: str,
-        categories: list[str] | CategoryTree,
-        with_analysis: bool = False,
+        categories: list[str] | CategoryTree | CategoryIndex,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         user_prompt: str | None = None,
         temperature: float = 0.0,
         normalize: bool = True,
@@ -55,14 +147,19 @@ class TheTool:
         validator: Callable[[Any], bool] | None = None,
         max_validation_retries: int = 3,
         priority: int | None = None,
+        flatten_tree: bool = False,
+        min_confidence: float | None = None,
+        shortlist_size: int = 50,
+        max_group_size: int | None = None,
+        score_labels: bool = False,
     ) -> ToolOutput:
         """
         Classify text into given categories
 
         Arguments:
             text: The input text
-            categories: The category list or category tree
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            categories: The category list, category tree or category index
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             user_prompt: Additional instructions
             temperature: Controls randomness
             normalize: Whether to apply text normalization before sending to the LLM
@@ -72,6 +169,11 @@ class TheTool:
             validator: Custom validation function to validate the output
             max_validation_retries: Maximum number of retry attempts if validation fails
             priority: Task execution priority (if enabled by vLLM and the model)
+            flatten_tree: With a category tree, classifies among all root-to-leaf paths in a single call instead of one call per level
+            min_confidence: With flatten_tree, falls back to the level-by-level walk when the probability of the chosen path is below this value
+            shortlist_size: With a CategoryIndex, maximum number of matching categories offered to the LLM
+            max_group_size: With a category tree, levels with more children are split into groups classified separately, and the group winners go through a run-off
+            score_labels: Asks only for the label with a capped completion, and returns the estimated probability of every label in label_probs (flat category lists only)
 
         Returns:
             ToolOutput
@@ -97,31 +199,159 @@ class TheTool:
                     priority=priority,
                     # Internal parameters
                     tool_name=tool_name,
-                    output_model=create_literal_model(categories),
+                    label_probs=score_labels,
+                    output_model=create_literal_model(
+                        categories, with_reason=not score_labels
+                    ),
                     mode=None,
                     output_lang=None,
                 )
 
-                metadata = ToolOutputMetadata(
+                metadata = self._metadata_from(operator_output, tool_name, start)
+                tool_output = self._build_output(
+                    result=operator_output.result,
+                    analysis=operator_output.analysis,
+                    logprobs=operator_output.logprobs,
+                    label_probs=operator_output.label_probs,
+                    metadata=metadata,
+                )
+
+            elif isinstance(categories, CategoryIndex):
+                text = TheToolUtils.normalize(text) if normalize else text
+                category_names, shortlist_recall = categories.shortlist(
+                    text, shortlist_size
+                )
+
+                self.logger.info(
+                    f"Shortlisted {len(category_names)} of {len(categories)} categories"
+                )
+
+                operator_output = self._operator.run(
+                    # Parameters used for prompt injection
+                    text=text,
+                    category_list=categories.render(category_names),
+                    # Parameters used for chat completions & operator usage
+                    with_analysis=with_analysis,
+                    user_prompt=user_prompt,
+                    temperature=temperature,
+                    logprobs=logprobs,
+                    top_logprobs=top_logprobs,
+                    max_completion_tokens=max_completion_tokens,
+                    validator=validator,
+                    max_validation_retries=max_validation_retries,
+                    priority=priority,
+                    # Internal parameters
                     tool_name=tool_name,
-                    execution_time=perf_counter() - start,
-                    processed_by=operator_output.processed_by,
-                    token_usage=operator_output.token_usage,
+                    label_probs=score_labels,
+                    output_model=create_literal_model(
+                        category_names, with_reason=not score_labels
+                    ),
+                    mode=None,
+                    output_lang=None,
                 )
-                tool_output = ToolOutput(
+
+                metadata = self._metadata_from(
+                    operator_output, tool_name, start, shortlist_recall=shortlist_recall
+                )
+                tool_output = self._build_output(
                     result=operator_output.result,
                     analysis=operator_output.analysis,
                     logprobs=operator_output.logprobs,
+                    label_probs=operator_output.label_probs,
                     metadata=metadata,
                 )
 
+            elif flatten_tree:
+                # Normalize once, the fallback walk reuses the normalized text
+                text = TheToolUtils.normalize(text) if normalize else text
+                paths = TheToolUtils.label_paths(categories.get_leaf_paths())
+                category_list = [
+                    f"Category Name: {label}, Description: {categories.get_node(path[-1]).description}"
+                    for label, path in paths.items()
+                ]
+
+                operator_output = self._operator.run(
+                    # Parameters used for prompt injection
+                    text=text,
+                    category_list=category_list,
+                    # Parameters used for chat completions & operator usage
+                    with_analysis=with_analysis,
+                    user_prompt=user_prompt,
+                    temperature=temperature,
+                    logprobs=logprobs,
+                    top_logprobs=top_logprobs,
+                    max_completion_tokens=max_completion_tokens,
+                    validator=validator,
+                    max_validation_retries=max_validation_retries,
+                    priority=priority,
+                    label_probs=min_confidence is not None,
+                    # Internal parameters
+                    tool_name=tool_name,
+                    output_model=create_literal_model(list(paths)),
+                    mode=None,
+                    output_lang=None,
+                )
+
+                confidence = (
+                    operator_output.label_probs[operator_output.result]
+                    if min_confidence is not None
+                    else None
+                )
+
+                if confidence is not None and confidence < min_confidence:
+                    self.logger.info(
+                        f"Path confidence {confidence:.3f} is below {min_confidence}, walking the tree level by level..."
+                    )
+                    tool_output = self.categorize(
+                        text=text,
+                        categories=categories,
+                        with_analysis=with_analysis,
+                        user_prompt=user_prompt,
+                        temperature=temperature,
+                        normalize=False,
+                        logprobs=logprobs,
+                        top_logprobs=top_logprobs,
+                        max_completion_tokens=max_completion_tokens,
+                        validator=validator,
+                        max_validation_retries=max_validation_retries,
+                        priority=priority,
+                        max_group_size=max_group_size,
+                    )
+
+                    # The flat attempt is part of the cost of this call
+                    if tool_output.metadata.token_usage is not None:
+                        tool_output.metadata.token_usage += operator_output.token_usage
+                    tool_output.metadata.cache_hit = (
+                        tool_output.metadata.cache_hit and operator_output.cache_hit
+                    )
+                    tool_output.metadata.execution_time = perf_counter() - start
+                    tool_output.metadata = tool_output.metadata.model_copy(
+                        update=OperatorUtils.combine_call_metadata(
+                            [tool_output.metadata, operator_output]
+                        )
+                    )
+
+                else:
+                    metadata = self._metadata_from(operator_output, tool_name, start)
+                    tool_output = self._build_output(
+                        result=paths[operator_output.result],
+                        analysis=operator_output.analysis,
+                        logprobs=operator_output.logprobs,
+                        label_probs=operator_output.label_probs,
+                        metadata=metadata,
+                    )
+
             else:
                 max_depth = categories.get_max_depth()
                 parent_node = categories.get_node("root")
+                # Normalize once instead of once per level
+                text = TheToolUtils.normalize(text) if normalize else text
                 final_categories = []
-                analysis = ""
+                analysis: str | None = None
                 logprobs_list = []
-                token_usage = TokenUsage()
+                level_outputs = []
+                token_usage = TokenUsageAccumulator()
+                cache_hit = True
 
                 for level in range(max_depth):
                     self.logger.info(f"Processing level {level + 1} of the tree...")
@@ -129,22 +359,17 @@ class TheTool:
                     if not parent_node.children:
                         break
 
-                    category_list = [
-                        f"Category Name: {name}, Description: {node.description}"
-                        for name, node in parent_node.children.items()
-                    ]
                     category_names = list(parent_node.children.keys())
 
                     self.logger.info(
                         f"Categories available in the current level: {category_names}"
                     )
 
-                    level_operator_output = self._operator.run(
-                        # Parameters used for prompt injection
-                        text=TheToolUtils.normalize(text) if normalize else text,
-                        category_list=category_list,
-                        # Parameters used for chat completions & operator usage
+                    level_operator_output = self.run_tree_level(
+                        text=text,
+                        node=parent_node,
                         with_analysis=with_analysis,
+                        analysis=analysis,
                         user_prompt=user_prompt,
                         temperature=temperature,
                         logprobs=logprobs,
@@ -153,13 +378,10 @@ class TheTool:
                         validator=validator,
                         max_validation_retries=max_validation_retries,
                         priority=priority,
-                        # Internal parameters
-                        tool_name=tool_name,
-                        output_model=create_literal_model(category_names),
-                        mode=None,
-                        output_lang=None,
+                        max_group_size=max_group_size,
                     )
 
+                    level_outputs.append(level_operator_output)
                     chosen_category = level_operator_output.result
                     parent_node = categories.get_node(chosen_category)
 
@@ -172,22 +394,26 @@ class TheTool:
 
                     final_categories.append(chosen_category)
 
+                    # The analysis only depends on the text, so it is reused by the next levels
                     if with_analysis:
-                        analysis += level_operator_output.analysis
+                        analysis = level_operator_output.analysis
                     if logprobs:
-                        logprobs_list.extend(level_operator_output.logprobs)
+                        logprobs_list.append(level_operator_output.logprobs)
                     token_usage += level_operator_output.token_usage
+                    cache_hit = cache_hit and level_operator_output.cache_hit
 
-                metadata = ToolOutputMetadata(
+                metadata = self._build_metadata(
                     tool_name=tool_name,
                     execution_time=perf_counter() - start,
                     processed_by=level_operator_output.processed_by,
-                    token_usage=token_usage,
+                    token_usage=token_usage.to_token_usage(),
+                    cache_hit=cache_hit,
+                    **OperatorUtils.combine_call_metadata(level_outputs),
                 )
-                tool_output = ToolOutput(
+                tool_output = self._build_output(
                     result=final_categories,
                     analysis=analysis,
-                    logprobs=logprobs_list,
+                    logprobs=OperatorUtils.merge_logprobs(logprobs_list),
                     metadata=metadata,
                 )
 
@@ -197,19 +423,109 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
         return tool_output
 
+    def run_tree_level(
+        self,
+        text: str,
+        node: CategoryNode,
+        with_analysis: bool | Literal["adaptive", "inline"],
+        analysis: str | None,
+        user_prompt: str | None,
+        temperature: float,
+        logprobs: bool,
+        top_logprobs: int,
+        max_completion_tokens: int | None,
+        validator: Callable[[Any], bool] | None,
+        max_validation_retries: int,
+        priority: int | None,
+        max_group_size: int | None = None,
+    ) -> OperatorOutput:
+        """
+        Chooses one of the children of `node` for the text.
+        Wider levels than `max_group_size` are classified as groups whose winners
+        go through a run-off, until one group is left.
+        Internal step of categorize.
+        """
+
+        def run_group(
+            children: list[CategoryNode], analysis: str | None
+        ) -> OperatorOutput:
+            return self._operator.run(
+                # Parameters used for prompt injection
+                text=text,
+                category_list=[
+                    f"Category Name: {child.name}, Description: {child.description}"
+                    for child in children
+                ],
+                # Parameters used for chat completions & operator usage
+                with_analysis=with_analysis,
+                analysis=analysis,
+                user_prompt=user_prompt,
+                temperature=temperature,
+                logprobs=logprobs,
+                top_logprobs=top_logprobs,
+                max_completion_tokens=max_completion_tokens,
+                validator=validator,
+                max_validation_retries=max_validation_retries,
+                priority=priority,
+                # Internal parameters
+                tool_name="categorize",
+                output_model=create_literal_model([child.name for child in children]),
+                mode=None,
+                output_lang=None,
+            )
+
+        if max_group_size is not None and max_group_size < 2:
+            raise ValueError("max_group_size should be at least 2")
+
+        candidates = list(node.children.values())
+        token_usage = TokenUsageAccumulator()
+        cache_hit = True
+        group_calls: list[OperatorOutput] = []
+
+        while max_group_size and len(candidates) > max_group_size:
+            groups = TheToolUtils.split_groups(candidates, max_group_size)
+            self.logger.info(
+                f"Splitting {len(candidates)} categories into {len(groups)} groups..."
+            )
+
+            group_outputs = []
+            for group in groups:
+                group_output = run_group(group, analysis)
+                # The first group generates the analysis that the other groups reuse
+                if with_analysis:
+                    analysis = group_output.analysis
+                token_usage += group_output.token_usage
+                cache_hit = cache_hit and group_output.cache_hit
+                group_outputs.append(group_output)
+
+            group_calls += group_outputs
+            candidates = [node.children[output.result] for output in group_outputs]
+
+        final_output = run_group(candidates, analysis)
+        if len(candidates) == len(node.children):
+            return final_output
+
+        # The run-off decides, the groups only add to the cost
+        token_usage += final_output.token_usage
+        final_output.token_usage = token_usage.to_token_usage()
+        final_output.cache_hit = cache_hit and final_output.cache_hit
+        return final_output.model_copy(
+            update=OperatorUtils.combine_call_metadata(group_calls + [final_output])
+        )
+
     def extract_keywords(
         self,
         text: str,
         mode: Literal["auto", "threshold", "count"] = "auto",
         number_of_keywords: int | None = None,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -228,7 +544,7 @@ class TheTool:
             text: The input text
             mode: auto -> decide n of keywords automatically, threshold -> decide n of keywords by a threshold, count -> takes number of keywords as the parameter
             number_of_keywords: Must be set only when using "count" mode
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -273,13 +589,8 @@ class TheTool:
                 output_model=ListStr,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -292,8 +603,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -303,7 +614,7 @@ class TheTool:
         self,
         text: str,
         entities: list[str] = ["all named entities"],
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -321,7 +632,7 @@ class TheTool:
         Arguments:
             text: The input text
             entities: List of entities
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -361,13 +672,8 @@ class TheTool:
                 mode=None,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -380,8 +686,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -390,7 +696,7 @@ class TheTool:
     def is_question(
         self,
         text: str,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         user_prompt: str | None = None,
         temperature: float = 0.0,
         normalize: bool = True,
@@ -400,13 +706,14 @@ class TheTool:
         validator: Callable[[Any], bool] | None = None,
         max_validation_retries: int = 3,
         priority: int | None = None,
+        score_labels: bool = False,
     ) -> ToolOutput:
         """
         Detect if the input is phrased as a question.
 
         Arguments:
             text: The input text
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             user_prompt: Additional instructions
             temperature: Controls randomness
             normalize: Whether to apply text normalization before sending to the LLM
@@ -416,6 +723,7 @@ class TheTool:
             validator: Custom validation function to validate the output
             max_validation_retries: Maximum number of retry attempts if validation fails
             priority: Task execution priority (if enabled by vLLM and the model)
+            score_labels: Asks only for the label with a capped completion, and returns the estimated probability of every label in label_probs
 
         Returns:
             ToolOutput
@@ -437,6 +745,7 @@ class TheTool:
                 validator=validator,
                 max_validation_retries=max_validation_retries,
                 priority=priority,
+                label_probs=score_labels,
                 # Internal parameters
                 tool_name=tool_name,
                 output_model=Bool,
@@ -444,16 +753,12 @@ class TheTool:
                 output_lang=None,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
+                label_probs=operator_output.label_probs,
                 metadata=metadata,
             )
 
@@ -463,8 +768,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -475,7 +780,7 @@ class TheTool:
         text: str,
         number_of_questions: int = 1,
         mode: Literal["from_text", "from_subject"] = "from_text",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -494,7 +799,7 @@ class TheTool:
             text: The input text
             mode: from_text -> generate questions from an answer, from_subject -> generate questions from a subject
             number_of_questions: Number of questions to generate
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -534,13 +839,8 @@ class TheTool:
                 output_model=ReasonListStr,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -553,8 +853,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -564,7 +864,7 @@ class TheTool:
         self,
         text: list[str],
         mode: Literal["simple", "stepwise"] = "simple",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -582,7 +882,7 @@ class TheTool:
         Arguments:
             text: List of questions to merge
             mode: simple -> regular question merging, stepwise -> merge questions in two steps
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -622,13 +922,8 @@ class TheTool:
                 output_model=Str,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -641,8 +936,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -652,7 +947,7 @@ class TheTool:
         self,
         text: str,
         mode: Literal["positive", "negative", "hard_negative"] = "positive",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -670,7 +965,7 @@ class TheTool:
         Arguments:
             text: The input text
             mode: positive -> positive augmentation, negative -> negative augmentation, hard_negative -> hard negative augmentation
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -709,13 +1004,8 @@ class TheTool:
                 output_model=Str,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -728,8 +1018,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -738,7 +1028,7 @@ class TheTool:
     def summarize(
         self,
         text: str,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -755,7 +1045,7 @@ class TheTool:
 
         Arguments:
             text: The input text
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -794,13 +1084,8 @@ class TheTool:
                 mode=None,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -813,8 +1098,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -825,7 +1110,7 @@ class TheTool:
         text: str,
         target_language: str,
         use_chunker: bool = True,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         user_prompt: str | None = None,
         temperature: float = 0.0,
         normalize: bool = True,
@@ -845,7 +1130,7 @@ class TheTool:
             text: The input text
             target_language: The target language for translation
             use_chunker: Whether to use text chunker for large texts
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             user_prompt: Additional instructions
             temperature: Controls randomness
             normalize: Whether to apply text normalization before sending to the LLM
@@ -870,7 +1155,9 @@ class TheTool:
                 translation = ""
                 analysis = ""
                 logprobs_list = []
-                token_usage = TokenUsage()
+                chunk_outputs = []
+                token_usage = TokenUsageAccumulator()
+                cache_hit = True
 
                 for i, chunk in enumerate(chunks):
                     self.logger.info(f"Processing chunk {i + 1} of the input...")
@@ -896,23 +1183,27 @@ class TheTool:
                         output_lang=None,
                     )
 
+                    chunk_outputs.append(chunk_operator_output)
                     translation += chunk_operator_output.result + "\n"
 
                     if with_analysis:
-                        analysis += chunk_operator_output.analysis
+                        analysis += chunk_operator_output.analysis or ""
                     if logprobs:
-                        logprobs_list.extend(chunk_operator_output.logprobs)
+                        logprobs_list.append(chunk_operator_output.logprobs)
                     token_usage += chunk_operator_output.token_usage
+                    cache_hit = cache_hit and chunk_operator_output.cache_hit
 
-                metadata = ToolOutputMetadata(
+                metadata = self._build_metadata(
                     tool_name=tool_name,
                     execution_time=perf_counter() - start,
                     processed_by=chunk_operator_output.processed_by,
-                    token_usage=token_usage,
+                    token_usage=token_usage.to_token_usage(),
+                    cache_hit=cache_hit,
+                    **OperatorUtils.combine_call_metadata(chunk_outputs),
                 )
-                tool_output = ToolOutput(
+                tool_output = self._build_output(
                     result=translation,
-                    logprobs=logprobs_list,
+                    logprobs=OperatorUtils.merge_logprobs(logprobs_list),
                     analysis=analysis,
                     metadata=metadata,
                 )
@@ -939,13 +1230,8 @@ class TheTool:
                     output_lang=None,
                 )
 
-                metadata = ToolOutputMetadata(
-                    tool_name=tool_name,
-                    execution_time=perf_counter() - start,
-                    processed_by=operator_output.processed_by,
-                    token_usage=operator_output.token_usage,
-                )
-                tool_output = ToolOutput(
+                metadata = self._metadata_from(operator_output, tool_name, start)
+                tool_output = self._build_output(
                     result=operator_output.result,
                     logprobs=operator_output.logprobs,
                     analysis=operator_output.analysis,
@@ -958,8 +1244,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -968,7 +1254,7 @@ class TheTool:
     def propositionize(
         self,
         text: str,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -987,7 +1273,7 @@ class TheTool:
 
         Arguments:
             text: The input text
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -1026,13 +1312,8 @@ class TheTool:
                 mode=None,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -1045,8 +1326,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -1056,7 +1337,7 @@ class TheTool:
         self,
         text: str,
         source_text: str,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -1067,6 +1348,7 @@ class TheTool:
         validator: Callable[[Any], bool] | None = None,
         max_validation_retries: int = 3,
         priority: int | None = None,
+        score_labels: bool = False,
     ) -> ToolOutput:
         """
         Check whether a statement is a fact based on the source text
@@ -1076,7 +1358,7 @@ class TheTool:
         Arguments:
             text: The input text
             source_text: The source text
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             output_lang: Forces the model to respond in a specific language
             user_prompt: Additional instructions
             temperature: Controls randomness
@@ -1087,6 +1369,7 @@ class TheTool:
             validator: Custom validation function to validate the output
             max_validation_retries: Maximum number of retry attempts if validation fails
             priority: Task execution priority (if enabled by vLLM and the model)
+            score_labels: Asks only for the label with a capped completion, and returns the estimated probability of every label in label_probs
 
         Returns:
             ToolOutput
@@ -1110,22 +1393,19 @@ class TheTool:
                 validator=validator,
                 max_validation_retries=max_validation_retries,
                 priority=priority,
+                label_probs=score_labels,
                 # Internal parameters
                 tool_name=tool_name,
                 output_model=Bool,
                 mode=None,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
+                label_probs=operator_output.label_probs,
                 metadata=metadata,
             )
 
@@ -1135,8 +1415,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -1146,7 +1426,7 @@ class TheTool:
         self,
         prompt: str,
         output_model: BaseModel,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         analyze_template: str | None = None,
         output_lang: str | None = None,
         temperature: float = 0.0,
@@ -1163,7 +1443,7 @@ class TheTool:
         Arguments:
             prompt: The user prompt
             output_model: Pydantic BaseModel used for structured output
-            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call
+            with_analysis: Adds a reasoning step before generating the final output. Note: This doubles token usage per call. "adaptive" only adds it when the first answer is not confident, "inline" generates it in the same completion as the output
             analyze_template: The analyze template used for reasoning analysis
             output_lang: Forces the model to respond in a specific language
             temperature: Controls randomness
@@ -1203,13 +1483,8 @@ class TheTool:
                 mode=None,
             )
 
-            metadata = ToolOutputMetadata(
-                tool_name=tool_name,
-                execution_time=perf_counter() - start,
-                processed_by=operator_output.processed_by,
-                token_usage=operator_output.token_usage,
-            )
-            tool_output = ToolOutput(
+            metadata = self._metadata_from(operator_output, tool_name, start)
+            tool_output = self._build_output(
                 result=operator_output.result,
                 logprobs=operator_output.logprobs,
                 analysis=operator_output.analysis,
@@ -1222,8 +1497,8 @@ class TheTool:
             if self.raise_on_error:
                 raise
 
-            metadata = ToolOutputMetadata(tool_name=tool_name)
-            tool_output = ToolOutput(
+            metadata = self._build_metadata(tool_name=tool_name)
+            tool_output = self._build_output(
                 errors=[f"{type(e).__name__}: {e}"], metadata=metadata
             )
 
@@ -1234,7 +1509,7 @@ class TheTool:
         self,
         text: str,
         number_of_questions: int = 1,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -1276,7 +1551,7 @@ class TheTool:
         self,
         text: str,
         number_of_questions: int = 1,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -1318,7 +1593,7 @@ class TheTool:
         self,
         text: str,
         mode: Literal["positive", "negative", "hard_negative"] = "positive",
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,
@@ -1359,7 +1634,7 @@ class TheTool:
         self,
         text: str,
         source_text: str,
-        with_analysis: bool = False,
+        with_analysis: bool | Literal["adaptive", "inline"] = False,
         output_lang: str | None = None,
         user_prompt: str | None = None,
         temperature: float = 0.0,